@@ -1,20 +1,39 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, Response, stream_with_context, make_response
 from flask_cors import CORS
 import cv2
 import numpy as np
-import face_recognition
 import os
 import json
 from datetime import datetime, timedelta
 import logging
 import time
-import pandas as pd
-from io import BytesIO
 from functools import wraps
 import jwt
-import math
 import hashlib
 import secrets
+import threading
+import multiprocessing
+import itertools
+
+import config
+from utils.face_utils import FaceGallery, extract_face_encodings, decode_image, batch_duplicates
+from utils.face_engine import FaceEngine, EngineBusy, EngineTimeout
+from utils.face_index import create_index
+from utils.encoding_store import EncodingStore, validate_user_id, user_id_error
+from utils.user_registry import UserRegistry, JsonUserFile
+import models as db
+from utils.attendance_log import AttendanceJournal
+from utils.file_lock import file_lock
+from utils.history_store import MonthlyHistory
+from utils.attendance_stats import AttendanceStats
+from utils.face_tracker import FaceTracker, detect_and_encode_new, iter_stream_frames
+from utils.recent_cache import RecentRecognitions, image_dhash
+from utils.shared_gallery import SharedGallery
+from utils.template_learner import TemplateLearner
+from utils.excel_utils import iter_export, EXPORT_FORMATS
+from utils.record_pages import RecordQuery, encode_cursor, decode_cursor, page_from_lines, parse_bool
+from utils.response_cache import DataGenerations, ResponseCache, make_etag
+from utils.location_utils import LocationSettings, SiteIndex, parse_site, settings_with_sites, mirror_primary_site
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -34,12 +53,53 @@ CORS(app,
 
 # Storage files
 USERS_FILE = 'users.json'
-ATTENDANCE_FILE = 'attendance.json'
-MONTHLY_ATTENDANCE_FILE = 'monthly_attendance.json'
+ATTENDANCE_FILE = 'attendance.json'  # format lama, dimigrasi ke ATTENDANCE_LOG_FILE
+ATTENDANCE_LOG_FILE = 'attendance.jsonl'
+MONTHLY_ATTENDANCE_FILE = 'monthly_attendance.json'  # format lama, dimigrasi ke HISTORY_DIR
+HISTORY_DIR = 'history'
+ATTENDANCE_STATS_FILE = 'attendance_stats.json'
 LOCATION_SETTINGS_FILE = 'location_settings.json'
+ENCODINGS_FILE = 'face_encodings.bin'
+GALLERY_FILE = 'face_gallery.bin'
+DATA_GENERATION_FILE = 'data_generation.json'
+
+# STORAGE_BACKEND=sqlite: users & absensi di SQLite (models.py), encoding tetap di ENCODINGS_FILE
+USE_SQLITE = config.STORAGE_BACKEND == 'sqlite'
+
+# Encoding wajah disimpan terpisah dari users.json dalam file binary (memory-mapped)
+encoding_store = EncodingStore(ENCODINGS_FILE)
+
+# Gallery encoding wajah (matrix N x 128, centroid per user) untuk percepatan matching
+face_gallery = FaceGallery(
+    index=create_index(
+        config.GALLERY_INDEX,
+        nlist=config.GALLERY_IVF_NLIST,
+        nprobe=config.GALLERY_IVF_NPROBE,
+        min_size=config.GALLERY_IVF_MIN_SIZE
+    ),
+    templates=encoding_store,
+    template_margin=config.TEMPLATE_MARGIN,
+    quantization=None if config.GALLERY_QUANTIZATION == 'none' else config.GALLERY_QUANTIZATION,
+    rescore=config.GALLERY_RESCORE
+)
+
+# Semua worker memakai satu snapshot gallery (memory-mapped), lihat utils/shared_gallery.py
+shared_gallery = SharedGallery(GALLERY_FILE, encoding_store, face_gallery,
+                               config.GALLERY_PUBLISH_DELAY) if config.GALLERY_SHARED else None
+
+# Deteksi & encoding wajah berjalan di process pool, bukan di thread request
+face_engine = FaceEngine(config.ENGINE_WORKERS, config.ENGINE_MAX_PENDING, config.ENGINE_TIMEOUT)
+
+# Hasil absensi terakhir per user / per gambar untuk meredam submit berulang
+recent_recognitions = RecentRecognitions(config.RECENT_CACHE_TTL, config.RECENT_CACHE_SIZE,
+                                         config.RECENT_HASH_MAX_DISTANCE, config.RECENT_IMAGE_HASH)
 
-# Cache untuk percepatan
-face_encodings_cache = {}
+# Generasi data per domain (dinaikkan setiap write) untuk ETag & cache response GET
+data_generations = DataGenerations(DATA_GENERATION_FILE, ('users', 'attendance', 'location'))
+response_cache = ResponseCache(config.RESPONSE_CACHE_SIZE)
+
+# False di child process multiprocessing (mis. start method 'spawn' di Windows)
+IS_MAIN_PROCESS = multiprocessing.parent_process() is None
 
 # Password hashing functions
 def hash_password(password):
@@ -67,276 +127,583 @@ def verify_password(stored_password, provided_password):
     except:
         return False
 
+DEFAULT_LOCATION_SETTINGS = {
+    'enabled': False,
+    'latitude': -6.2088,
+    'longitude': 106.8456,
+    'radius': 100,
+    'location_name': 'Kantor Pusat'
+}
+
+# Settings lokasi + index-nya di memory, dibaca ulang hanya jika file berubah (mtime)
+location_settings_cache = LocationSettings(LOCATION_SETTINGS_FILE, DEFAULT_LOCATION_SETTINGS,
+                                           cell_size=config.LOCATION_GRID_CELL)
+
 # Load location settings
 def load_location_settings():
+    """Settings lokasi dengan daftar ``sites`` (format lama satu titik dikonversi)"""
     try:
-        if os.path.exists(LOCATION_SETTINGS_FILE):
-            with open(LOCATION_SETTINGS_FILE, 'r') as f:
-                return json.load(f)
-        # Default settings
-        return {
-            'enabled': False,
-            'latitude': -6.2088,
-            'longitude': 106.8456,
-            'radius': 100,
-            'location_name': 'Kantor Pusat'
-        }
+        return location_settings_cache.get()
     except Exception as e:
         logger.error(f"Error loading location settings: {str(e)}")
-        return {
-            'enabled': False,
-            'latitude': -6.2088,
-            'longitude': 106.8456,
-            'radius': 100,
-            'location_name': 'Kantor Pusat'
-        }
+        return settings_with_sites(DEFAULT_LOCATION_SETTINGS)
 
 # Save location settings
 def save_location_settings(settings):
     try:
-        with open(LOCATION_SETTINGS_FILE, 'w') as f:
+        settings = mirror_primary_site(settings_with_sites(settings))
+        tmp_path = LOCATION_SETTINGS_FILE + '.tmp'
+        with open(tmp_path, 'w') as f:
             json.dump(settings, f, indent=2)
+        os.replace(tmp_path, LOCATION_SETTINGS_FILE)
+        location_settings_cache.invalidate()
+        data_generations.bump('location')
         logger.info("Location settings saved successfully")
     except Exception as e:
         logger.error(f"Error saving location settings: {str(e)}")
 
-# Calculate distance between two coordinates (Haversine formula)
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """
-    Calculate distance between two coordinates in meters
-    using Haversine formula
-    """
-    R = 6371000  # Radius of Earth in meters
-    
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-    
-    a = (math.sin(delta_lat/2) * math.sin(delta_lat/2) +
-         math.cos(lat1_rad) * math.cos(lat2_rad) *
-         math.sin(delta_lon/2) * math.sin(delta_lon/2))
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    distance = R * c
-    return distance
+def update_location_settings_file(update):
+    """Read-modify-write settings lokasi di bawah file lock; ``update(settings)`` boleh raise ValueError"""
+    with file_lock(LOCATION_SETTINGS_FILE):
+        settings = load_location_settings()
+        result = update(settings)
+        save_location_settings(settings)
+    return result
+
+def get_location_index():
+    """(enabled, SiteIndex) dari cache settings lokasi"""
+    try:
+        return location_settings_cache.index()
+    except Exception as e:
+        logger.error(f"Error loading location settings: {str(e)}")
+        return False, SiteIndex([])
+
+def location_result_message(result):
+    site, distance = result['site'], result['distance']
+    if site is None:
+        return "Lokasi tidak valid. Belum ada lokasi absensi yang dikonfigurasi"
+    if result['valid']:
+        if site['type'] == 'polygon':
+            return f"Lokasi valid (di dalam area {site['name']})"
+        return f"Lokasi valid ({distance:.0f}m dari {site['name']})"
+    if site['type'] == 'polygon':
+        return f"Lokasi tidak valid. Anda berada {distance:.0f}m di luar area {site['name']}"
+    return f"Lokasi tidak valid. Anda berada {distance:.0f}m dari {site['name']} (max: {site['radius']:.0f}m)"
 
 # Validate location
 def validate_location(user_lat, user_lon):
     """
-    Validate if user location is within allowed radius
+    Validate if user location is inside one of the configured sites
     """
-    settings = load_location_settings()
+    enabled, index = get_location_index()
     
-    if not settings['enabled']:
+    if not enabled:
         return True, "Location validation disabled"
     
     if user_lat is None or user_lon is None:
         return False, "Location data not provided"
     
-    distance = calculate_distance(
-        settings['latitude'], 
-        settings['longitude'],
-        user_lat, 
-        user_lon
-    )
-    
-    if distance <= settings['radius']:
-        return True, f"Lokasi valid ({distance:.0f}m dari {settings['location_name']})"
-    else:
-        return False, f"Lokasi tidak valid. Anda berada {distance:.0f}m dari {settings['location_name']} (max: {settings['radius']}m)"
+    result = index.validate(user_lat, user_lon)
+    return result['valid'], location_result_message(result)
 
-# Load users from file
+# Load users (dilayani dari memory, reload hanya jika users.json berubah)
 def load_users():
     try:
-        if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'r') as f:
-                users = json.load(f)
-                for user_id, user_data in users.items():
-                    face_encodings_cache[user_id] = np.array(user_data['face_encoding'])
-                return users
-        return {}
+        return user_registry.get()
     except Exception as e:
         logger.error(f"Error loading users: {str(e)}")
         return {}
 
-def save_users(users):
-    try:
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, indent=2)
-        logger.info(f"Users saved successfully. Total users: {len(users)}")
-    except Exception as e:
-        logger.error(f"Error saving users: {str(e)}")
+def _on_users_reload(users):
+    """Dipanggil setiap users.json dibaca ulang dari disk"""
+    migrate_face_encodings(users)
+    if shared_gallery is not None:
+        shared_gallery.refresh()
+    else:
+        encoding_store.refresh()
+        face_gallery.sync(users, encoding_store)
+
+def migrate_face_encodings(users):
+    """
+    Pindahkan face_encoding lama di users.json ke encoding store, per
+    user: user_id yang tidak valid dilewati (encoding tetap di users.json)
+    """
+    migrated = {}
+    for user_id, user_data in users.items():
+        if 'face_encoding' not in user_data:
+            continue
+        try:
+            validate_user_id(user_id)
+            if user_id not in encoding_store:
+                encoding_store.add(user_id, user_data['face_encoding'])
+        except ValueError as e:
+            logger.warning(f"⚠️ Face encoding {user_id!r} not migrated: {str(e)}")
+            continue
+        migrated[user_id] = {key: value for key, value in user_data.items() if key != 'face_encoding'}
+    
+    if migrated:
+        try:
+            update_users(migrated)
+        except Exception as e:
+            # Encoding sudah di store; migrasi diulang pada reload berikutnya
+            logger.error(f"Error saving migrated users: {str(e)}")
+            return
+        logger.info(f"✅ Migrated {len(migrated)} face encodings to {ENCODINGS_FILE}")
+
+def update_users(changes):
+    """
+    Simpan perubahan users ``{user_id: data}`` (data None = hapus).
+    Raise jika gagal; cache registry hanya berubah jika tersimpan.
+    """
+    users = user_registry.update(changes)
+    data_generations.bump('users')
+    logger.info(f"Users saved successfully. Total users: {len(users)}")
+
+user_registry = UserRegistry(
+    db.SqliteUserSource() if USE_SQLITE else JsonUserFile(USERS_FILE),
+    on_reload=_on_users_reload
+)
 
-def load_attendance():
+def migrate_attendance_file():
+    """Konversi attendance.json lama ke journal attendance.jsonl (sekali saja)"""
     try:
-        if os.path.exists(ATTENDANCE_FILE):
+        with file_lock(ATTENDANCE_FILE):
+            if os.path.exists(ATTENDANCE_LOG_FILE) or not os.path.exists(ATTENDANCE_FILE):
+                return
             with open(ATTENDANCE_FILE, 'r') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    return data
-                else:
-                    logger.warning("Attendance file contains dictionary, converting to list")
-                    return []
-        return []
+                records = json.load(f)
+            if not isinstance(records, list):
+                logger.warning("Attendance file contains dictionary, converting to list")
+                records = []
+            attendance_journal.rewrite(records)
+            os.replace(ATTENDANCE_FILE, ATTENDANCE_FILE + '.bak')
+        logger.info(f"✅ Migrated {len(records)} attendance records to {ATTENDANCE_LOG_FILE}")
     except Exception as e:
-        logger.error(f"Error loading attendance: {str(e)}")
-        return []
+        logger.error(f"Error migrating attendance: {str(e)}")
+
+def append_attendance(record):
+    """Tambah satu record absensi di akhir journal (tanpa rewrite file)"""
+    append_attendance_many([record])
 
-def save_attendance(records):
+def append_attendance_many(records):
+    """Simpan banyak record absensi dalam satu write / satu transaksi"""
+    if not records:
+        return
+    if USE_SQLITE:
+        db.insert_attendance(records)
+    else:
+        attendance_journal.append_many(records)
+    
     try:
-        if not isinstance(records, list):
-            logger.error(f"Records is not a list: {type(records)}")
-            records = []
-            
-        with open(ATTENDANCE_FILE, 'w') as f:
-            json.dump(records, f, indent=2)
-        logger.info(f"Attendance records saved. Total records: {len(records)}")
+        attendance_stats.add_records(records)
     except Exception as e:
-        logger.error(f"Error saving attendance: {str(e)}")
+        # Agregat dihitung ulang saat startup jika tidak cocok
+        logger.error(f"Error updating attendance stats: {str(e)}")
+    # Setelah agregat diperbarui, agar response yang di-cache tidak tertinggal
+    data_generations.bump('attendance')
+
+attendance_journal = AttendanceJournal(
+    ATTENDANCE_LOG_FILE,
+    fsync_policy=config.ATTENDANCE_FSYNC,
+    fsync_interval=config.ATTENDANCE_FSYNC_INTERVAL
+)
+
+monthly_history = MonthlyHistory(HISTORY_DIR, fsync_policy=config.ATTENDANCE_FSYNC)
+
+def current_month_key():
+    return datetime.now().strftime("%Y-%m")
+
+def iter_month_records(month):
+    """Stream record absensi satu bulan tanpa memuat semuanya ke memory"""
+    if USE_SQLITE:
+        yield from db.iter_month_records(month)
+        return
+    yield from monthly_history.iter_records(month)
+    
+    # Record yang belum dipindah rollover masih ada di journal
+    first = attendance_journal.first_record()
+    if first is None or first.get('timestamp', '')[:7] > month:
+        return
+    for record in attendance_journal.iter_records():
+        if record.get('timestamp', '').startswith(month):
+            yield record
+
+def iter_month_lines_desc(month, position=None):
+    """
+    (position, baris JSONL) satu bulan, terbaru dulu: akhir journal lalu
+    partisi riwayat. ``position`` (sumber, offset): mulai dari baris
+    sebelum posisi itu.
+    """
+    source, end = position or (None, None)
+    if source in (None, 'journal'):
+        first = attendance_journal.first_record()
+        if first is not None and first.get('timestamp', '')[:7] <= month:
+            for offset, line in attendance_journal.iter_lines_reverse(end):
+                yield ('journal', offset), line
+        end = None
+    for offset, line in monthly_history.iter_lines_reverse(month, end):
+        yield ('history', offset), line
+
+def read_record_line(month, position):
+    """Baris di ``position`` (sumber, offset), atau None"""
+    source, offset = position
+    if source == 'journal':
+        return attendance_journal.read_line(offset)
+    if source == 'history':
+        return monthly_history.read_line(month, offset)
+    return None
 
-def load_monthly_attendance():
+def page_month_records(query):
+    """
+    Satu halaman record (terbaru dulu) sesuai filter dan cursor ``query``.
+    Return (records, positions); positions None untuk SQLite (keyset).
+    """
+    if USE_SQLITE:
+        return db.page_month_records(query), None
+    
+    # Posisi di cursor dipakai jika baris di sana masih record cursor
+    # (journal bisa sudah ditulis ulang oleh rollover); jika tidak, cari ulang
+    if query.before is not None and query.position is not None:
+        line = read_record_line(query.month, query.position)
+        if line is not None and query.is_cursor_record(line):
+            return page_from_lines(iter_month_lines_desc(query.month, query.position), query, resumed=True)
+    return page_from_lines(iter_month_lines_desc(query.month), query)
+
+def count_month_records(month):
+    """Jumlah record satu bulan dari agregat (tanpa scan)"""
+    return attendance_stats.get()['months'].get(month, {}).get('count', 0)
+
+def parse_record_query(month):
+    """RecordQuery dari query string (limit, cursor, filter); ValueError jika tidak valid"""
     try:
-        if os.path.exists(MONTHLY_ATTENDANCE_FILE):
-            with open(MONTHLY_ATTENDANCE_FILE, 'r') as f:
-                return json.load(f)
-        return {}
-    except Exception as e:
-        logger.error(f"Error loading monthly attendance: {str(e)}")
-        return {}
+        datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise ValueError(f"Format bulan tidak valid (YYYY-MM): {month}")
+    
+    try:
+        limit = int(request.args.get('limit', config.RECORDS_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise ValueError("limit harus bilangan bulat positif")
+    
+    date_from = request.args.get('date_from') or None
+    date_to = request.args.get('date_to') or None
+    for value in (date_from, date_to):
+        if value is not None:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise ValueError(f"Format tanggal tidak valid (YYYY-MM-DD): {value}")
+    
+    cursor = request.args.get('cursor')
+    before, position = decode_cursor(cursor) if cursor else (None, None)
+    return RecordQuery(
+        month,
+        min(limit, config.RECORDS_MAX_PAGE_SIZE),
+        before=before,
+        position=position,
+        user_id=request.args.get('user_id') or None,
+        date_from=date_from,
+        date_to=date_to,
+        location_verified=parse_bool(request.args.get('location_verified'))
+    )
 
-def save_monthly_attendance(monthly_data):
+def records_page_response(query):
+    records, positions = page_month_records(query)
+    next_cursor = None
+    if len(records) > query.limit:
+        records = records[:query.limit]
+        next_cursor = encode_cursor(records[-1], positions[query.limit - 1] if positions else None)
+    
+    return jsonify({
+        'success': True,
+        'month': query.month,
+        # Jumlah dengan filter butuh scan satu bulan, jadi hanya dikirim tanpa filter
+        'total_records': None if query.filtered else count_month_records(query.month),
+        'limit': query.limit,
+        'filters': query.filters,
+        'records': records,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
+def month_range(start_month, end_month):
+    """Semua bulan YYYY-MM dari start_month sampai end_month (inklusif)"""
+    start = datetime.strptime(start_month, "%Y-%m")
+    end = datetime.strptime(end_month, "%Y-%m")
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def list_attendance_months():
+    """Semua bulan yang punya data absensi, terbaru dulu"""
+    if USE_SQLITE:
+        return db.available_months()
+    
+    # Bulan lalu yang belum dipindah rollover masih ada di journal
+    return sorted(set(monthly_history.months()) | set(attendance_journal.months()), reverse=True)
+
+def count_current_month_records():
+    if USE_SQLITE:
+        return db.count_records(current_month_key())
+    # Hitungan journal disimpan per offset: hanya baris baru yang dibaca
+    return attendance_journal.count()
+
+def iter_all_attendance():
+    """Stream semua record absensi (bulan berjalan + riwayat)"""
+    if USE_SQLITE:
+        yield from db.iter_all_records()
+        return
+    for month in sorted(monthly_history.months()):
+        yield from monthly_history.iter_records(month)
+    yield from attendance_journal.iter_records()
+
+def count_all_attendance():
+    if USE_SQLITE:
+        return db.count_records()
+    return attendance_journal.count() + monthly_history.record_count()
+
+def ensure_attendance_stats():
+    """Hitung ulang agregat jika belum ada atau tidak cocok dengan data tersimpan"""
     try:
-        with open(MONTHLY_ATTENDANCE_FILE, 'w') as f:
-            json.dump(monthly_data, f, indent=2)
-        logger.info(f"Monthly attendance saved for {len(monthly_data)} months")
+        if attendance_stats.exists() and attendance_stats.get()['total'] == count_all_attendance():
+            return
+        attendance_stats.rebuild(iter_all_attendance())
     except Exception as e:
-        logger.error(f"Error saving monthly attendance: {str(e)}")
+        logger.error(f"Error rebuilding attendance stats: {str(e)}")
+
+def attendance_statistics():
+    """Statistik absensi untuk dashboard (dari agregat, tanpa scan record)"""
+    return attendance_stats.summary(datetime.now().strftime("%Y-%m-%d"), current_month_key())
+
+attendance_stats = AttendanceStats(ATTENDANCE_STATS_FILE)
 
 # Auto-cleanup
 def cleanup_old_attendance():
+    """
+    Pindahkan record bulan lalu dari journal ke partisi riwayat.
+    Hanya record yang sudah melewati batas bulan (prefix journal) yang
+    dibaca dan dipindah; jika record tertua masih bulan ini, tidak ada
+    file yang disentuh.
+    """
+    if USE_SQLITE:
+        # Di SQLite semua bulan ada di satu tabel ber-index, tidak ada yang perlu dipindah
+        return 0
+    
     try:
-        records = load_attendance()
-        current_month = datetime.now().strftime("%Y-%m")
+        current_month = current_month_key()
         
-        current_month_records = []
-        old_records = []
+        oldest = attendance_journal.first_record()
+        if oldest is None or oldest['timestamp'][:7] >= current_month:
+            return 0
         
-        for record in records:
-            record_date = datetime.fromisoformat(record['timestamp'])
-            record_month = record_date.strftime("%Y-%m")
-            
-            if record_month == current_month:
-                current_month_records.append(record)
-            else:
-                old_records.append(record)
-        
-        if old_records:
-            monthly_data = load_monthly_attendance()
-            
+        def move_to_history(old_records):
+            records_by_month = {}
             for record in old_records:
-                record_date = datetime.fromisoformat(record['timestamp'])
-                month_key = record_date.strftime("%Y-%m")
-                
-                if month_key not in monthly_data:
-                    monthly_data[month_key] = []
-                
-                existing_timestamps = [r.get('timestamp') for r in monthly_data[month_key]]
-                if record['timestamp'] not in existing_timestamps:
-                    monthly_data[month_key].append(record)
-            
-            save_monthly_attendance(monthly_data)
-            logger.info(f"✅ Pindahkan {len(old_records)} data ke riwayat bulanan")
+                records_by_month.setdefault(record['timestamp'][:7], []).append(record)
+            for month_key, month_records in records_by_month.items():
+                monthly_history.merge_records(month_key, month_records)
         
-        save_attendance(current_month_records)
-        logger.info(f"✅ Cleanup selesai. Data bulan ini: {len(current_month_records)} records")
+        moved_count = attendance_journal.move_prefix(
+            lambda record: record['timestamp'][:7] < current_month,
+            move_to_history
+        )
+        if moved_count:
+            data_generations.bump('attendance')
+        logger.info(f"✅ Pindahkan {moved_count} data ke riwayat bulanan")
         
-        return len(old_records)
+        return moved_count
         
     except Exception as e:
         logger.error(f"❌ Error cleaning up attendance: {str(e)}")
         return 0
 
-# Face recognition functions
-def extract_face_encodings(image_array):
-    try:
-        start_time = time.time()
-        
-        rgb_image = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
-        
-        height, width = rgb_image.shape[:2]
-        max_size = 800
-        if max(height, width) > max_size:
-            scale = max_size / max(height, width)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            rgb_image = cv2.resize(rgb_image, (new_width, new_height))
-        
-        face_locations = face_recognition.face_locations(rgb_image, model="hog")
-        
-        if face_locations:
-            face_encodings = face_recognition.face_encodings(rgb_image, face_locations)
-            
-            processing_time = time.time() - start_time
-            logger.info(f"✅ Detected {len(face_encodings)} face(s) in {processing_time:.2f}s")
-            
-            return face_encodings
-        
-        logger.warning("❌ No faces detected in image")
-        return None
-        
-    except Exception as e:
-        logger.error(f"❌ Error in face encoding: {str(e)}")
-        return None
+def run_cleanup_in_background():
+    thread = threading.Thread(target=cleanup_old_attendance, name='attendance-cleanup', daemon=True)
+    thread.start()
+    return thread
+
+def start_rollover_scheduler(interval):
+    """Jalankan cleanup_old_attendance di background setiap ``interval`` detik"""
+    def loop():
+        while True:
+            cleanup_old_attendance()
+            time.sleep(interval)
+    
+    thread = threading.Thread(target=loop, name='attendance-rollover', daemon=True)
+    thread.start()
+    logger.info(f"🕒 Attendance rollover scheduled every {interval}s")
+    return thread
+
+def refresh_face_gallery(users):
+    """Ambil perubahan encoding dari worker lain (register / hapus / template baru)"""
+    if shared_gallery is not None:
+        # Jalur request: snapshot yang tertinggal ditulis ulang di background
+        shared_gallery.refresh(wait=False)
+    elif encoding_store.refresh():
+        face_gallery.sync(users, encoding_store)
+
+def add_face_templates(entries, replace=False, wait=True):
+    """
+    Simpan template wajah [(user_id, encoding), ...] dalam satu write
+    lalu perbarui centroid user tersebut di gallery. ``wait=False``:
+    snapshot shared gallery boleh menyusul (publish di background).
+    """
+    encoding_store.add_many(entries, replace=replace, max_templates=config.MAX_TEMPLATES)
+    data_generations.bump('users')
+    if shared_gallery is not None:
+        shared_gallery.refresh(wait=wait)
+    else:
+        for user_id in dict.fromkeys(user_id for user_id, _ in entries):
+            face_gallery.add(user_id, encoding_store.get(user_id), encoding_store.version(user_id))
+
+def remove_face_templates(user_id):
+    encoding_store.remove(user_id)
+    data_generations.bump('users')
+    if shared_gallery is not None:
+        shared_gallery.refresh()
+    else:
+        face_gallery.remove(user_id)
+
+def save_learned_templates(entries):
+    """Dipanggil template_learner di thread background, satu write untuk semua entry"""
+    # Hanya centroid user yang sudah terdaftar yang bergeser: publish snapshot digabung
+    add_face_templates(entries, wait=False)
+    logger.info(f"🧩 {len(entries)} learned face template(s) saved")
+
+# Template hasil check-in disimpan di background, bukan di thread request
+template_learner = TemplateLearner(save_learned_templates, config.TEMPLATE_LEARN_QUEUE)
+
+def learn_face_template(best_match, encoding):
+    """
+    Check-in yang cukup yakin tapi tidak identik dengan template yang ada
+    (mis. pencahayaan berbeda) diantrikan sebagai template tambahan,
+    selama user belum punya MAX_TEMPLATES template.
+    """
+    similarity = best_match['similarity']
+    if not config.TEMPLATE_LEARN_SIMILARITY <= similarity < config.TEMPLATE_NOVELTY_SIMILARITY:
+        return False
+    if encoding_store.template_count(best_match['user_id']) >= config.MAX_TEMPLATES:
+        return False
+    return template_learner.submit(best_match['user_id'], encoding)
 
 def find_best_match(unknown_encoding, users_db, similarity_threshold=0.6):
     best_match = None
     best_similarity = 0
+    refresh_face_gallery(users_db)
     
-    unknown_encoding = np.array(unknown_encoding)
-    
-    for user_id, user_data in users_db.items():
-        try:
-            if user_id in face_encodings_cache:
-                stored_encoding = face_encodings_cache[user_id]
-            else:
-                stored_encoding = np.array(user_data['face_encoding'])
-                face_encodings_cache[user_id] = stored_encoding
-            
-            face_distance = face_recognition.face_distance([stored_encoding], unknown_encoding)[0]
-            similarity = 1 - face_distance
-            
-            if similarity >= 0.7:
-                confidence = "HIGH"
-            elif similarity >= 0.6:
-                confidence = "MEDIUM"
-            else:
-                confidence = "LOW"
-            
-            if similarity > best_similarity and similarity >= similarity_threshold:
-                best_similarity = similarity
-                best_match = {
-                    'user_id': user_id,
-                    'name': user_data['name'],
-                    'similarity': float(similarity),
-                    'confidence': confidence,
-                    'distance': float(face_distance)
-                }
-                
-        except Exception as e:
-            logger.error(f"❌ Error comparing with user {user_id}: {str(e)}")
+    for match in face_gallery.match(unknown_encoding, similarity_threshold, top_k=5):
+        user_data = users_db.get(match['user_id'])
+        if user_data is None:
             continue
+        
+        best_similarity = match['similarity']
+        best_match = dict(match, name=user_data['name'])
+        break
     
     return best_match, best_similarity
 
-def validate_image_quality(image):
+def find_best_matches(unknown_encodings, users_db, similarity_threshold=0.6):
+    """find_best_match untuk banyak encoding dalam satu operasi matrix"""
+    results = []
+    refresh_face_gallery(users_db)
+    for matches in face_gallery.match_many(unknown_encodings, similarity_threshold, top_k=5):
+        best_match, best_similarity = None, 0
+        for match in matches:
+            user_data = users_db.get(match['user_id'])
+            if user_data is not None:
+                best_similarity = match['similarity']
+                best_match = dict(match, name=user_data['name'])
+                break
+        results.append((best_match, best_similarity))
+    return results
+
+def build_attendance_record(best_match, location_valid, location_message, latitude, longitude):
+    now = datetime.now()
+    return {
+        'user_id': best_match['user_id'],
+        'name': best_match['name'],
+        'similarity': float(best_match['similarity']),
+        'confidence': best_match['confidence'],
+        'timestamp': now.isoformat(),
+        'date': now.strftime("%Y-%m-%d"),
+        'time': now.strftime("%H:%M:%S"),
+        'status': 'present',
+        'location_verified': location_valid,
+        'location_message': location_message,
+        'user_latitude': latitude,
+        'user_longitude': longitude
+    }
+
+def attendance_result(best_match, record):
+    """Response absensi satu user (juga disimpan di recent_recognitions)"""
+    return {
+        'success': True,
+        'recognized_user': {
+            'user_id': best_match['user_id'],
+            'name': best_match['name'],
+            'similarity': float(best_match['similarity']),
+            'confidence': best_match['confidence']
+        },
+        'location': {
+            'verified': record['location_verified'],
+            'message': record['location_message']
+        },
+        'timestamp': record['timestamp']
+    }
+
+def duplicate_attendance_response(cached):
+    """Hasil absensi sebelumnya untuk submit berulang (tidak ada record baru)"""
+    return dict(cached, duplicate=True,
+                message=f"Absensi sudah tercatat pada {cached['timestamp'][11:19]}")
+
+def run_face_engine(fn, *args):
+    """
+    Jalankan job di face engine. Return (result, None) atau
+    (None, error_response) jika engine sibuk / timeout.
+    """
+    results, error_response = run_face_engine_many(fn, [args])
+    return (results[0] if results else None), error_response
+
+def run_face_engine_many(fn, args_list):
+    """Seperti run_face_engine, tapi semua job dijalankan paralel"""
     try:
-        height, width = image.shape[:2]
+        return face_engine.run_many(fn, args_list), None
+    except EngineBusy:
+        logger.warning("⏳ Face engine busy, request rejected")
+        response = jsonify({
+            'success': False,
+            'busy': True,
+            'error': 'Server sedang sibuk, silakan coba lagi beberapa detik lagi'
+        })
+        response.headers['Retry-After'] = '2'
+        return None, (response, 503)
+    except EngineTimeout:
+        logger.warning("⏳ Face engine timeout")
+        return None, (jsonify({
+            'success': False,
+            'error': 'Proses deteksi wajah terlalu lama, silakan coba lagi'
+        }), 504)
+
+def validate_image_quality(image, original_size=None):
+    """
+    Cek ukuran & kecerahan. ``image`` adalah gambar RGB hasil decode_image
+    (sudah diperkecil), ``original_size`` (width, height) ukuran upload asli.
+    """
+    try:
+        if original_size:
+            width, height = original_size
+        else:
+            height, width = image.shape[:2]
         
         if height < 150 or width < 150:
             return False, "Image terlalu kecil"
         
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
         brightness = np.mean(gray)
         if brightness < 50:
             return False, "Gambar terlalu gelap"
@@ -391,6 +758,39 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def cached_response(*domains):
+    """
+    GET dengan ETag dari generasi data ``domains``: If-None-Match yang
+    cocok dijawab 304 tanpa menyentuh storage, body JSON disimpan di
+    response_cache dan dipakai ulang sampai ada write di domain tersebut.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Tanggal ikut di key: statistik "hari ini" / bulan berjalan berganti tanpa write
+            key = (request.path, request.query_string, datetime.now().strftime("%Y-%m-%d"),
+                   data_generations.current(domains))
+            etag = make_etag(*key)
+            
+            if etag in request.if_none_match:
+                response_cache.not_modified += 1
+                response = Response(status=304)
+            else:
+                body = response_cache.get(key)
+                if body is None:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    response_cache.put(key, response.get_data())
+                else:
+                    response = Response(body, mimetype='application/json')
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
 # ==================== USER ENDPOINTS ====================
 
 @app.route('/')
@@ -405,17 +805,35 @@ def home():
 def system_status():
     try:
         users = load_users()
-        attendance_records = load_attendance()
-        monthly_data = load_monthly_attendance()
+        current_month = current_month_key()
+        historical_months = [month for month in list_attendance_months() if month != current_month]
         location_settings = load_location_settings()
         
         return jsonify({
             'success': True,
             'status': 'operational',
+            'storage_backend': config.STORAGE_BACKEND,
             'users_registered': len(users),
-            'current_month_records': len(attendance_records),
-            'historical_months': len(monthly_data),
-            'cache_size': len(face_encodings_cache),
+            'current_month_records': count_current_month_records(),
+            'historical_months': len(historical_months),
+            'cache_size': len(face_gallery),
+            'user_registry': user_registry.stats(),
+            'face_engine': face_engine.status(),
+            'recent_recognitions': recent_recognitions.stats(),
+            'location_settings': location_settings_cache.stats(),
+            'response_cache': response_cache.stats(),
+            'face_templates': {
+                'users': len(encoding_store),
+                'templates': encoding_store.template_total,
+                'template_checks': face_gallery.template_checks,
+                'learner': template_learner.status()
+            },
+            'face_gallery': {
+                'users': len(face_gallery),
+                'quantization': config.GALLERY_QUANTIZATION,
+                'bytes_per_user': face_gallery.bytes_per_user,
+                'shared': shared_gallery.stats() if shared_gallery is not None else None
+            },
             'location_enabled': location_settings['enabled'],
             'current_month': datetime.now().strftime("%B %Y")
         })
@@ -475,13 +893,116 @@ def user_login():
         logger.error(f"❌ Login error: {str(e)}")
         return jsonify({'success': False, 'error': f'Login gagal: {str(e)}'}), 500
 
+def extract_single_face_encodings(files):
+    """
+    Encoding dari beberapa foto yang masing-masing harus berisi tepat satu
+    wajah. Return (encodings, None) atau (None, error_response).
+    """
+    images = []
+    for file in files:
+        image, original_size = decode_image(file.read())
+        
+        if image is None:
+            return None, (jsonify({'success': False, 'error': f'Invalid image file: {file.filename}'}), 400)
+        
+        quality_ok, quality_msg = validate_image_quality(image, original_size)
+        if not quality_ok:
+            return None, (jsonify({'success': False, 'error': f'Kualitas gambar buruk: {quality_msg}'}), 400)
+        
+        images.append(image)
+    
+    results, error_response = run_face_engine_many(extract_face_encodings, [(image,) for image in images])
+    if error_response:
+        return None, error_response
+    
+    encodings = []
+    for file, face_encodings in zip(files, results):
+        if face_encodings is None:
+            return None, (jsonify({
+                'success': False, 
+                'error': 'Tidak ada wajah yang terdeteksi. Pastikan wajah jelas dan pencahayaan baik.'
+            }), 400)
+        
+        if len(face_encodings) > 1:
+            return None, (jsonify({
+                'success': False, 
+                'error': f'Multiple faces detected ({len(face_encodings)}). Upload gambar dengan satu wajah saja.'
+            }), 400)
+        
+        encodings.append(face_encodings[0])
+    
+    # Semua foto harus wajah orang yang sama
+    reference = np.asarray(encodings[0])
+    for encoding in encodings[1:]:
+        similarity = 1.0 - float(np.linalg.norm(np.asarray(encoding) - reference))
+        if similarity < 0.6:
+            return None, (jsonify({
+                'success': False,
+                'error': f'Foto tidak berisi wajah orang yang sama (similarity: {similarity:.2%})'
+            }), 400)
+    
+    return encodings, None
+
+def enroll_new_users(candidates, users, save=True):
+    """
+    Daftarkan banyak user baru sekaligus. ``candidates``: list dict
+    (user_id, name, password / password_hash, encoding). Duplikat wajah
+    dicek terhadap gallery dan antar kandidat dalam satu pass, lalu semua
+    yang lolos disimpan dengan satu write encoding store dan satu
+    update_users (``save=False``: hanya cek). ``users`` tidak diubah.
+    Return list hasil per kandidat (urutan sama).
+    """
+    encodings = [candidate['encoding'] for candidate in candidates]
+    gallery_matches = find_best_matches(encodings, users, similarity_threshold=0.7) if encodings else []
+    batch_matches = batch_duplicates(encodings, similarity_threshold=0.7)
+    registered_at = datetime.now().isoformat()
+    
+    results = []
+    accepted = []
+    registered = {}
+    for candidate, (existing_match, similarity), duplicate in zip(candidates, gallery_matches, batch_matches):
+        result = {'user_id': candidate['user_id'], 'name': candidate['name']}
+        if candidate['user_id'] in users or candidate['user_id'] in registered:
+            result['error'] = 'User ID already exists'
+        elif existing_match:
+            result['error'] = f'Wajah sudah terdaftar sebagai {existing_match["name"]} (similarity: {similarity:.2%})'
+        elif duplicate:
+            previous, similarity = duplicate
+            result['error'] = (f'Wajah sama dengan {candidates[previous]["user_id"]} di batch ini '
+                               f'(similarity: {similarity:.2%})')
+        else:
+            registered[candidate['user_id']] = {
+                'name': candidate['name'],
+                'password_hash': candidate.get('password_hash') or hash_password(candidate['password']),
+                'registered_at': registered_at
+            }
+            accepted.append((candidate['user_id'], candidate['encoding']))
+        result['success'] = 'error' not in result
+        results.append(result)
+    
+    if accepted and save:
+        add_face_templates(accepted, replace=True)
+        try:
+            update_users(registered)
+        except Exception:
+            for user_id in registered:
+                remove_face_templates(user_id)
+            raise
+        logger.info(f"✅ Bulk enrolment: {len(accepted)}/{len(candidates)} users registered")
+    
+    return results
+
 @app.route('/register', methods=['POST'])
 def register_user():
     try:
-        if 'file' not in request.files:
+        # Satu foto ('file') atau beberapa foto ('files') sebagai template wajah
+        files = request.files.getlist('files') or request.files.getlist('file')
+        if not files:
             return jsonify({'success': False, 'error': 'No file provided'}), 400
         
-        file = request.files['file']
+        if len(files) > config.MAX_TEMPLATES:
+            return jsonify({'success': False, 'error': f'Maksimal {config.MAX_TEMPLATES} foto'}), 400
+        
         name = request.form.get('name', '').strip()
         user_id = request.form.get('user_id', '').strip()
         password = request.form.get('password', '').strip()  # 🔥 NEW: Get password
@@ -492,36 +1013,21 @@ def register_user():
         if len(password) < 4:
             return jsonify({'success': False, 'error': 'Password minimal 4 karakter'}), 400
         
-        file_bytes = np.frombuffer(file.read(), np.uint8)
-        image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            return jsonify({'success': False, 'error': 'Invalid image file'}), 400
-        
-        quality_ok, quality_msg = validate_image_quality(image)
-        if not quality_ok:
-            return jsonify({'success': False, 'error': f'Kualitas gambar buruk: {quality_msg}'}), 400
-        
-        face_encodings = extract_face_encodings(image)
-        
-        if face_encodings is None:
-            return jsonify({
-                'success': False, 
-                'error': 'Tidak ada wajah yang terdeteksi. Pastikan wajah jelas dan pencahayaan baik.'
-            }), 400
-        
-        if len(face_encodings) > 1:
-            return jsonify({
-                'success': False, 
-                'error': f'Multiple faces detected ({len(face_encodings)}). Upload gambar dengan satu wajah saja.'
-            }), 400
+        id_error = user_id_error(user_id)
+        if id_error:
+            return jsonify({'success': False, 'error': id_error}), 400
         
+        # Cek murah dulu sebelum deteksi & encoding wajah
         users = load_users()
         
         if user_id in users:
             return jsonify({'success': False, 'error': 'User ID already exists'}), 400
         
-        new_encoding = face_encodings[0]
+        face_encodings, error_response = extract_single_face_encodings(files)
+        if error_response:
+            return error_response
+        
+        new_encoding = np.mean(np.asarray(face_encodings, dtype=np.float32), axis=0)
         existing_match, similarity = find_best_match(new_encoding, users, 0.7)
         if existing_match:
             return jsonify({
@@ -532,17 +1038,21 @@ def register_user():
         # 🔥 NEW: Hash password sebelum disimpan
         password_hash = hash_password(password)
         
-        users[user_id] = {
+        user_data = {
             'name': name,
-            'face_encoding': new_encoding.tolist(),
             'password_hash': password_hash,  # 🔥 NEW: Store hashed password
             'registered_at': datetime.now().isoformat()
         }
         
-        face_encodings_cache[user_id] = new_encoding
-        save_users(users)
+        # User baru terlihat (login, /users) hanya setelah template dan users tersimpan
+        add_face_templates([(user_id, encoding) for encoding in face_encodings], replace=True)
+        try:
+            update_users({user_id: user_data})
+        except Exception:
+            remove_face_templates(user_id)
+            raise
         
-        logger.info(f"✅ User registered: {name} ({user_id}) dengan password")
+        logger.info(f"✅ User registered: {name} ({user_id}) dengan password, {len(face_encodings)} template")
         
         return jsonify({
             'success': True,
@@ -550,7 +1060,8 @@ def register_user():
             'data': {
                 'user_id': user_id,
                 'name': name,
-                'registered_at': users[user_id]['registered_at']
+                'registered_at': user_data['registered_at'],
+                'templates': len(face_encodings)
             }
         })
         
@@ -569,17 +1080,25 @@ def take_attendance():
         longitude = request.form.get('longitude', type=float)
         
         file = request.files['file']
-        file_bytes = np.frombuffer(file.read(), np.uint8)
-        image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+        image, original_size = decode_image(file.read())
         
         if image is None:
             return jsonify({'success': False, 'error': 'Invalid image file'}), 400
         
-        quality_ok, quality_msg = validate_image_quality(image)
+        # Opt-in (RECENT_IMAGE_HASH): submit ulang gambar yang sama dijawab tanpa encode ulang
+        image_hash = image_dhash(image) if recent_recognitions.hash_enabled else None
+        cached = recent_recognitions.lookup_image(image_hash) if image_hash is not None else None
+        if cached:
+            logger.info(f"♻️ Duplicate attendance (image): {cached['recognized_user']['name']}")
+            return jsonify(duplicate_attendance_response(cached))
+        
+        quality_ok, quality_msg = validate_image_quality(image, original_size)
         if not quality_ok:
             return jsonify({'success': False, 'error': f'Kualitas gambar buruk: {quality_msg}'}), 400
         
-        face_encodings = extract_face_encodings(image)
+        face_encodings, error_response = run_face_engine(extract_face_encodings, image)
+        if error_response:
+            return error_response
         
         if face_encodings is None:
             return jsonify({
@@ -614,46 +1133,25 @@ def take_attendance():
                     }
                 })
             
-            # Load and save attendance record
-            attendance_records = load_attendance()
+            # User yang sama baru saja absen: jangan tulis record duplikat
+            cached = recent_recognitions.lookup_user(best_match['user_id'])
+            if cached:
+                recent_recognitions.remember(best_match['user_id'], cached, image_hash)
+                logger.info(f"♻️ Duplicate attendance (user): {best_match['name']}")
+                return jsonify(duplicate_attendance_response(cached))
             
-            if not isinstance(attendance_records, list):
-                logger.warning("Attendance records is not a list, resetting to empty list")
-                attendance_records = []
+            attendance_data = build_attendance_record(best_match, location_valid, location_message,
+                                                      latitude, longitude)
             
-            attendance_data = {
-                'user_id': best_match['user_id'],
-                'name': best_match['name'],
-                'similarity': float(similarity),
-                'confidence': best_match['confidence'],
-                'timestamp': datetime.now().isoformat(),
-                'date': datetime.now().strftime("%Y-%m-%d"),
-                'time': datetime.now().strftime("%H:%M:%S"),
-                'status': 'present',
-                'location_verified': location_valid,
-                'location_message': location_message,
-                'user_latitude': latitude,
-                'user_longitude': longitude
-            }
-            
-            attendance_records.append(attendance_data)
-            save_attendance(attendance_records)
+            append_attendance(attendance_data)
+            learn_face_template(best_match, face_encodings[0])
             
             logger.info(f"✅ Attendance: {best_match['name']} ({similarity:.2%}) - Location: {location_message}")
             
-            return jsonify({
-                'success': True,
-                'recognized_user': {
-                    'user_id': best_match['user_id'],
-                    'name': best_match['name'],
-                    'similarity': float(similarity),
-                    'confidence': best_match['confidence']
-                },
-                'location': {
-                    'verified': location_valid,
-                    'message': location_message
-                }
-            })
+            result = attendance_result(best_match, attendance_data)
+            recent_recognitions.remember(best_match['user_id'], result, image_hash)
+            
+            return jsonify(result)
         else:
             return jsonify({
                 'success': True,
@@ -665,17 +1163,252 @@ def take_attendance():
         logger.error(f"❌ Attendance error: {str(e)}")
         return jsonify({'success': False, 'error': f'Absensi failed: {str(e)}'}), 500
 
+@app.route('/attendance/batch', methods=['POST'])
+def take_attendance_batch():
+    """
+    Absensi banyak wajah sekaligus (kiosk / gate camera): banyak gambar
+    di field 'files' dan/atau banyak wajah per gambar. Semua wajah
+    dicocokkan dalam satu operasi matrix dan semua user yang dikenali
+    dicatat dalam satu write.
+    """
+    try:
+        files = request.files.getlist('files') or request.files.getlist('file')
+        if not files:
+            return jsonify({'success': False, 'error': 'No file provided'}), 400
+        
+        max_images = min(config.BATCH_MAX_IMAGES, face_engine.max_pending)
+        if len(files) > max_images:
+            return jsonify({'success': False, 'error': f'Maksimal {max_images} gambar per batch'}), 400
+        
+        latitude = request.form.get('latitude', type=float)
+        longitude = request.form.get('longitude', type=float)
+        
+        results = []
+        images = []
+        for index, file in enumerate(files):
+            result = {'image': index, 'filename': file.filename, 'faces': []}
+            results.append(result)
+            
+            image, original_size = decode_image(file.read())
+            if image is None:
+                result['error'] = 'Invalid image file'
+                continue
+            
+            quality_ok, quality_msg = validate_image_quality(image, original_size)
+            if not quality_ok:
+                result['error'] = f'Kualitas gambar buruk: {quality_msg}'
+                continue
+            
+            images.append((index, image))
+        
+        encodings_per_image = []
+        if images:
+            encodings_per_image, error_response = run_face_engine_many(
+                extract_face_encodings, [(image,) for _, image in images])
+            if error_response:
+                return error_response
+        
+        face_image_indexes = []
+        all_encodings = []
+        for (index, _), face_encodings in zip(images, encodings_per_image):
+            if not face_encodings:
+                results[index]['message'] = 'Tidak ada wajah yang terdeteksi'
+                continue
+            for encoding in face_encodings:
+                face_image_indexes.append(index)
+                all_encodings.append(encoding)
+        
+        users = load_users()
+        if all_encodings and not users:
+            return jsonify({'success': False, 'error': 'Tidak ada user terdaftar'})
+        
+        recognized = {}
+        matches = find_best_matches(all_encodings, users, similarity_threshold=0.6) if all_encodings else []
+        for index, (best_match, similarity) in zip(face_image_indexes, matches):
+            face = {'face': len(results[index]['faces']), 'recognized_user': None}
+            if best_match:
+                face['recognized_user'] = {
+                    'user_id': best_match['user_id'],
+                    'name': best_match['name'],
+                    'similarity': float(similarity),
+                    'confidence': best_match['confidence']
+                }
+                previous = recognized.get(best_match['user_id'])
+                if previous is None or similarity > previous['similarity']:
+                    recognized[best_match['user_id']] = best_match
+            else:
+                face['message'] = f'Wajah tidak dikenali (similarity tertinggi: {similarity:.2%})'
+            results[index]['faces'].append(face)
+        
+        response = {
+            'success': True,
+            'images': len(files),
+            'faces_detected': len(all_encodings),
+            'recognized_count': len(recognized),
+            'recorded': [],
+            'duplicates': [],
+            'results': results
+        }
+        
+        if recognized:
+            location_valid, location_message = validate_location(latitude, longitude)
+            response['location'] = {'verified': location_valid, 'message': location_message}
+            
+            if not location_valid:
+                response['success'] = False
+                response['error'] = location_message
+                return jsonify(response)
+            
+            # Jendela duplikat sama dengan /attendance: user yang baru saja absen tidak dicatat lagi
+            records, new_matches, duplicates = [], [], []
+            for user_id, best_match in recognized.items():
+                cached = recent_recognitions.lookup_user(user_id)
+                if cached:
+                    duplicates.append({'user_id': user_id, 'timestamp': cached['timestamp']})
+                    continue
+                records.append(build_attendance_record(best_match, location_valid, location_message,
+                                                       latitude, longitude))
+                new_matches.append(best_match)
+            
+            append_attendance_many(records)
+            for best_match, record in zip(new_matches, records):
+                recent_recognitions.remember(best_match['user_id'], attendance_result(best_match, record))
+            response['recorded'] = [record['user_id'] for record in records]
+            response['duplicates'] = duplicates
+            
+            logger.info(f"✅ Batch attendance: {len(records)} user(s) from {len(all_encodings)} face(s) "
+                        f"in {len(files)} image(s), {len(duplicates)} duplicate(s)")
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        logger.error(f"❌ Batch attendance error: {str(e)}")
+        return jsonify({'success': False, 'error': f'Absensi batch failed: {str(e)}'}), 500
+
+@app.route('/attendance/stream', methods=['POST'])
+def take_attendance_stream():
+    """
+    Absensi dari stream video gate camera. Body berisi frame JPEG
+    berurutan, masing-masing diawali panjang 4 byte (lihat
+    stream_client.py). Wajah diikuti antar frame dengan FaceTracker
+    sehingga setiap wajah cukup di-encode sekali, dan setiap track
+    menghasilkan satu event absensi. Response berupa NDJSON: satu baris
+    per event, ditutup baris ringkasan (frame diproses vs encoding).
+    """
+    try:
+        latitude = request.args.get('latitude', type=float)
+        longitude = request.args.get('longitude', type=float)
+        
+        location_valid, location_message = validate_location(latitude, longitude)
+        if not location_valid:
+            return jsonify({'success': False, 'error': location_message})
+        
+        if not load_users():
+            return jsonify({'success': False, 'error': 'Tidak ada user terdaftar'})
+        
+        stream = request.stream
+        
+    except Exception as e:
+        logger.error(f"❌ Stream attendance error: {str(e)}")
+        return jsonify({'success': False, 'error': f'Absensi stream failed: {str(e)}'}), 500
+    
+    def generate():
+        tracker = FaceTracker(config.STREAM_IOU_THRESHOLD, config.STREAM_MAX_MISSED,
+                              config.STREAM_SETTLE_SIMILARITY, config.STREAM_REENCODE_INTERVAL)
+        summary = {'frames_received': 0, 'frames_processed': 0, 'frames_dropped': 0, 'encodings_computed': 0}
+        recorded_users = set()
+        started = time.time()
+        
+        try:
+            for frame_index, data in enumerate(iter_stream_frames(stream, config.STREAM_MAX_FRAME_BYTES)):
+                summary['frames_received'] += 1
+                
+                image, _ = decode_image(data)
+                if image is None:
+                    summary['frames_dropped'] += 1
+                    continue
+                
+                try:
+                    boxes, encodings = face_engine.run(detect_and_encode_new, image,
+                                                       tracker.settled_boxes(frame_index), tracker.iou_threshold)
+                except (EngineBusy, EngineTimeout):
+                    # Stream tidak menunggu: frame dilewati, wajah tetap ada di frame berikutnya
+                    summary['frames_dropped'] += 1
+                    continue
+                
+                summary['frames_processed'] += 1
+                tracks = tracker.update(boxes, frame_index)
+                if not encodings:
+                    continue
+                
+                indexes = list(encodings)
+                summary['encodings_computed'] += len(indexes)
+                matches = find_best_matches([encodings[j] for j in indexes], load_users(), similarity_threshold=0.6)
+                
+                records, events = [], []
+                for j, (best_match, similarity) in zip(indexes, matches):
+                    track = tracks[j]
+                    track.last_encoded = frame_index
+                    track.encodings += 1
+                    if best_match and (track.match is None or similarity > track.match['similarity']):
+                        track.match = best_match
+                    
+                    if track.match is None or track.reported:
+                        continue
+                    track.reported = True
+                    
+                    user_id = track.match['user_id']
+                    already_recorded = user_id in recorded_users
+                    if not already_recorded:
+                        recorded_users.add(user_id)
+                        records.append(build_attendance_record(track.match, location_valid, location_message,
+                                                               latitude, longitude))
+                    events.append({
+                        'event': 'attendance',
+                        'frame': frame_index,
+                        'track_id': track.track_id,
+                        'user_id': user_id,
+                        'name': track.match['name'],
+                        'similarity': float(track.match['similarity']),
+                        'confidence': track.match['confidence'],
+                        'recorded': not already_recorded
+                    })
+                
+                append_attendance_many(records)
+                for event in events:
+                    yield json.dumps(event) + '\n'
+        
+        except Exception as e:
+            logger.error(f"❌ Stream attendance error: {str(e)}")
+            yield json.dumps({'event': 'error', 'error': str(e)}) + '\n'
+        
+        summary.update({
+            'event': 'summary',
+            'tracks': tracker.total_tracks,
+            'recorded': len(recorded_users),
+            'duration_seconds': round(time.time() - started, 3)
+        })
+        logger.info(f"✅ Stream attendance: {summary['frames_processed']} frames processed, "
+                    f"{summary['encodings_computed']} encodings computed, {summary['recorded']} recorded")
+        yield json.dumps(summary) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/users', methods=['GET'])
+@cached_response('users')
 def get_users():
     try:
         users = load_users()
+        # Jumlah template bisa berubah dari worker lain
+        encoding_store.refresh()
         users_list = {}
         for user_id, user_data in users.items():
             users_list[user_id] = {
                 'user_id': user_id,
                 'name': user_data['name'],
                 'registered_at': user_data['registered_at'],
-                'has_password': 'password_hash' in user_data  # 🔥 NEW: Info password
+                'has_password': 'password_hash' in user_data,  # 🔥 NEW: Info password
+                'templates': encoding_store.template_count(user_id)
             }
         
         return jsonify({
@@ -688,20 +1421,16 @@ def get_users():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/attendance-records', methods=['GET'])
+@cached_response('attendance')
 def get_attendance_records():
+    """Record bulan berjalan, terbaru dulu, per halaman (limit + cursor)"""
     try:
-        records = load_attendance()
+        try:
+            query = parse_record_query(current_month_key())
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        if not isinstance(records, list):
-            logger.warning("Records is not a list, returning empty list")
-            records = []
-            
-        records.reverse()
-        return jsonify({
-            'success': True,
-            'total_records': len(records),
-            'records': records[:100]
-        })
+        return records_page_response(query)
     except Exception as e:
         logger.error(f"Error getting attendance records: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -765,6 +1494,7 @@ def verify_token():
 # Location settings endpoints
 @app.route('/admin/location-settings', methods=['GET'])
 @token_required
+@cached_response('location')
 def get_location_settings():
     """Get current location settings"""
     try:
@@ -789,17 +1519,32 @@ def update_location_settings():
             if field not in data:
                 return jsonify({'success': False, 'error': f'Field {field} is required'}), 400
         
-        settings = {
-            'enabled': bool(data['enabled']),
-            'latitude': float(data['latitude']),
-            'longitude': float(data['longitude']),
-            'radius': int(data['radius']),
-            'location_name': data['location_name'].strip()
-        }
+        try:
+            primary = parse_site({
+                'name': data['location_name'],
+                'latitude': data['latitude'],
+                'longitude': data['longitude'],
+                'radius': data['radius']
+            })
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        def apply(settings):
+            # Lokasi utama (lingkaran pertama) diganti, lokasi lain tetap
+            settings['enabled'] = bool(data['enabled'])
+            sites = settings['sites']
+            for i, site in enumerate(sites):
+                if site['type'] == 'circle':
+                    primary['id'] = site['id']
+                    sites[i] = primary
+                    break
+            else:
+                sites.insert(0, primary)
         
-        save_location_settings(settings)
+        update_location_settings_file(apply)
+        settings = load_location_settings()
         
-        logger.info(f"✅ Location settings updated: {settings}")
+        logger.info(f"✅ Location settings updated: {primary}")
         
         return jsonify({
             'success': True,
@@ -811,85 +1556,163 @@ def update_location_settings():
         logger.error(f"❌ Error updating location settings: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/admin/location-sites', methods=['GET'])
+@token_required
+@cached_response('location')
+def get_location_sites():
+    """Daftar lokasi absensi (lingkaran / polygon)"""
+    try:
+        settings = load_location_settings()
+        return jsonify({
+            'success': True,
+            'enabled': settings['enabled'],
+            'sites': settings['sites']
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/location-sites', methods=['POST'])
+@token_required
+def add_location_site():
+    """Tambah lokasi absensi"""
+    try:
+        try:
+            site = parse_site(request.get_json())
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        def apply(settings):
+            if any(existing['id'] == site['id'] for existing in settings['sites']):
+                raise ValueError(f"Lokasi {site['id']} sudah ada")
+            settings['sites'].append(site)
+        
+        try:
+            update_location_settings_file(apply)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        logger.info(f"📍 Location site added: {site['id']} ({site['type']})")
+        return jsonify({'success': True, 'message': f"Lokasi {site['name']} ditambahkan", 'site': site}), 201
+    except Exception as e:
+        logger.error(f"❌ Error adding location site: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/location-sites/<site_id>', methods=['PUT'])
+@token_required
+def update_location_site(site_id):
+    """Ubah lokasi absensi"""
+    try:
+        try:
+            site = parse_site(request.get_json(), site_id=site_id)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        def apply(settings):
+            for i, existing in enumerate(settings['sites']):
+                if existing['id'] == site_id:
+                    settings['sites'][i] = site
+                    return True
+            return False
+        
+        if not update_location_settings_file(apply):
+            return jsonify({'success': False, 'error': 'Lokasi tidak ditemukan'}), 404
+        
+        logger.info(f"📍 Location site updated: {site_id}")
+        return jsonify({'success': True, 'message': f"Lokasi {site['name']} diperbarui", 'site': site})
+    except Exception as e:
+        logger.error(f"❌ Error updating location site: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/location-sites/<site_id>', methods=['DELETE'])
+@token_required
+def delete_location_site(site_id):
+    """Hapus lokasi absensi"""
+    try:
+        def apply(settings):
+            sites = [site for site in settings['sites'] if site['id'] != site_id]
+            removed = len(sites) != len(settings['sites'])
+            settings['sites'] = sites
+            return removed
+        
+        if not update_location_settings_file(apply):
+            return jsonify({'success': False, 'error': 'Lokasi tidak ditemukan'}), 404
+        
+        logger.info(f"📍 Location site deleted: {site_id}")
+        return jsonify({'success': True, 'message': f'Lokasi {site_id} dihapus'})
+    except Exception as e:
+        logger.error(f"❌ Error deleting location site: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/admin/test-location', methods=['POST'])
 @token_required
 def test_location():
-    """Test location validation"""
+    """
+    Test location validation. Satu titik (latitude, longitude) atau
+    banyak titik sekaligus: points = [{latitude, longitude}, ...]
+    """
     try:
         data = request.get_json()
-        latitude = data.get('latitude')
-        longitude = data.get('longitude')
+        points = data.get('points')
+        if points is None:
+            points = [{'latitude': data.get('latitude'), 'longitude': data.get('longitude')}]
         
-        if latitude is None or longitude is None:
+        try:
+            latitudes = [float(point['latitude']) for point in points]
+            longitudes = [float(point['longitude']) for point in points]
+        except (TypeError, KeyError, ValueError):
             return jsonify({'success': False, 'error': 'Latitude and longitude are required'}), 400
         
-        settings = load_location_settings()
-        distance = calculate_distance(
-            settings['latitude'], 
-            settings['longitude'],
-            latitude, 
-            longitude
-        )
-        
-        is_valid = distance <= settings['radius']
+        _, index = get_location_index()
+        results = []
+        for latitude, longitude, result in zip(latitudes, longitudes, index.validate_many(latitudes, longitudes)):
+            site = result['site']
+            results.append({
+                'latitude': latitude,
+                'longitude': longitude,
+                'valid': result['valid'],
+                'site_id': site['id'] if site else None,
+                'distance': round(result['distance'], 2) if result['distance'] is not None else None,
+                'max_radius': site.get('radius') if site else None,
+                'message': location_result_message(result)
+            })
         
-        return jsonify({
-            'success': True,
-            'valid': is_valid,
-            'distance': round(distance, 2),
-            'max_radius': settings['radius'],
-            'message': f"Jarak: {distance:.0f}m dari {settings['location_name']} ({'Valid' if is_valid else 'Tidak Valid'})"
-        })
+        if 'points' in data:
+            return jsonify({
+                'success': True,
+                'valid_count': sum(result['valid'] for result in results),
+                'results': results
+            })
+        return jsonify(dict(results[0], success=True))
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/admin/dashboard', methods=['GET'])
 @token_required
+@cached_response('users', 'attendance', 'location')
 def admin_dashboard():
     """Admin dashboard statistics"""
     try:
         users = load_users()
-        attendance_records = load_attendance()
-        monthly_data = load_monthly_attendance()
+        stats = attendance_statistics()
         location_settings = load_location_settings()
         
-        # Hitung statistics
-        total_attendance_today = len([
-            record for record in attendance_records 
-            if datetime.fromisoformat(record['timestamp']).date() == datetime.now().date()
-        ])
-        
-        # Hitung lokasi invalid hari ini
-        invalid_location_today = len([
-            record for record in attendance_records 
-            if (datetime.fromisoformat(record['timestamp']).date() == datetime.now().date() and 
-                not record.get('location_verified', True))
-        ])
-        
-        # Hitung total semua bulan
-        total_all_months = len(attendance_records)
-        for month_records in monthly_data.values():
-            total_all_months += len(month_records)
-        
         # Hitung rata-rata similarity
         avg_similarity = 85.5
-        if attendance_records:
-            similarities = [r['similarity'] for r in attendance_records if 'similarity' in r]
-            if similarities:
-                avg_similarity = (sum(similarities) / len(similarities)) * 100
+        if stats['average_similarity'] is not None:
+            avg_similarity = stats['average_similarity'] * 100
         
         return jsonify({
             'success': True,
             'statistics': {
                 'totalUsers': len(users),
-                'totalTransactions': total_all_months,
+                'totalTransactions': stats['total_all_months'],
                 'averageScore': round(avg_similarity, 1),
-                'activeMonths': len(monthly_data) + (1 if attendance_records else 0),
-                'total_attendance_today': total_attendance_today,
-                'invalid_location_today': invalid_location_today,
-                'total_attendance_current_month': len(attendance_records),
-                'historical_months': len(monthly_data),
+                'activeMonths': stats['active_months'],
+                'total_attendance_today': stats['today'],
+                'invalid_location_today': stats['invalid_location_today'],
+                'total_attendance_current_month': stats['current_month'],
+                'historical_months': stats['historical_months'],
                 'location_enabled': location_settings['enabled']
             }
         })
@@ -898,49 +1721,35 @@ def admin_dashboard():
 
 @app.route('/admin/monthly-records', methods=['GET'])
 @token_required
+@cached_response('attendance')
 def get_monthly_records():
-    """Get attendance records for specific month"""
+    """
+    Get attendance records for specific month, terbaru dulu per halaman.
+    Query: limit, cursor (next_cursor halaman sebelumnya), user_id,
+    date_from / date_to (YYYY-MM-DD), location_verified.
+    """
     try:
         month = request.args.get('month', datetime.now().strftime("%Y-%m"))
+        try:
+            query = parse_record_query(month)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        logger.info(f"📊 Request monthly records for: {month}")
-        
-        if month == datetime.now().strftime("%Y-%m"):
-            records = load_attendance()
-            logger.info(f"📁 Loaded {len(records)} records from current month")
-        else:
-            monthly_data = load_monthly_attendance()
-            records = monthly_data.get(month, [])
-            logger.info(f"📁 Loaded {len(records)} records from historical data for {month}")
-        
-        records.reverse()
+        logger.info(f"📊 Request monthly records for: {month} (limit {query.limit})")
         
-        return jsonify({
-            'success': True,
-            'month': month,
-            'total_records': len(records),
-            'records': records
-        })
+        return records_page_response(query)
     except Exception as e:
         logger.error(f"Error getting monthly records: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/admin/available-months', methods=['GET'])
 @token_required
+@cached_response('attendance')
 def get_available_months():
     """Get list of available months with data"""
     try:
-        monthly_data = load_monthly_attendance()
-        current_month = datetime.now().strftime("%Y-%m")
-        
-        months = list(monthly_data.keys())
-        
-        current_records = load_attendance()
-        if current_records:
-            if current_month not in months:
-                months.append(current_month)
-        
-        months.sort(reverse=True)
+        current_month = current_month_key()
+        months = list_attendance_months()
         
         logger.info(f"📅 Available months: {months}")
         
@@ -953,6 +1762,144 @@ def get_available_months():
         logger.error(f"Error getting available months: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/admin/users/bulk', methods=['POST'])
+@token_required
+def bulk_register_users():
+    """
+    Registrasi banyak user sekaligus (onboarding cabang baru).
+    Form: ``files`` (satu foto per user) dan ``users`` berisi JSON list
+    {user_id, name, password, file}; ``file`` = nama file foto, atau
+    urutan yang sama dengan ``files`` jika tidak diisi.
+    """
+    try:
+        files = request.files.getlist('files')
+        entries = json.loads(request.form.get('users', '[]'))
+        if not files or not isinstance(entries, list) or not entries:
+            return jsonify({'success': False, 'error': 'files dan users diperlukan'}), 400
+        
+        if len(entries) > config.BULK_MAX_USERS:
+            return jsonify({'success': False, 'error': f'Maksimal {config.BULK_MAX_USERS} user per request'}), 400
+        
+        files_by_name = {file.filename: file for file in files}
+        users = load_users()
+        seen = set()
+        results = [None] * len(entries)
+        candidates = []
+        images = []
+        
+        for index, entry in enumerate(entries):
+            user_id = str(entry.get('user_id', '')).strip()
+            name = str(entry.get('name', '')).strip()
+            password = str(entry.get('password', '')).strip()
+            file = files_by_name.get(entry['file']) if entry.get('file') else (
+                files[index] if index < len(files) else None)
+            
+            id_error = user_id_error(user_id)
+            error = None
+            if not user_id or not name or not password:
+                error = 'Name, User ID, dan Password diperlukan'
+            elif len(password) < 4:
+                error = 'Password minimal 4 karakter'
+            elif id_error:
+                error = id_error
+            elif user_id in users or user_id in seen:
+                error = 'User ID already exists'
+            elif file is None:
+                error = 'No file provided'
+            else:
+                image, original_size = decode_image(file.read())
+                if image is None:
+                    error = 'Invalid image file'
+                else:
+                    quality_ok, quality_msg = validate_image_quality(image, original_size)
+                    if not quality_ok:
+                        error = f'Kualitas gambar buruk: {quality_msg}'
+            
+            if error:
+                results[index] = {'user_id': user_id, 'name': name, 'success': False, 'error': error}
+                continue
+            
+            seen.add(user_id)
+            candidates.append({'index': index, 'user_id': user_id, 'name': name, 'password': password})
+            images.append(image)
+        
+        # Encoding dalam potongan sebesar kapasitas antrian face engine
+        face_results = []
+        chunk_size = max(1, face_engine.max_pending)
+        for start in range(0, len(images), chunk_size):
+            chunk, error_response = run_face_engine_many(
+                extract_face_encodings, [(image,) for image in images[start:start + chunk_size]])
+            if error_response:
+                return error_response
+            face_results.extend(chunk)
+        
+        valid = []
+        for candidate, face_encodings in zip(candidates, face_results):
+            if not face_encodings:
+                error = 'Tidak ada wajah yang terdeteksi'
+            elif len(face_encodings) > 1:
+                error = f'Multiple faces detected ({len(face_encodings)})'
+            else:
+                candidate['encoding'] = face_encodings[0]
+                valid.append(candidate)
+                continue
+            results[candidate['index']] = {'user_id': candidate['user_id'], 'name': candidate['name'],
+                                           'success': False, 'error': error}
+        
+        for candidate, result in zip(valid, enroll_new_users(valid, users)):
+            results[candidate['index']] = result
+        
+        registered = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': True,
+            'registered': registered,
+            'failed': len(results) - registered,
+            'results': results
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Bulk registration error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/users/<user_id>/templates', methods=['POST'])
+@token_required
+def add_user_templates(user_id):
+    """Tambah foto wajah (template) untuk user yang sudah terdaftar"""
+    try:
+        files = request.files.getlist('files') or request.files.getlist('file')
+        if not files:
+            return jsonify({'success': False, 'error': 'No file provided'}), 400
+        
+        if len(files) > config.MAX_TEMPLATES:
+            return jsonify({'success': False, 'error': f'Maksimal {config.MAX_TEMPLATES} foto'}), 400
+        
+        users = load_users()
+        if user_id not in users:
+            return jsonify({'success': False, 'error': 'User tidak ditemukan'}), 404
+        
+        face_encodings, error_response = extract_single_face_encodings(files)
+        if error_response:
+            return error_response
+        
+        matches = face_gallery.match(np.mean(np.asarray(face_encodings, dtype=np.float32), axis=0),
+                                     similarity_threshold=0.6, top_k=1)
+        if not matches or matches[0]['user_id'] != user_id:
+            return jsonify({'success': False, 'error': f'Wajah tidak cocok dengan {users[user_id]["name"]}'}), 400
+        
+        add_face_templates([(user_id, encoding) for encoding in face_encodings])
+        
+        logger.info(f"🧩 {len(face_encodings)} template added for {users[user_id]['name']} ({user_id})")
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(face_encodings)} template ditambahkan untuk {users[user_id]["name"]}',
+            'templates': encoding_store.template_count(user_id)
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Error adding templates: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/admin/users/<user_id>', methods=['DELETE'])
 @token_required
 def delete_user(user_id):
@@ -965,12 +1912,9 @@ def delete_user(user_id):
         if user_id not in users:
             return jsonify({'success': False, 'error': 'User tidak ditemukan'}), 404
         
-        if user_id in face_encodings_cache:
-            del face_encodings_cache[user_id]
-        
         deleted_name = users[user_id]['name']
-        del users[user_id]
-        save_users(users)
+        update_users({user_id: None})
+        remove_face_templates(user_id)
         
         logger.info(f"✅ User deleted: {deleted_name} ({user_id})")
         
@@ -986,59 +1930,86 @@ def delete_user(user_id):
 @app.route('/admin/export-excel', methods=['GET'])
 @token_required
 def export_excel():
-    """Export attendance data to Excel"""
+    """
+    Export data absensi. ``month`` atau rentang ``from``/``to`` (YYYY-MM),
+    ``format`` xlsx (default), csv atau parquet. Record dibaca dari
+    storage dan ditulis ke response per chunk, tidak pernah dimuat
+    seluruhnya ke memory.
+    """
     try:
-        month = request.args.get('month', datetime.now().strftime("%Y-%m"))
+        month = request.args.get('month', current_month_key())
+        start_month = request.args.get('from', month)
+        end_month = request.args.get('to', start_month)
+        export_format = request.args.get('format', 'xlsx').lower()
         
-        if month == datetime.now().strftime("%Y-%m"):
-            records = load_attendance()
-        else:
-            monthly_data = load_monthly_attendance()
-            records = monthly_data.get(month, [])
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'success': False, 'error': f'Format harus salah satu dari: {", ".join(EXPORT_FORMATS)}'}), 400
         
-        if not records:
-            return jsonify({'success': False, 'error': 'Tidak ada data untuk diexport'}), 404
+        try:
+            months = month_range(start_month, end_month)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Format bulan harus YYYY-MM'}), 400
         
-        # Create DataFrame
-        df_data = []
-        for record in records:
-            df_data.append({
-                'User ID': record['user_id'],
-                'Nama': record['name'],
-                'Tanggal': record['date'],
-                'Waktu': record['time'],
-                'Tingkat Kemiripan': f"{record['similarity']:.2%}",
-                'Confidence': record['confidence'],
-                'Status': record['status'],
-                'Lokasi Valid': 'Ya' if record.get('location_verified', True) else 'Tidak',
-                'Pesan Lokasi': record.get('location_message', 'Tidak tersedia'),
-                'Latitude': record.get('user_latitude', ''),
-                'Longitude': record.get('user_longitude', '')
-            })
+        if not months or len(months) > 120:
+            return jsonify({'success': False, 'error': 'Rentang bulan tidak valid (maksimal 120 bulan)'}), 400
         
-        df = pd.DataFrame(df_data)
+        records = itertools.chain.from_iterable(iter_month_records(m) for m in months)
+        first = next(records, None)
+        if first is None:
+            return jsonify({'success': False, 'error': 'Tidak ada data untuk diexport'}), 404
         
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=f'Absensi {month}', index=False)
+        label = start_month if start_month == end_month else f'{start_month}_{end_month}'
+        sheet_name = f'Absensi {start_month}' if start_month == end_month else f'Absensi {start_month} - {end_month}'
+        try:
+            body = iter_export(itertools.chain([first], records), export_format, sheet_name)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        output.seek(0)
+        logger.info(f"📤 Export {export_format}: {', '.join(months) if len(months) <= 3 else label}")
         
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'absensi_{month}.xlsx'
+        return Response(
+            stream_with_context(body),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename=absensi_{label}.{export_format}'}
         )
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/admin/gallery/recall-check', methods=['GET'])
+@token_required
+def gallery_recall_check():
+    """Bandingkan hasil gallery index (ANN) dengan brute-force"""
+    try:
+        refresh_face_gallery(load_users())
+        sample_size = request.args.get('sample', 500, type=int)
+        threshold = request.args.get('threshold', 0.6, type=float)
+        
+        result = face_gallery.recall_check(similarity_threshold=threshold, sample_size=sample_size)
+        logger.info(f"🔎 Gallery recall check: {result['found']}/{result['expected_matches']} ({result['recall']:.2%})")
+        
+        return jsonify({
+            'success': True,
+            'index': config.GALLERY_INDEX,
+            'gallery_size': len(face_gallery),
+            **result
+        })
+    except Exception as e:
+        logger.error(f"❌ Recall check error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/admin/cleanup', methods=['POST'])
 @token_required
 def cleanup_data():
     """Manual cleanup of old attendance data"""
     try:
+        if request.args.get('background', 'false').lower() == 'true':
+            run_cleanup_in_background()
+            return jsonify({
+                'success': True,
+                'message': 'Data cleanup berjalan di background.'
+            }), 202
+        
         moved_count = cleanup_old_attendance()
         return jsonify({
             'success': True,
@@ -1060,23 +2031,45 @@ def internal_error(error):
 def method_not_allowed(error):
     return jsonify({'success': False, 'error': 'Method not allowed'}), 405
 
+def run_startup_tasks():
+    """Migrasi file format lama + cek agregat absensi sebelum melayani request"""
+    migrate_attendance_file()
+    if not USE_SQLITE:
+        monthly_history.migrate_legacy(MONTHLY_ATTENDANCE_FILE)
+    ensure_attendance_stats()
+
+def start_background_services():
+    """Scheduler rollover + warm-up face engine, hanya di process yang melayani request"""
+    # Rollover berjalan di background, tidak menahan startup
+    if not USE_SQLITE and config.ROLLOVER_INTERVAL > 0:
+        start_rollover_scheduler(config.ROLLOVER_INTERVAL)
+    
+    # Load model di child process engine sebelum request pertama
+    threading.Thread(target=face_engine.warm_up, name='face-engine-warmup', daemon=True).start()
+
+# Child process face engine tidak menjalankan startup: dengan start method 'spawn'
+# (Windows) setiap child mengimpor ulang app.py
+if IS_MAIN_PROCESS:
+    run_startup_tasks()
+    # Di-import (gunicorn, bulk_enroll.py); untuk `python app.py` lihat di bawah
+    if __name__ != '__main__':
+        start_background_services()
+
 if __name__ == '__main__':
+    DEBUG = True
+    
     # Pre-load data
     load_users()
     
     # Create files if they don't exist
-    if not os.path.exists(USERS_FILE):
-        save_users({})
+    if not USE_SQLITE and not os.path.exists(USERS_FILE):
+        update_users({})
         logger.info("Created new users file")
     
-    if not os.path.exists(ATTENDANCE_FILE):
-        save_attendance([])
+    if not USE_SQLITE and not os.path.exists(ATTENDANCE_LOG_FILE):
+        attendance_journal.rewrite([])
         logger.info("Created new attendance file")
     
-    if not os.path.exists(MONTHLY_ATTENDANCE_FILE):
-        save_monthly_attendance({})
-        logger.info("Created new monthly attendance file")
-    
     if not os.path.exists(LOCATION_SETTINGS_FILE):
         save_location_settings({
             'enabled': False,
@@ -1087,12 +2080,14 @@ if __name__ == '__main__':
         })
         logger.info("Created new location settings file")
     
-    # Auto-cleanup on startup
-    cleanup_old_attendance()
-    
     logger.info("🚀 Starting Face Recognition API with Login & Password...")
     logger.info("🔐 Admin Login: username='admin', password='admin123'")
     logger.info("👤 User Login: Available with User ID & Password")
     logger.info("📍 Location Verification: Available")
     
-    app.run(debug=True, host='127.0.0.1', port=5000)
\ No newline at end of file
+    # Dengan reloader (debug) process pengawas juga menjalankan file ini tapi tidak
+    # melayani request; service hanya dijalankan di child-nya (WERKZEUG_RUN_MAIN)
+    if not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
+    
+    app.run(debug=DEBUG, host='127.0.0.1', port=5000)
\ No newline at end of file
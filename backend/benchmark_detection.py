@@ -0,0 +1,108 @@
+"""
+Benchmark deteksi wajah: DETECTION_MODE 'two_stage' vs 'full' pada
+folder foto nyata (mis. foto grup dari /attendance/batch).
+
+Untuk setiap foto kedua mode dijalankan; wajah dipasangkan per box
+(IoU), lalu dilaporkan wajah yang hanya ditemukan full-frame, jarak
+encoding pasangan, dan waktu per foto. Dengan ``--encodings`` setiap
+wajah juga dicocokkan ke gallery (encoding store) dan top-1 kedua mode
+dibandingkan, termasuk wajah terdaftar yang terlewat oleh two_stage.
+
+    python benchmark_detection.py uploads/ --encodings face_encodings.bin
+"""
+import os
+import time
+import argparse
+
+import numpy as np
+
+from utils.encoding_store import EncodingStore
+from utils.face_utils import FaceGallery, decode_image, locate_faces, encode_located
+from utils.face_tracker import match_boxes
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+MODES = ('full', 'two_stage')
+
+
+def detect(image, mode):
+    started = time.perf_counter()
+    boxes, cropped = locate_faces(image, mode)
+    encodings = encode_located(image, boxes, cropped)
+    return boxes, encodings, time.perf_counter() - started
+
+
+def top1(gallery, encoding, threshold):
+    if gallery is None:
+        return None
+    matches = gallery.match(encoding, threshold, top_k=1)
+    return matches[0]['user_id'] if matches else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark deteksi two_stage vs full")
+    parser.add_argument('images', help="Folder foto")
+    parser.add_argument('--encodings', help="Encoding store (face_encodings.bin) untuk membandingkan match")
+    parser.add_argument('--threshold', type=float, default=0.6)
+    parser.add_argument('--iou', type=float, default=0.3)
+    args = parser.parse_args()
+
+    gallery = None
+    if args.encodings:
+        store = EncodingStore(args.encodings)
+        gallery = FaceGallery(initial_capacity=max(1, len(store)), templates=store)
+        for user_id, encoding in store.items():
+            gallery.add(user_id, encoding)
+
+    paths = sorted(os.path.join(args.images, name) for name in os.listdir(args.images)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    totals = {mode: {'faces': 0, 'seconds': 0.0} for mode in MODES}
+    fewer_images, missed_faces, missed_users, different_top1 = 0, 0, 0, 0
+    distances = []
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            image, _ = decode_image(f.read())
+        if image is None:
+            print(f"{path}: gambar tidak valid, dilewati")
+            continue
+
+        results = {}
+        for mode in MODES:
+            results[mode] = detect(image, mode)
+            totals[mode]['faces'] += len(results[mode][0])
+            totals[mode]['seconds'] += results[mode][2]
+
+        full_boxes, full_encodings, _ = results['full']
+        stage_boxes, stage_encodings, _ = results['two_stage']
+        pairs = match_boxes(full_boxes, stage_boxes, args.iou)
+        if len(stage_boxes) < len(full_boxes):
+            fewer_images += 1
+
+        paired = {i for i, _ in pairs}
+        for i, j in pairs:
+            distances.append(float(np.linalg.norm(full_encodings[i] - stage_encodings[j])))
+            if top1(gallery, full_encodings[i], args.threshold) != top1(gallery, stage_encodings[j], args.threshold):
+                different_top1 += 1
+        for i in range(len(full_boxes)):
+            if i not in paired:
+                missed_faces += 1
+                if top1(gallery, full_encodings[i], args.threshold) is not None:
+                    missed_users += 1
+
+    images = max(1, len(paths))
+    print(f"{len(paths)} images")
+    print(f"{'mode':<10} {'faces':>6} {'ms/image':>9}")
+    for mode in MODES:
+        print(f"{mode:<10} {totals[mode]['faces']:>6} {totals[mode]['seconds'] * 1000 / images:>9.1f}")
+    print(f"images where two_stage found fewer faces: {fewer_images}")
+    print(f"faces found only full-frame: {missed_faces}")
+    if distances:
+        print(f"paired faces: {len(distances)}, encoding distance mean {np.mean(distances):.4f} "
+              f"max {np.max(distances):.4f}")
+    if gallery is not None:
+        print(f"paired faces with a different top-1 user: {different_top1}")
+        print(f"registered users missed by two_stage: {missed_users}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Registrasi massal offline dari folder foto + CSV (tanpa HTTP).
+
+CSV berisi kolom ``user_id,name`` dan opsional ``password`` serta
+``file`` (nama file di folder foto). Tanpa kolom ``file`` foto dicari
+sebagai ``<user_id>.jpg/.jpeg/.png``. Deteksi wajah, encoding dan hash
+password dikerjakan paralel di face engine (semua core), duplikat dicek
+terhadap gallery dan antar foto, lalu semua user disimpan dalam satu
+write.
+
+    python bulk_enroll.py users/ karyawan.csv --default-password 1234
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def encode_enrollment_image(path, password):
+    """
+    Job face engine: (encoding, password_hash, error) untuk satu foto.
+    Berjalan di child process, ``app`` sudah ter-load dari parent.
+    """
+    import app
+    from utils.face_utils import decode_image, extract_face_encodings
+
+    with open(path, 'rb') as f:
+        image, original_size = decode_image(f.read())
+    if image is None:
+        return None, None, 'Invalid image file'
+
+    quality_ok, quality_msg = app.validate_image_quality(image, original_size)
+    if not quality_ok:
+        return None, None, f'Kualitas gambar buruk: {quality_msg}'
+
+    face_encodings = extract_face_encodings(image)
+    if not face_encodings:
+        return None, None, 'Tidak ada wajah yang terdeteksi'
+    if len(face_encodings) > 1:
+        return None, None, f'Multiple faces detected ({len(face_encodings)})'
+    return face_encodings[0], app.hash_password(password), None
+
+
+def find_image(directory, row):
+    if row.get('file'):
+        path = os.path.join(directory, row['file'])
+        return path if os.path.isfile(path) else None
+    for extension in IMAGE_EXTENSIONS:
+        path = os.path.join(directory, row['user_id'] + extension)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def read_rows(csv_path, directory, default_password, existing_users):
+    """Return (jobs, failures): jobs = list (row, image_path) yang siap di-encode"""
+    from utils.encoding_store import user_id_error
+
+    jobs, failures, seen = [], [], set()
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            row['password'] = row.get('password') or default_password or ''
+            user_id, name = row.get('user_id', ''), row.get('name', '')
+            id_error = user_id_error(user_id)
+
+            error = None
+            if not user_id or not name:
+                error = 'Name dan User ID diperlukan'
+            elif len(row['password']) < 4:
+                error = 'Password minimal 4 karakter'
+            elif id_error:
+                error = id_error
+            elif user_id in existing_users or user_id in seen:
+                error = 'User ID already exists'
+            else:
+                path = find_image(directory, row)
+                if path is None:
+                    error = 'Foto tidak ditemukan'
+
+            if error:
+                failures.append({'user_id': user_id, 'name': name, 'success': False, 'error': error})
+            else:
+                seen.add(user_id)
+                jobs.append((row, path))
+    return jobs, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registrasi massal dari folder foto + CSV")
+    parser.add_argument('directory', help="folder berisi foto")
+    parser.add_argument('csv', help="CSV dengan kolom user_id,name[,password][,file]")
+    parser.add_argument('--default-password', help="password untuk baris tanpa kolom password")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--dry-run', action='store_true', help="encode & cek duplikat tanpa menyimpan")
+    args = parser.parse_args()
+
+    directory = os.path.abspath(args.directory)
+    csv_path = os.path.abspath(args.csv)
+
+    # Pakai semua core, tanpa scheduler rollover; file data relatif ke folder backend
+    os.environ.setdefault('ENGINE_WORKERS', str(args.workers))
+    os.environ.setdefault('ENGINE_MAX_PENDING', str(max(1, args.workers) * 4))
+    os.environ.setdefault('ENGINE_TIMEOUT', '3600')
+    os.environ.setdefault('ROLLOVER_INTERVAL', '0')
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+    import app
+
+    users = app.load_users()
+    jobs, results = read_rows(csv_path, directory, args.default_password, users)
+    total = len(jobs)
+    print(f"📂 {total} foto akan diproses ({len(results)} baris dilewati)")
+
+    started = time.time()
+    candidates = []
+    chunk_size = max(1, app.face_engine.max_pending)
+    for start in range(0, total, chunk_size):
+        chunk = jobs[start:start + chunk_size]
+        outputs = app.face_engine.run_many(encode_enrollment_image,
+                                           [(path, row['password']) for row, path in chunk])
+        for (row, _), (encoding, password_hash, error) in zip(chunk, outputs):
+            if error:
+                results.append({'user_id': row['user_id'], 'name': row['name'], 'success': False, 'error': error})
+            else:
+                candidates.append({'user_id': row['user_id'], 'name': row['name'],
+                                   'password_hash': password_hash, 'encoding': encoding})
+
+        done = start + len(chunk)
+        elapsed = time.time() - started
+        print(f"⏳ {done}/{total} foto ({done / elapsed:.1f} img/s)", flush=True)
+    encode_seconds = time.time() - started
+
+    results.extend(app.enroll_new_users(candidates, users, save=not args.dry_run))
+    app.face_engine.shutdown()
+
+    failures = [result for result in results if not result['success']]
+    for failure in failures:
+        print(f"❌ {failure['user_id'] or '-'} ({failure['name'] or '-'}): {failure['error']}")
+
+    registered = len(results) - len(failures)
+    elapsed = time.time() - started
+    rate = total / encode_seconds if encode_seconds > 0 else 0.0
+    status = 'lolos (dry run, tidak disimpan)' if args.dry_run else 'terdaftar'
+    print(f"✅ {registered} user {status}, {len(failures)} gagal, {total} foto dalam {elapsed:.1f}s "
+          f"({rate:.1f} img/s, {args.workers} worker)")
+
+
+if __name__ == '__main__':
+    main()
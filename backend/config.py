@@ -0,0 +1,96 @@
+import os
+
+# Face gallery
+# GALLERY_INDEX: 'flat' (brute-force matrix) atau 'ivf' (approximate, untuk gallery besar)
+GALLERY_INDEX = os.environ.get('GALLERY_INDEX', 'flat')
+# Jumlah cluster IVF, 0 = otomatis (4 * sqrt(N))
+GALLERY_IVF_NLIST = int(os.environ.get('GALLERY_IVF_NLIST', 0))
+# Jumlah cluster yang diperiksa per query: makin besar makin akurat tapi makin lambat
+GALLERY_IVF_NPROBE = int(os.environ.get('GALLERY_IVF_NPROBE', 8))
+# Di bawah jumlah user ini gallery tetap brute-force
+GALLERY_IVF_MIN_SIZE = int(os.environ.get('GALLERY_IVF_MIN_SIZE', 5000))
+# Matrix gallery: 'none' (float32), 'float16' atau 'int8'. Jika terkuantisasi,
+# GALLERY_RESCORE kandidat teratas dihitung ulang exact (float32)
+GALLERY_QUANTIZATION = os.environ.get('GALLERY_QUANTIZATION', 'none')
+GALLERY_RESCORE = int(os.environ.get('GALLERY_RESCORE', 32))
+# Satu snapshot matrix gallery di-memory-map bersama oleh semua worker gunicorn
+GALLERY_SHARED = os.environ.get('GALLERY_SHARED', '1') == '1'
+# Perubahan gallery dari jalur check-in (template baru) digabung selama sekian detik
+# lalu snapshot shared ditulis sekali di background
+GALLERY_PUBLISH_DELAY = float(os.environ.get('GALLERY_PUBLISH_DELAY', 1.0))
+
+# Attendance journal
+# ATTENDANCE_FSYNC: 'always' (fsync tiap absensi), 'interval' atau 'never'
+ATTENDANCE_FSYNC = os.environ.get('ATTENDANCE_FSYNC', 'always')
+ATTENDANCE_FSYNC_INTERVAL = float(os.environ.get('ATTENDANCE_FSYNC_INTERVAL', 1.0))
+
+# Storage
+# STORAGE_BACKEND: 'json' (file JSON/JSONL) atau 'sqlite'
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', 'absensi.db')
+
+# Rollover absensi bulan lalu ke riwayat (detik), 0 = hanya manual lewat /admin/cleanup
+ROLLOVER_INTERVAL = int(os.environ.get('ROLLOVER_INTERVAL', 3600))
+
+# Face detection engine (process pool)
+# ENGINE_WORKERS: jumlah child process, 0 = deteksi langsung di thread request
+ENGINE_WORKERS = int(os.environ.get('ENGINE_WORKERS', min(4, os.cpu_count() or 1)))
+# Maksimal job yang menunggu/berjalan; lebih dari ini request dijawab "busy" (503)
+ENGINE_MAX_PENDING = int(os.environ.get('ENGINE_MAX_PENDING', max(1, ENGINE_WORKERS) * 4))
+# Batas waktu per job (detik)
+ENGINE_TIMEOUT = float(os.environ.get('ENGINE_TIMEOUT', 15))
+
+# Face detection
+# DETECTION_MODE: 'full' (deteksi & encode full-frame) atau 'two_stage' (opt-in:
+# deteksi di thumbnail, encode di crop; wajah kecil di foto grup bisa terlewat,
+# cek dulu dengan benchmark_detection.py)
+DETECTION_MODE = os.environ.get('DETECTION_MODE', 'full')
+# Sisi terpanjang thumbnail untuk deteksi tahap pertama
+DETECTION_THUMBNAIL_SIZE = int(os.environ.get('DETECTION_THUMBNAIL_SIZE', 320))
+# Padding crop di sekitar wajah, relatif terhadap ukuran box
+DETECTION_CROP_PADDING = float(os.environ.get('DETECTION_CROP_PADDING', 0.5))
+
+# Maksimal gambar per request /attendance/batch
+BATCH_MAX_IMAGES = int(os.environ.get('BATCH_MAX_IMAGES', 16))
+
+# Stream absensi (/attendance/stream): IoU minimal agar box dianggap wajah yang sama,
+# jumlah frame sebelum track yang hilang dibuang, similarity agar track tidak
+# di-encode ulang, dan jarak (frame) antar encode ulang untuk track yang belum yakin
+STREAM_IOU_THRESHOLD = float(os.environ.get('STREAM_IOU_THRESHOLD', 0.3))
+STREAM_MAX_MISSED = int(os.environ.get('STREAM_MAX_MISSED', 10))
+STREAM_SETTLE_SIMILARITY = float(os.environ.get('STREAM_SETTLE_SIMILARITY', 0.7))
+STREAM_REENCODE_INTERVAL = int(os.environ.get('STREAM_REENCODE_INTERVAL', 10))
+STREAM_MAX_FRAME_BYTES = int(os.environ.get('STREAM_MAX_FRAME_BYTES', 4 * 1024 * 1024))
+
+# Cache absensi terakhir: submit ulang oleh user yang sama dalam RECENT_CACHE_TTL
+# detik dijawab dengan hasil sebelumnya tanpa menulis record baru. 0 = nonaktif
+RECENT_CACHE_TTL = float(os.environ.get('RECENT_CACHE_TTL', 60))
+RECENT_CACHE_SIZE = int(os.environ.get('RECENT_CACHE_SIZE', 1024))
+# Opt-in: gambar yang hampir sama (jarak dHash <= RECENT_HASH_MAX_DISTANCE) dijawab
+# sebelum face matching. Dua orang berbeda di depan latar kiosk yang sama bisa
+# menghasilkan dHash hampir sama, jadi hanya aktifkan untuk kamera perorangan
+RECENT_IMAGE_HASH = os.environ.get('RECENT_IMAGE_HASH', '0') == '1'
+RECENT_HASH_MAX_DISTANCE = int(os.environ.get('RECENT_HASH_MAX_DISTANCE', 2))
+
+# Multi-template: maksimal template per user, margin (jarak) di sekitar threshold
+# di mana template individual ikut dicek, dan rentang similarity check-in yang
+# ditambahkan otomatis sebagai template baru (cukup yakin, tapi belum duplikat)
+MAX_TEMPLATES = int(os.environ.get('MAX_TEMPLATES', 5))
+TEMPLATE_MARGIN = float(os.environ.get('TEMPLATE_MARGIN', 0.05))
+TEMPLATE_LEARN_SIMILARITY = float(os.environ.get('TEMPLATE_LEARN_SIMILARITY', 0.7))
+TEMPLATE_NOVELTY_SIMILARITY = float(os.environ.get('TEMPLATE_NOVELTY_SIMILARITY', 0.9))
+# Maksimal template hasil check-in yang menunggu disimpan di background
+TEMPLATE_LEARN_QUEUE = int(os.environ.get('TEMPLATE_LEARN_QUEUE', 256))
+
+# Maksimal user per request /admin/users/bulk (encoding + hash password per user)
+BULK_MAX_USERS = int(os.environ.get('BULK_MAX_USERS', 50))
+
+# Paging /attendance-records dan /admin/monthly-records: jumlah record default dan maksimal per halaman
+RECORDS_PAGE_SIZE = int(os.environ.get('RECORDS_PAGE_SIZE', 100))
+RECORDS_MAX_PAGE_SIZE = int(os.environ.get('RECORDS_MAX_PAGE_SIZE', 500))
+
+# Cache body response GET (dashboard, daftar user, record) per worker, 0 = hanya ETag/304
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 64))
+
+# Ukuran sel grid index lokasi absensi (derajat, 0.01 ~ 1.1 km)
+LOCATION_GRID_CELL = float(os.environ.get('LOCATION_GRID_CELL', 0.01))
@@ -0,0 +1,265 @@
+"""
+SQLite storage backend (STORAGE_BACKEND=sqlite).
+
+Satu koneksi per thread per worker process, mode WAL, semua query
+memakai parameter sehingga statement di-cache oleh sqlite3. Schema ada
+di database/schema.sql.
+
+Migrasi sekali jalan dari file JSON:
+    python models.py migrate
+"""
+import os
+import sys
+import json
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+
+import config
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database', 'schema.sql')
+
+RECORD_COLUMNS = [
+    'user_id', 'name', 'similarity', 'confidence', 'timestamp', 'date', 'month', 'time',
+    'status', 'location_verified', 'location_message', 'user_latitude', 'user_longitude'
+]
+
+INSERT_RECORD_SQL = (
+    f"INSERT OR IGNORE INTO attendance_records ({', '.join(RECORD_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in RECORD_COLUMNS)})"
+)
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def get_connection():
+    """Koneksi milik thread ini (dibuat ulang setelah fork ke worker baru)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+
+    conn = sqlite3.connect(config.SQLITE_PATH, timeout=30, isolation_level=None,
+                           check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+
+    with _schema_lock:
+        key = (os.getpid(), os.path.abspath(config.SQLITE_PATH))
+        if key not in _schema_ready:
+            with open(SCHEMA_FILE, 'r') as f:
+                conn.executescript(f.read())
+            _schema_ready.add(key)
+
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+@contextmanager
+def transaction():
+    """BEGIN IMMEDIATE ... COMMIT, rollback jika ada exception"""
+    conn = get_connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+# ==================== USERS ====================
+
+class SqliteUserSource:
+    """Sumber users untuk UserRegistry: tabel face_users"""
+
+    def signature(self):
+        # users_version dinaikkan oleh setiap update() dari worker mana pun
+        row = get_connection().execute("SELECT value FROM meta WHERE key = 'users_version'").fetchone()
+        return row['value'] if row else None
+
+    def load(self):
+        users = {}
+        for row in get_connection().execute(
+                "SELECT user_id, name, password_hash, registered_at FROM face_users"):
+            user = {'name': row['name'], 'registered_at': row['registered_at']}
+            if row['password_hash'] is not None:
+                user['password_hash'] = row['password_hash']
+            users[row['user_id']] = user
+        return users
+
+    def update(self, changes):
+        """
+        Tulis hanya user yang berubah (``{user_id: data}``, data None =
+        hapus) dalam satu transaksi. Return (versi sebelum, versi sesudah).
+        """
+        with transaction() as conn:
+            before = conn.execute("SELECT value FROM meta WHERE key = 'users_version'").fetchone()['value']
+            for user_id, data in changes.items():
+                if data is None:
+                    conn.execute("DELETE FROM face_users WHERE user_id = ?", (user_id,))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO face_users (user_id, name, password_hash, registered_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (user_id, data['name'], data.get('password_hash'), data.get('registered_at'))
+                    )
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'users_version'")
+        return before, before + 1
+
+
+# ==================== ATTENDANCE ====================
+
+def record_to_row(record):
+    values = dict(record, month=record['timestamp'][:7])
+    if values.get('location_verified') is not None:
+        values['location_verified'] = int(bool(values['location_verified']))
+    return tuple(values.get(column) for column in RECORD_COLUMNS)
+
+
+def row_to_record(row):
+    record = {}
+    for column in RECORD_COLUMNS:
+        value = row[column]
+        if value is None or column == 'month':
+            continue
+        if column == 'location_verified':
+            value = bool(value)
+        record[column] = value
+    return record
+
+
+def insert_attendance(records):
+    """Simpan banyak record absensi dalam satu transaksi"""
+    with transaction() as conn:
+        conn.executemany(INSERT_RECORD_SQL, [record_to_row(record) for record in records])
+
+
+def iter_month_records(month):
+    for row in get_connection().execute(
+            "SELECT * FROM attendance_records WHERE month = ? ORDER BY timestamp, id", (month,)):
+        yield row_to_record(row)
+
+
+def page_month_records(query):
+    """
+    Satu halaman record (terbaru dulu, maksimal query.limit + 1) dengan
+    keyset (timestamp, user_id) < cursor, dilayani index month/user_id +
+    timestamp tanpa OFFSET.
+    """
+    conditions, params = ["month = ?"], [query.month]
+    if query.user_id is not None:
+        conditions.append("user_id = ?")
+        params.append(query.user_id)
+    if query.date_from is not None:
+        conditions.append("date >= ?")
+        params.append(query.date_from)
+    if query.date_to is not None:
+        conditions.append("date <= ?")
+        params.append(query.date_to)
+    if query.location_verified is not None:
+        # Record lama tanpa status lokasi dianggap valid, sama seperti export
+        conditions.append("COALESCE(location_verified, 1) = ?")
+        params.append(int(query.location_verified))
+    if query.before is not None:
+        conditions.append("(timestamp, user_id) < (?, ?)")
+        params.extend(query.before)
+    params.append(query.limit + 1)
+
+    rows = get_connection().execute(
+        f"SELECT * FROM attendance_records WHERE {' AND '.join(conditions)} "
+        f"ORDER BY timestamp DESC, user_id DESC LIMIT ?", params)
+    return [row_to_record(row) for row in rows]
+
+
+def available_months():
+    rows = get_connection().execute(
+        "SELECT DISTINCT month FROM attendance_records ORDER BY month DESC")
+    return [row['month'] for row in rows]
+
+
+def count_records(month=None):
+    conn = get_connection()
+    if month is None:
+        return conn.execute("SELECT COUNT(*) FROM attendance_records").fetchone()[0]
+    return conn.execute("SELECT COUNT(*) FROM attendance_records WHERE month = ?", (month,)).fetchone()[0]
+
+
+def iter_all_records():
+    for row in get_connection().execute("SELECT * FROM attendance_records ORDER BY timestamp, id"):
+        yield row_to_record(row)
+
+
+# ==================== MIGRATION ====================
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _read_jsonl(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def migrate_from_json(users_file='users.json', attendance_files=('attendance.jsonl', 'attendance.json'),
+                      monthly_file='monthly_attendance.json', history_dir='history',
+                      encodings_file='face_encodings.bin'):
+    """
+    Salin users.json, attendance.jsonl/attendance.json dan riwayat
+    (history/*.jsonl atau monthly_attendance.json lama) ke SQLite. Aman dijalankan ulang: record
+    yang sudah ada (user_id + timestamp sama) dilewati.
+    """
+    from utils.encoding_store import EncodingStore, validate_user_id
+
+    users = _read_json(users_file, {})
+    legacy_encodings = []
+    for uid, data in users.items():
+        if 'face_encoding' not in data:
+            continue
+        encoding = data.pop('face_encoding')
+        try:
+            validate_user_id(uid)
+        except ValueError as e:
+            # users.json tidak diubah, encoding masih ada di sana
+            logger.warning(f"⚠️ Face encoding {uid!r} not migrated: {str(e)}")
+            continue
+        legacy_encodings.append((uid, encoding))
+    if legacy_encodings:
+        store = EncodingStore(encodings_file)
+        store.add_many([(uid, encoding) for uid, encoding in legacy_encodings if uid not in store])
+
+    SqliteUserSource().update(users)
+
+    records = []
+    for path in attendance_files:
+        records.extend(_read_jsonl(path) if path.endswith('.jsonl') else _read_json(path, []))
+    for month_records_list in _read_json(monthly_file, {}).values():
+        records.extend(month_records_list)
+    if os.path.isdir(history_dir):
+        for filename in sorted(os.listdir(history_dir)):
+            if filename.endswith('.jsonl'):
+                records.extend(_read_jsonl(os.path.join(history_dir, filename)))
+    insert_attendance(records)
+
+    result = {'users': len(users), 'encodings': len(legacy_encodings), 'attendance_records': len(records)}
+    logger.info(f"✅ Migrated to {config.SQLITE_PATH}: {result}")
+    return result
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print("Usage: python models.py migrate")
+        sys.exit(1)
+    print(migrate_from_json())
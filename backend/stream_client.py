@@ -0,0 +1,85 @@
+"""
+Kirim video (file clip atau webcam) ke /attendance/stream sebagai
+frame JPEG berurutan, lalu tampilkan event absensi dan ringkasan.
+
+    python stream_client.py clip.mp4 --lat -6.2 --lon 106.8
+    python stream_client.py 0            # webcam
+"""
+import sys
+import json
+import argparse
+import http.client
+from urllib.parse import urlsplit, urlencode
+
+import cv2
+
+from utils.face_tracker import FRAME_HEADER
+
+
+def iter_frames(source, every=1, max_frames=None, quality=85):
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not capture.isOpened():
+        raise SystemExit(f"❌ Tidak bisa membuka video: {source}")
+    sent = 0
+    index = 0
+    try:
+        while max_frames is None or sent < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            index += 1
+            if (index - 1) % every:
+                continue
+            ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                continue
+            sent += 1
+            yield FRAME_HEADER.pack(len(jpeg)) + jpeg.tobytes()
+    finally:
+        capture.release()
+    yield FRAME_HEADER.pack(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream video ke endpoint absensi")
+    parser.add_argument('source', help="path video / urutan gambar, atau index webcam")
+    parser.add_argument('--url', default='http://127.0.0.1:5000/attendance/stream')
+    parser.add_argument('--lat', type=float)
+    parser.add_argument('--lon', type=float)
+    parser.add_argument('--every', type=int, default=1, help="kirim setiap frame ke-N")
+    parser.add_argument('--max-frames', type=int)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    path = url.path
+    params = {key: value for key, value in (('latitude', args.lat), ('longitude', args.lon)) if value is not None}
+    if params:
+        path += '?' + urlencode(params)
+
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=600)
+    connection.request('POST', path, body=iter_frames(args.source, args.every, args.max_frames),
+                       headers={'Content-Type': 'application/octet-stream'}, encode_chunked=True)
+    response = connection.getresponse()
+    if response.status != 200:
+        print(f"❌ HTTP {response.status}: {response.read().decode('utf-8', 'replace')}")
+        sys.exit(1)
+
+    for line in response:
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        if event.get('event') == 'attendance':
+            status = 'tercatat' if event['recorded'] else 'sudah tercatat'
+            print(f"✅ frame {event['frame']}: {event['name']} ({event['user_id']}) "
+                  f"similarity {event['similarity']:.2%} - {status}")
+        elif event.get('event') == 'summary':
+            print(f"📊 {event['frames_processed']} frames processed, "
+                  f"{event['encodings_computed']} encodings computed, "
+                  f"{event['tracks']} tracks, {event['recorded']} recorded "
+                  f"({event['frames_dropped']} dropped, {event['duration_seconds']}s)")
+        else:
+            print(event)
+
+
+if __name__ == '__main__':
+    main()
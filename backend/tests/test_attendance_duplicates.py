@@ -0,0 +1,71 @@
+import io
+import os
+import importlib
+
+import cv2
+import numpy as np
+import pytest
+
+# app mengimpor face_utils, yang butuh face_recognition
+pytest.importorskip('face_recognition')
+
+import config  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # app.py memakai path relatif (users.json, attendance.jsonl, ...) dari working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    saved = {name: getattr(config, name) for name in ('ENGINE_WORKERS', 'ROLLOVER_INTERVAL', 'RECENT_CACHE_TTL')}
+    config.ENGINE_WORKERS, config.ROLLOVER_INTERVAL, config.RECENT_CACHE_TTL = 0, 0, 60
+    try:
+        yield importlib.import_module('app')
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    encoding = np.random.default_rng(0).normal(0, 0.09, 128).astype(np.float32)
+    app_module.update_users({'u1': {'name': 'Budi'}})
+    app_module.add_face_templates([('u1', encoding)], replace=True)
+    app_module.attendance_journal.rewrite([])
+
+    monkeypatch.setattr(app_module, 'extract_face_encodings', lambda image: [encoding])
+    monkeypatch.setattr(app_module, 'recent_recognitions', app_module.RecentRecognitions(ttl=60))
+    return app_module.app.test_client()
+
+
+def image_file():
+    _, data = cv2.imencode('.jpg', np.full((200, 200, 3), 128, dtype=np.uint8))
+    return (io.BytesIO(data.tobytes()), 'face.jpg')
+
+
+def journal_users(app_module):
+    return [record['user_id'] for record in app_module.attendance_journal.iter_records()]
+
+
+def test_batch_after_single_check_in_is_duplicate(app_module, client):
+    first = client.post('/attendance', data={'file': image_file()}).get_json()
+    assert first['recognized_user']['user_id'] == 'u1'
+
+    batch = client.post('/attendance/batch', data={'files': [image_file()]}).get_json()
+
+    assert batch['recognized_count'] == 1
+    assert batch['recorded'] == []
+    assert batch['duplicates'] == [{'user_id': 'u1', 'timestamp': first['timestamp']}]
+    assert journal_users(app_module) == ['u1']
+
+
+def test_single_check_in_after_batch_is_duplicate(app_module, client):
+    batch = client.post('/attendance/batch', data={'files': [image_file()]}).get_json()
+    assert batch['recorded'] == ['u1']
+
+    second = client.post('/attendance', data={'file': image_file()}).get_json()
+
+    assert second['duplicate'] is True
+    assert second['recognized_user']['user_id'] == 'u1'
+    assert journal_users(app_module) == ['u1']
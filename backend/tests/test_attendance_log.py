@@ -0,0 +1,149 @@
+import pytest
+
+from utils.attendance_log import AttendanceJournal
+
+
+def make_record(timestamp, user_id='a'):
+    return {'user_id': user_id, 'timestamp': timestamp}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return AttendanceJournal(str(tmp_path / 'attendance.jsonl'), fsync_policy='never')
+
+
+def test_append_and_iterate(journal):
+    assert journal.read_all() == []
+    assert journal.first_record() is None
+
+    journal.append(make_record('2025-10-01T08:00:00'))
+    journal.append_many([make_record('2025-10-01T08:01:00', 'b'), make_record('2025-10-01T08:02:00', 'c')])
+
+    assert [record['user_id'] for record in journal] == ['a', 'b', 'c']
+    assert journal.count() == 3
+    assert journal.first_record()['user_id'] == 'a'
+
+
+def test_truncated_line_is_skipped_and_closed(journal):
+    journal.append(make_record('2025-10-01T08:00:00'))
+    with open(journal.path, 'ab') as f:
+        f.write(b'{"user_id": "broken", "time')
+    journal.append(make_record('2025-10-01T08:05:00', 'b'))
+
+    assert [record['user_id'] for record in journal] == ['a', 'b']
+
+
+def test_rewrite_replaces_content(journal):
+    journal.append(make_record('2025-10-01T08:00:00'))
+    journal.rewrite([make_record('2025-11-01T08:00:00', 'z')])
+
+    assert journal.read_all() == [make_record('2025-11-01T08:00:00', 'z')]
+
+
+def test_invalid_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        AttendanceJournal(str(tmp_path / 'x.jsonl'), fsync_policy='sometimes')
+
+
+def test_move_prefix_moves_only_leading_records(journal):
+    journal.append_many([
+        make_record('2025-09-30T17:00:00', 'a'),
+        make_record('2025-09-30T17:05:00', 'b'),
+        make_record('2025-10-01T08:00:00', 'c'),
+        make_record('2025-09-30T23:59:00', 'd'),
+    ])
+    moved = []
+
+    count = journal.move_prefix(lambda r: r['timestamp'] < '2025-10', moved.extend)
+
+    assert count == 2
+    assert [r['user_id'] for r in moved] == ['a', 'b']
+    # Record lama setelah record baru tetap tinggal (hanya prefix yang dipindah)
+    assert [r['user_id'] for r in journal] == ['c', 'd']
+
+
+def test_move_prefix_keeps_remaining_bytes(journal):
+    journal.append(make_record('2025-09-30T17:00:00', 'a'))
+    with open(journal.path, 'ab') as f:
+        f.write(b'{"timestamp": "2025-10-01T08:00:00",   "user_id": "b"}\n')
+
+    journal.move_prefix(lambda r: r['timestamp'] < '2025-10', lambda records: None)
+
+    with open(journal.path, 'rb') as f:
+        assert f.read() == b'{"timestamp": "2025-10-01T08:00:00",   "user_id": "b"}\n'
+
+
+def test_move_prefix_drops_corrupt_lines(journal):
+    journal.append(make_record('2025-09-30T17:00:00', 'a'))
+    with open(journal.path, 'ab') as f:
+        f.write(b'not json\n')
+    journal.append(make_record('2025-10-01T08:00:00', 'b'))
+    moved = []
+
+    assert journal.move_prefix(lambda r: r['timestamp'] < '2025-10', moved.extend) == 1
+    assert [r['user_id'] for r in moved] == ['a']
+    assert [r['user_id'] for r in journal] == ['b']
+
+
+def test_move_prefix_nothing_to_move(journal):
+    def sink(records):
+        raise AssertionError("sink should not be called")
+
+    assert journal.move_prefix(lambda r: True, sink) == 0
+
+    journal.append(make_record('2025-10-01T08:00:00'))
+    with open(journal.path, 'rb') as f:
+        before = f.read()
+    assert journal.move_prefix(lambda r: False, sink) == 0
+    with open(journal.path, 'rb') as f:
+        assert f.read() == before
+
+
+def test_count_reads_only_appended_lines(journal):
+    assert journal.count() == 0
+    journal.append_many([make_record('2025-10-01T08:00:00'), make_record('2025-10-01T08:01:00', 'b')])
+    assert journal.count() == 2
+
+    # Baris yang sudah dihitung tidak dibaca lagi: hitung penuh akan memberi 2
+    with open(journal.path, 'r+b') as f:
+        first, second = f.readline(), f.readline()
+        f.seek(len(first))
+        f.write(b'\n' * len(second))
+    journal.append(make_record('2025-10-01T08:02:00', 'c'))
+    assert journal.count() == 3
+    assert AttendanceJournal(journal.path).count() == 2
+
+    with open(journal.path, 'ab') as f:
+        f.write(b'{"user_id": "partial"')
+    assert journal.count() == 4
+
+
+def test_count_after_rewrite_and_rollover(journal):
+    journal.append_many([make_record('2025-09-30T17:00:00', 'a'), make_record('2025-10-01T08:00:00', 'b')])
+    assert journal.count() == 2
+
+    journal.move_prefix(lambda r: r['timestamp'] < '2025-10', lambda records: None)
+    assert journal.count() == 1
+
+    journal.rewrite([make_record('2025-11-01T08:00:00', 'z')] * 3)
+    assert journal.count() == 3
+
+
+def test_months_before_and_after_rollover(journal):
+    assert journal.months() == []
+    assert journal.last_record() is None
+
+    journal.append_many([make_record('2025-09-30T17:00:00'), make_record('2025-10-01T08:00:00', 'b')])
+    assert journal.last_record()['user_id'] == 'b'
+    assert journal.months() == ['2025-10', '2025-09']
+
+    journal.move_prefix(lambda r: r['timestamp'] < '2025-10', lambda records: None)
+    assert journal.months() == ['2025-10']
+
+
+def test_months_lists_every_month_awaiting_rollover(journal):
+    journal.append_many([make_record(f'2025-{month:02d}-15T08:00:00') for month in (7, 8, 8, 10)])
+    with open(journal.path, 'ab') as f:
+        f.write(b'{"user_id": "broken"')
+
+    assert journal.months() == ['2025-10', '2025-08', '2025-07']
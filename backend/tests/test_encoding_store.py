@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from utils.encoding_store import EncodingStore, USER_ID_SIZE, user_id_error, validate_user_id
+
+
+def vector(value):
+    return np.full(128, value, dtype=np.float32)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EncodingStore(str(tmp_path / 'encodings.bin'))
+
+
+def test_add_and_get_centroid(store):
+    store.add_many([('a', vector(1.0)), ('b', vector(2.0))])
+    store.add_many([('a', vector(3.0))], replace=False)
+
+    assert len(store) == 2
+    assert store.template_count('a') == 2
+    np.testing.assert_allclose(store.get('a'), vector(2.0))
+    encodings, found = store.get_many(['b', 'missing', 'a'])
+    assert found.tolist() == [True, False, True]
+    np.testing.assert_allclose(encodings[0], vector(2.0))
+    np.testing.assert_allclose(encodings[2], vector(2.0))
+
+
+def test_replace_marks_old_rows_deleted(store):
+    store.add('a', vector(1.0))
+    store.add('a', vector(5.0))
+
+    assert store.template_count('a') == 1
+    assert store.template_total == 1
+    np.testing.assert_allclose(store.get('a'), vector(5.0))
+
+
+def test_crash_before_flagging_old_rows_keeps_a_template(store, monkeypatch):
+    store.add('a', vector(1.0))
+
+    def crash(f, rows):
+        raise OSError("crash")
+
+    monkeypatch.setattr(store, '_mark_rows_deleted', crash)
+    with pytest.raises(OSError):
+        store.add('a', vector(5.0))
+
+    # Row baru sudah tersimpan sebelum row lama sempat ditandai deleted
+    reopened = EncodingStore(store.path)
+    assert reopened.template_count('a') == 2
+    np.testing.assert_allclose(reopened.templates('a')[-1], vector(5.0))
+
+
+def test_remove_is_visible_to_other_instances(store):
+    store.add_many([('a', vector(1.0)), ('b', vector(2.0))])
+    other = EncodingStore(store.path)
+
+    assert store.remove('a')
+    assert not store.remove('a')
+    assert 'a' in other
+    assert other.refresh()
+    assert 'a' not in other
+    assert other.user_ids() == ['b']
+
+
+def test_compact_drops_deleted_rows(store):
+    store.add_many([(f'u{i}', vector(i)) for i in range(5)])
+    for i in range(3):
+        store.remove(f'u{i}')
+    store.compact()
+
+    assert len(store._records) == 2
+    assert sorted(store.user_ids()) == ['u3', 'u4']
+    np.testing.assert_allclose(store.get('u4'), vector(4.0))
+    assert EncodingStore(store.path).user_ids() == store.user_ids()
+
+
+def test_version_changes_with_templates(store):
+    store.add('a', vector(1.0))
+    before = store.version('a')
+    store.add_many([('a', vector(2.0))], replace=False)
+
+    assert store.version('a') != before
+    assert store.version('missing') is None
+
+
+def test_user_id_size_is_validated(store):
+    long_id = 'x' * (USER_ID_SIZE + 1)
+
+    assert user_id_error('x' * USER_ID_SIZE) is None
+    assert user_id_error(long_id)
+    with pytest.raises(ValueError):
+        validate_user_id(long_id)
+    with pytest.raises(ValueError):
+        store.add_many([('ok', vector(1.0)), (long_id, vector(2.0))])
+    assert len(store) == 0
+
+
+def test_max_templates_keeps_enrolment_and_newest(store):
+    store.add('a', vector(0.0))
+    store.add_many([('a', vector(i)) for i in range(1, 4)], replace=False, max_templates=3)
+
+    templates = store.templates('a')
+    assert len(templates) == 3
+    assert templates[:, 0].tolist() == [0.0, 2.0, 3.0]
+
+
+def test_max_templates_with_more_new_entries_than_room(store):
+    store.add('a', vector(0.0))
+    store.add_many([('a', vector(i)) for i in range(1, 7)], replace=False, max_templates=3)
+    assert store.templates('a')[:, 0].tolist() == [0.0, 5.0, 6.0]
+
+    store.add_many([('b', vector(i)) for i in range(1, 5)], replace=False, max_templates=2)
+    assert store.templates('b')[:, 0].tolist() == [1.0, 4.0]
+
+
+def test_evicted_rows_are_compacted(store, monkeypatch):
+    monkeypatch.setattr('utils.encoding_store.COMPACT_MIN_DELETED', 8)
+    store.add('a', vector(0.0))
+    for i in range(1, 30):
+        store.add_many([('a', vector(i))], replace=False, max_templates=3)
+
+    assert store.templates('a')[:, 0].tolist() == [0.0, 28.0, 29.0]
+    # Tanpa compact file akan berisi 30 row
+    assert len(store._records) <= 3 + 8 + 1
@@ -0,0 +1,69 @@
+import sys
+
+import numpy as np
+import pytest
+
+# face_utils butuh face_recognition; detektor di bawah diganti dengan versi sintetis
+pytest.importorskip('face_recognition')
+
+from utils import face_utils  # noqa: E402
+
+# Wajah di gambar 800 x 600: (top, right, bottom, left, nilai pixel)
+FACES = [(100, 400, 400, 100, 50), (300, 700, 360, 640, 200)]
+# Detektor HOG hanya melihat wajah minimal sekian pixel
+MIN_FACE = 40
+
+
+def make_image():
+    image = np.zeros((600, 800, 3), dtype=np.uint8)
+    for top, right, bottom, left, value in FACES:
+        image[top:bottom, left:right] = value
+    return image
+
+
+def fake_face_locations(image, model='hog'):
+    scale = image.shape[1] / 800.0
+    boxes = []
+    for top, right, bottom, left, _ in FACES:
+        box = tuple(int(round(v * scale)) for v in (top, right, bottom, left))
+        if box[2] - box[0] >= MIN_FACE:
+            boxes.append(box)
+    return boxes
+
+
+def fake_face_encodings(image, boxes):
+    # Encoding = warna di tengah box, sama di full-frame maupun di crop
+    return [np.full(128, image[(top + bottom) // 2, (left + right) // 2, 0] / 255.0, dtype=np.float64)
+            for top, right, bottom, left in boxes]
+
+
+@pytest.fixture(autouse=True)
+def fake_detector(monkeypatch):
+    monkeypatch.setattr(face_utils.face_recognition, 'face_locations', fake_face_locations, raising=False)
+    monkeypatch.setattr(face_utils.face_recognition, 'face_encodings', fake_face_encodings, raising=False)
+    monkeypatch.setattr(face_utils.config, 'DETECTION_THUMBNAIL_SIZE', 320)
+
+
+def test_full_mode_is_default_and_finds_small_faces():
+    assert face_utils.config.DETECTION_MODE == 'full'
+    encodings = face_utils.extract_face_encodings(make_image())
+    assert [round(e[0] * 255) for e in encodings] == [50, 200]
+
+
+def test_two_stage_matches_full_frame_for_faces_it_finds():
+    full = face_utils.extract_face_encodings(make_image(), mode='full')
+    two_stage = face_utils.extract_face_encodings(make_image(), mode='two_stage')
+
+    # Wajah kecil (60 px -> 24 px di thumbnail) terlewat karena wajah besar ditemukan
+    assert len(two_stage) == 1
+    np.testing.assert_allclose(two_stage[0], full[0])
+
+
+def test_two_stage_falls_back_to_full_frame(monkeypatch):
+    # Hanya wajah kecil di gambar: thumbnail tidak menemukan apa pun
+    monkeypatch.setattr(sys.modules[__name__], 'FACES', FACES[1:])
+    boxes, cropped = face_utils.locate_faces(make_image(), 'two_stage')
+
+    assert not cropped
+    assert boxes == [(300, 700, 360, 640)]
+    assert len(face_utils.extract_face_encodings(make_image(), mode='two_stage')) == 1
@@ -0,0 +1,200 @@
+import numpy as np
+import pytest
+
+# face_utils butuh face_recognition (hanya untuk deteksi; gallery sendiri murni NumPy)
+pytest.importorskip('face_recognition')
+
+from utils.face_utils import FaceGallery  # noqa: E402
+from utils.face_index import IVFIndex  # noqa: E402
+from utils.encoding_store import EncodingStore  # noqa: E402
+
+
+def unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def make_encodings(families, members, spread=0.015, seed=0):
+    """Encoding unit-norm (seperti dlib) berkelompok: beberapa user mirip per keluarga"""
+    rng = np.random.default_rng(seed)
+    bases = unit(rng.normal(size=(families, 128)))
+    encodings = bases[:, None, :] + rng.normal(0, spread, (families, members, 128))
+    return unit(encodings.reshape(-1, 128))
+
+
+def make_queries(encodings, count, noise=0.02, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(encodings), size=count, replace=False)
+    return unit(encodings[picks] + rng.normal(0, noise, (count, 128)))
+
+
+def brute_force(ids, encodings, query, threshold, top_k):
+    """Referensi: ranking cosine; similarity gallery = 1 - jarak euclidean = 1 - sqrt(2 - 2 cos)"""
+    cosine = encodings @ query
+    order = np.argsort(-cosine, kind='stable')[:top_k]
+    similarity = 1.0 - np.sqrt(np.maximum(2.0 - 2.0 * cosine[order], 0.0))
+    return [(ids[i], s) for i, s in zip(order, similarity) if s >= threshold]
+
+
+def build(ids, encodings, **kwargs):
+    gallery = FaceGallery(initial_capacity=len(ids), **kwargs)
+    for user_id, encoding in zip(ids, encodings):
+        gallery.add(user_id, encoding)
+    return gallery
+
+
+def assert_same_matches(matches, expected):
+    assert [m['user_id'] for m in matches] == [user_id for user_id, _ in expected]
+    np.testing.assert_allclose([m['similarity'] for m in matches], [s for _, s in expected], atol=1e-4)
+
+
+@pytest.fixture(scope='module')
+def data():
+    encodings = make_encodings(families=60, members=5)
+    ids = [f'user{i:04d}' for i in range(len(encodings))]
+    return ids, encodings
+
+
+def test_match_equals_brute_force(data):
+    ids, encodings = data
+    gallery = build(ids, encodings)
+
+    for query in make_queries(encodings, 50):
+        expected = brute_force(ids, encodings, query, 0.6, 5)
+        assert len(expected) > 1
+        assert_same_matches(gallery.match(query, 0.6, top_k=5), expected)
+
+
+def test_match_many_equals_match(data):
+    ids, encodings = data
+    gallery = build(ids, encodings)
+    queries = make_queries(encodings, 30)
+    stranger = unit(np.random.default_rng(9).normal(size=128))
+
+    results = gallery.match_many(np.vstack([queries, stranger]), 0.6, top_k=3)
+
+    assert len(results) == len(queries) + 1
+    for query, matches in zip(queries, results):
+        assert_same_matches(matches, brute_force(ids, encodings, query, 0.6, 3))
+    assert results[-1] == []
+    assert gallery.match_many([], 0.6) == []
+
+
+def test_add_and_remove_in_place(data):
+    ids, encodings = data
+    gallery = build(ids[:100], encodings[:100])
+    matrix = gallery._matrix
+
+    assert gallery.remove(ids[10])
+    assert not gallery.remove(ids[10])
+    # Row terakhir pindah ke slot yang kosong
+    assert gallery.export()[0][10] == ids[99]
+    gallery.add(ids[20], encodings[150])
+    gallery.add('new', encodings[200])
+
+    assert gallery._matrix is matrix
+    assert len(gallery) == 100 and ids[10] not in gallery
+    current = {user_id: encodings[i] for i, user_id in enumerate(ids[:100]) if user_id != ids[10]}
+    current[ids[20]] = encodings[150]
+    current['new'] = encodings[200]
+    current_ids = list(current)
+    current_encodings = np.array(list(current.values()))
+    for query in make_queries(encodings, 40, seed=2):
+        assert_same_matches(gallery.match(query, 0.6, top_k=5),
+                            brute_force(current_ids, current_encodings, query, 0.6, 5))
+
+
+def test_empty_gallery():
+    gallery = FaceGallery()
+    assert gallery.match(np.zeros(128)) == []
+    assert gallery.match_many(np.zeros((2, 128))) == [[], []]
+
+
+@pytest.fixture(scope='module')
+def large_data():
+    encodings = make_encodings(families=400, members=5, seed=3)
+    ids = [f'user{i:05d}' for i in range(len(encodings))]
+    return ids, encodings
+
+
+def ivf_gallery(ids, encodings):
+    gallery = build(ids, encodings, index=IVFIndex(nlist=40, nprobe=8, min_size=500))
+    gallery.wait_for_index()
+    assert gallery.index.is_trained
+    return gallery
+
+
+def test_ivf_recall_and_exact_rescore(large_data):
+    ids, encodings = large_data
+    gallery = ivf_gallery(ids, encodings)
+    queries = make_queries(encodings, 200, seed=4)
+
+    found = 0
+    for query in queries:
+        expected = brute_force(ids, encodings, query, 0.6, 5)
+        matches = gallery.match(query, 0.6, top_k=5)
+        if matches and matches[0]['user_id'] == expected[0][0]:
+            found += 1
+        # Kandidat dari index dihitung exact: similarity sama dengan brute-force
+        exact = dict(brute_force(ids, encodings, query, -np.inf, len(ids)))
+        for match in matches:
+            assert match['similarity'] == pytest.approx(exact[match['user_id']], abs=1e-4)
+
+    assert found / len(queries) >= 0.95
+    assert gallery.recall_check(sample_size=200)['recall'] >= 0.95
+    assert gallery.match_many(queries[:10], 0.6, top_k=3) == [gallery.match(q, 0.6, top_k=3) for q in queries[:10]]
+
+
+def test_ivf_sees_add_and_remove_after_training(large_data):
+    ids, encodings = large_data
+    gallery = ivf_gallery(ids[:1500], encodings[:1500])
+
+    gallery.add('late', encodings[1600])
+    gallery.remove(ids[0])
+
+    assert gallery.match(encodings[1600], 0.6)[0]['user_id'] == 'late'
+    assert ids[0] not in [m['user_id'] for m in gallery.match(encodings[0], 0.6, top_k=5)]
+
+
+@pytest.fixture(scope='module')
+def quantized_store(large_data, tmp_path_factory):
+    ids, encodings = large_data
+    store = EncodingStore(str(tmp_path_factory.mktemp('gallery') / 'encodings.bin'))
+    store.add_many(list(zip(ids, encodings)))
+    return store
+
+
+@pytest.mark.parametrize('quantization', ['float16', 'int8'])
+def test_quantized_recall_with_exact_rescore(large_data, quantized_store, quantization):
+    ids, encodings = large_data
+    gallery = build(ids, encodings, templates=quantized_store, quantization=quantization, rescore=32)
+    queries = make_queries(encodings, 200, seed=5)
+
+    same = 0
+    for query, matches in zip(queries, gallery.match_many(queries, 0.6, top_k=3)):
+        expected = brute_force(ids, encodings, query, 0.6, 3)
+        if matches and matches[0]['user_id'] == expected[0][0]:
+            same += 1
+        # Kandidat di-rescore dengan encoding float32 dari store
+        exact = dict(brute_force(ids, encodings, query, -np.inf, len(ids)))
+        for match in matches:
+            assert match['similarity'] == pytest.approx(exact[match['user_id']], abs=1e-4)
+        assert matches == gallery.match(query, 0.6, top_k=3)
+
+    assert same / len(queries) >= 0.99
+    assert gallery.bytes_per_user < FaceGallery().bytes_per_user
+
+
+def test_int8_rescale_keeps_existing_rows(data):
+    ids, encodings = data
+    gallery = build(ids, encodings, quantization='int8')
+    outlier = np.zeros(128, dtype=np.float32)
+    outlier[0] = 2.0
+
+    # Komponen di luar skala awal: kolom itu dikuantisasi ulang untuk semua row
+    gallery.add('outlier', outlier)
+
+    assert gallery.match(outlier, 0.9)[0]['user_id'] == 'outlier'
+    for query in make_queries(encodings, 20, seed=6):
+        expected = brute_force(ids, encodings, query, 0.6, 1)
+        assert gallery.match(query, 0.6)[0]['user_id'] == expected[0][0]
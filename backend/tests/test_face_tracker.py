@@ -0,0 +1,141 @@
+import io
+import struct
+
+import pytest
+
+# face_tracker mengimpor face_utils, yang butuh face_recognition
+pytest.importorskip('face_recognition')
+
+from utils import face_tracker  # noqa: E402
+from utils.face_tracker import FaceTracker, Track, box_iou, iter_stream_frames, match_boxes  # noqa: E402
+
+
+def box(left, top, size=100):
+    """Box (top, right, bottom, left) persegi"""
+    return (top, left + size, top + size, left)
+
+
+def test_box_iou():
+    assert box_iou(box(0, 0), box(0, 0)) == 1.0
+    assert box_iou(box(0, 0), box(200, 200)) == 0.0
+    # Bersinggungan di tepi tidak dihitung overlap
+    assert box_iou(box(0, 0), box(100, 0)) == 0.0
+    # Geser setengah lebar: 5000 / (10000 + 10000 - 5000)
+    assert box_iou(box(0, 0), box(50, 0)) == pytest.approx(1 / 3)
+
+
+def test_match_boxes_prefers_highest_iou():
+    previous = [box(0, 0), box(40, 0)]
+    current = [box(45, 0)]
+
+    # Box baru lebih dekat ke box lama kedua
+    assert match_boxes(previous, current, 0.3) == [(1, 0)]
+
+
+def test_match_boxes_is_one_to_one_and_respects_threshold():
+    previous = [box(0, 0), box(300, 0)]
+    current = [box(5, 0), box(10, 0), box(380, 0)]
+
+    matches = match_boxes(previous, current, 0.3)
+
+    assert matches == [(0, 0)]
+    assert match_boxes([], current, 0.3) == []
+
+
+def test_tracker_keeps_identity_across_frames():
+    tracker = FaceTracker(iou_threshold=0.3)
+
+    first = tracker.update([box(0, 0), box(300, 0)], 0)
+    second = tracker.update([box(305, 0), box(10, 0)], 1)
+
+    assert [t.track_id for t in first] == [1, 2]
+    assert [t.track_id for t in second] == [2, 1]
+    assert second[1].box == box(10, 0)
+    assert tracker.total_tracks == 2
+
+
+def test_tracker_expires_missed_tracks():
+    tracker = FaceTracker(max_missed=2)
+    tracker.update([box(0, 0)], 0)
+
+    for frame_index in range(1, 3):
+        tracker.update([], frame_index)
+    assert len(tracker.tracks) == 1
+    assert tracker.tracks[0].missed == 2
+
+    tracker.update([], 3)
+    assert tracker.tracks == []
+
+    # Wajah yang muncul lagi setelah dibuang menjadi track baru
+    (track,) = tracker.update([box(0, 0)], 4)
+    assert track.track_id == 2
+    assert tracker.total_tracks == 2
+
+
+def test_needs_encoding():
+    track = Track(1, box(0, 0), 0)
+    assert track.needs_encoding(0, 0.7, 10)
+
+    track.last_encoded = 0
+    assert not track.needs_encoding(5, 0.7, 10)
+    assert track.needs_encoding(10, 0.7, 10)
+
+    track.match = {'similarity': 0.5}
+    assert track.needs_encoding(10, 0.7, 10)
+    track.match = {'similarity': 0.9}
+    assert not track.needs_encoding(100, 0.7, 10)
+
+
+def test_settled_boxes():
+    tracker = FaceTracker(settle_similarity=0.7)
+    recognised, unknown = tracker.update([box(0, 0), box(300, 0)], 0)
+    for track in (recognised, unknown):
+        track.last_encoded = 0
+    recognised.match = {'similarity': 0.95}
+    unknown.match = None
+
+    # Wajah belum dikenali baru di-encode ulang setelah reencode_interval
+    assert tracker.settled_boxes(1) == [recognised.box, unknown.box]
+    assert tracker.settled_boxes(10) == [recognised.box]
+
+
+def frames(*payloads, end=True):
+    data = b''.join(struct.pack('>I', len(p)) + p for p in payloads)
+    if end:
+        data += struct.pack('>I', 0)
+    return io.BytesIO(data)
+
+
+def test_iter_stream_frames():
+    assert list(iter_stream_frames(frames(b'abc', b'de'), 10)) == [b'abc', b'de']
+    # Stream yang ditutup tanpa penanda akhir juga selesai dengan normal
+    assert list(iter_stream_frames(frames(b'abc', end=False), 10)) == [b'abc']
+
+
+def test_iter_stream_frames_rejects_bad_frames():
+    with pytest.raises(ValueError):
+        list(iter_stream_frames(frames(b'x' * 11), 10))
+
+    truncated = io.BytesIO(struct.pack('>I', 5) + b'ab')
+    with pytest.raises(ValueError):
+        list(iter_stream_frames(truncated, 10))
+
+
+def test_detect_and_encode_new_skips_settled_boxes(monkeypatch):
+    boxes = [box(0, 0), box(300, 0, size=40)]
+    encoded = []
+
+    # Box kecil hanya ditemukan pass full-frame (cropped=False)
+    monkeypatch.setattr(face_tracker, 'locate_faces', lambda image: (boxes, False))
+
+    def encode_located(image, face_locations, cropped):
+        encoded.append((face_locations, cropped))
+        return [f'encoding-{location[3]}' for location in face_locations]
+
+    monkeypatch.setattr(face_tracker, 'encode_located', encode_located)
+
+    found, encodings = face_tracker.detect_and_encode_new(None, [box(5, 0)], 0.3)
+
+    assert found == boxes
+    assert encodings == {1: 'encoding-300'}
+    assert encoded == [([box(300, 0, size=40)], False)]
@@ -0,0 +1,50 @@
+import pytest
+
+from utils.history_store import MonthlyHistory
+
+
+def make_record(timestamp, user_id='a'):
+    return {'user_id': user_id, 'timestamp': timestamp}
+
+
+@pytest.fixture
+def history(tmp_path):
+    return MonthlyHistory(str(tmp_path / 'history'), fsync_policy='never')
+
+
+def test_append_records_updates_manifest(history):
+    history.append_records('2025-09', [make_record('2025-09-01T08:00:00')])
+    history.append_records('2025-10', [make_record('2025-10-01T08:00:00'), make_record('2025-10-02T08:00:00')])
+    history.append_records('2025-10', [])
+
+    assert history.months() == ['2025-10', '2025-09']
+    assert history.record_count('2025-10') == 2
+    assert history.record_count('2025-08') == 0
+    assert history.record_count() == 3
+
+
+def test_merge_records_skips_duplicates(history):
+    history.append_records('2025-09', [make_record('2025-09-01T08:00:00', 'a')])
+
+    added = history.merge_records('2025-09', [
+        make_record('2025-09-01T08:00:00', 'a'),
+        make_record('2025-09-01T08:00:00', 'b'),
+        make_record('2025-09-01T08:00:00', 'b'),
+    ])
+
+    assert added == 1
+    assert [r['user_id'] for r in history.records('2025-09')] == ['a', 'b']
+    assert history.record_count('2025-09') == 2
+
+
+def test_merge_records_is_idempotent(history):
+    records = [make_record('2025-09-01T08:00:00', 'a'), make_record('2025-09-02T08:00:00', 'a')]
+
+    assert history.merge_records('2025-09', records) == 2
+    assert history.merge_records('2025-09', records) == 0
+    assert history.record_count('2025-09') == 2
+
+
+def test_invalid_month_rejected(history):
+    with pytest.raises(ValueError):
+        history.merge_records('../etc', [make_record('2025-09-01T08:00:00')])
@@ -0,0 +1,157 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from utils.location_utils import (LocationSettings, SiteIndex, haversine, parse_site, settings_with_sites,
+                                  mirror_primary_site, METERS_PER_DEGREE)
+
+
+def circle(site_id, latitude, longitude, radius):
+    return parse_site({'id': site_id, 'name': site_id, 'latitude': latitude, 'longitude': longitude,
+                       'radius': radius})
+
+
+def polygon(site_id, points):
+    return parse_site({'id': site_id, 'name': site_id, 'type': 'polygon', 'points': points})
+
+
+def check(index, latitude, longitude):
+    """validate (skalar) dan validate_many harus memberi hasil yang sama"""
+    single = index.validate(latitude, longitude)
+    many = index.validate_many([latitude], [longitude])[0]
+    assert single['valid'] == many['valid']
+    assert single['site'] == many['site']
+    assert single['distance'] == pytest.approx(many['distance'], abs=1e-6)
+    return single
+
+
+def test_haversine_broadcasts():
+    distances = haversine(0.0, 0.0, [0.0, 1.0], [1.0, 0.0])
+    assert distances == pytest.approx([METERS_PER_DEGREE, METERS_PER_DEGREE], rel=1e-9)
+
+
+def test_circle_spanning_several_cells():
+    # Radius 2 km dengan sel 0.01 derajat (~1.1 km): lingkaran menutup beberapa sel
+    index = SiteIndex([circle('hq', 0.0, 0.0, 2000)], cell_size=0.01)
+    offset = 1900 / METERS_PER_DEGREE
+
+    for latitude, longitude in [(offset, 0.0), (-offset, 0.0), (0.0, offset), (0.0, -offset)]:
+        result = check(index, latitude, longitude)
+        assert result['valid']
+        assert result['distance'] == pytest.approx(1900, rel=1e-3)
+
+    outside = check(index, 2100 / METERS_PER_DEGREE, 0.0)
+    assert not outside['valid']
+    assert outside['site']['id'] == 'hq'
+    assert outside['distance'] == pytest.approx(2100, rel=1e-3)
+
+
+def test_negative_longitude_cells():
+    # floor(-0.004 / 0.01) = -1, bukan 0: titik barat meridian harus ada di sel yang benar
+    index = SiteIndex([circle('west', 51.5, -0.004, 200)], cell_size=0.01)
+
+    assert index._cell(-0.004) == -1
+    assert check(index, 51.5, -0.0045)['valid']
+    assert check(index, 51.5, -0.0015)['valid']
+    assert not check(index, 51.5, 0.01)['valid']
+
+
+def test_polygon_with_horizontal_edges():
+    square = polygon('square', [[0.0, 0.0], [0.0, 0.02], [0.02, 0.02], [0.02, 0.0]])
+    index = SiteIndex([square], cell_size=0.01)
+
+    inside = check(index, 0.015, 0.005)
+    assert inside['valid'] and inside['distance'] == 0.0
+    # Titik sejajar sisi horizontal (latitude sama dengan sisi bawah / atas)
+    assert not check(index, 0.0, 0.03)['valid']
+    assert not check(index, 0.02, -0.01)['valid']
+
+    outside = check(index, 0.01, 0.03)
+    assert not outside['valid']
+    assert outside['distance'] == pytest.approx(0.01 * METERS_PER_DEGREE, rel=1e-3)
+
+
+def test_nearest_site_fallback():
+    index = SiteIndex([
+        circle('near', 0.0, 0.0, 100),
+        circle('far', 1.0, 1.0, 100),
+        polygon('area', [[0.5, 0.5], [0.5, 0.6], [0.6, 0.6], [0.6, 0.5]]),
+    ])
+
+    result = check(index, 0.0, 0.01)
+    assert not result['valid']
+    assert result['site']['id'] == 'near'
+
+    result = check(index, 0.55, 0.65)
+    assert not result['valid']
+    assert result['site']['id'] == 'area'
+    assert result['distance'] == pytest.approx(0.05 * METERS_PER_DEGREE * np.cos(np.radians(0.55)), rel=1e-2)
+
+
+def test_wide_site_is_always_checked():
+    index = SiteIndex([circle('region', 0.0, 0.0, 50000)], cell_size=0.01, max_cells=16)
+
+    assert index._wide == [0]
+    assert check(index, 0.3, 0.3)['valid']
+
+
+def test_no_sites():
+    result = SiteIndex([]).validate(0.0, 0.0)
+    assert result == {'valid': False, 'site': None, 'distance': None}
+
+
+def test_validate_many_matches_validate():
+    rng = np.random.default_rng(0)
+    index = SiteIndex([
+        circle('a', -6.2, 106.8, 300),
+        circle('b', -6.21, 106.81, 800),
+        polygon('c', [[-6.19, 106.79], [-6.19, 106.80], [-6.185, 106.805], [-6.18, 106.79]]),
+    ])
+    lats = -6.2 + rng.uniform(-0.03, 0.03, 200)
+    lons = 106.8 + rng.uniform(-0.03, 0.03, 200)
+
+    for (latitude, longitude), result in zip(zip(lats, lons), index.validate_many(lats, lons)):
+        single = index.validate(float(latitude), float(longitude))
+        assert single['valid'] == result['valid']
+        if single['valid']:
+            assert single['site'] == result['site']
+
+
+@pytest.mark.parametrize('data', [
+    {'name': 'x', 'latitude': 91, 'longitude': 0, 'radius': 10},
+    {'name': 'x', 'latitude': 0, 'longitude': 0, 'radius': 0},
+    {'name': 'x', 'type': 'polygon', 'points': [[0, 0], [1, 1]]},
+    {'name': 'x', 'type': 'square'},
+    {'latitude': 0, 'longitude': 0, 'radius': 10},
+])
+def test_parse_site_rejects_invalid(data):
+    with pytest.raises(ValueError):
+        parse_site(data)
+
+
+def test_legacy_settings_become_primary_site():
+    settings = settings_with_sites({'enabled': True, 'latitude': -6.2, 'longitude': 106.8, 'radius': 150,
+                                    'location_name': 'Kantor'})
+    assert settings['sites'][0]['id'] == 'kantor-pusat'
+    assert settings['sites'][0]['radius'] == 150
+
+    settings['sites'][0]['radius'] = 300
+    assert mirror_primary_site(settings)['radius'] == 300
+
+
+def test_location_settings_reload_on_change(tmp_path):
+    path = str(tmp_path / 'location_settings.json')
+    cache = LocationSettings(path, {'enabled': False, 'latitude': 0.0, 'longitude': 0.0, 'radius': 100})
+
+    enabled, index = cache.index()
+    assert not enabled and len(index) == 1
+    assert cache.index()[1] is index
+
+    with open(path, 'w') as f:
+        json.dump({'enabled': True, 'sites': []}, f)
+    os.utime(path, ns=(1, 1))
+    enabled, index = cache.index()
+    assert enabled and len(index) == 0
+    assert cache.stats()['reloads'] == 2
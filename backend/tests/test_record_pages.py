@@ -0,0 +1,89 @@
+import pytest
+
+from utils.attendance_log import AttendanceJournal
+from utils.record_pages import RecordQuery, encode_cursor, decode_cursor, page_from_lines, parse_bool
+
+
+def make_record(day, minute, user_id, verified=True):
+    timestamp = f'2025-10-{day:02d}T08:{minute:02d}:00'
+    return {'user_id': user_id, 'name': user_id.upper(), 'timestamp': timestamp,
+            'date': timestamp[:10], 'location_verified': verified}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = AttendanceJournal(str(tmp_path / 'attendance.jsonl'), fsync_policy='never')
+    records = [make_record(day, minute, user_id, verified=minute != 2)
+               for day in range(1, 11) for minute, user_id in enumerate(['a', 'b', 'c'])]
+    journal.append_many(records)
+    return journal
+
+
+def lines_from(journal, position=None):
+    end = position[1] if position else None
+    return ((('journal', offset), line) for offset, line in journal.iter_lines_reverse(end))
+
+
+def read_all_pages(journal, limit, use_position=True, **filters):
+    pages, before, position = [], None, None
+    while True:
+        query = RecordQuery('2025-10', limit, before=before, position=position, **filters)
+        resumed = use_position and position is not None
+        records, positions = page_from_lines(lines_from(journal, position if resumed else None), query,
+                                             resumed=resumed)
+        if len(records) <= limit:
+            pages.append(records)
+            return pages
+        pages.append(records[:limit])
+        before, position = decode_cursor(encode_cursor(records[limit - 1], positions[limit - 1]))
+
+
+def test_cursor_round_trip():
+    record = make_record(1, 0, 'a')
+
+    assert decode_cursor(encode_cursor(record)) == ((record['timestamp'], 'a'), None)
+    assert decode_cursor(encode_cursor(record, ('journal', 42))) == ((record['timestamp'], 'a'), ('journal', 42))
+
+
+@pytest.mark.parametrize('cursor', ['!!!', 'bm90IGpzb24', encode_cursor({'timestamp': 1, 'user_id': 'a'}),
+                                    encode_cursor(make_record(1, 0, 'a'), ('journal', -1))])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_month_newest_first(journal):
+    pages = read_all_pages(journal, 7)
+    records = [record for page in pages for record in page]
+
+    assert [len(page) for page in pages] == [7, 7, 7, 7, 2]
+    assert records == list(reversed(journal.read_all()))
+
+
+def test_resume_from_position_matches_cursor_scan(journal):
+    assert read_all_pages(journal, 4) == read_all_pages(journal, 4, use_position=False)
+
+
+def test_filters(journal):
+    records = [record for page in read_all_pages(journal, 2, user_id='b', date_from='2025-10-05')
+               for record in page]
+    assert [record['date'] for record in records] == [f'2025-10-{day:02d}' for day in range(10, 4, -1)]
+    assert {record['user_id'] for record in records} == {'b'}
+
+    unverified = [record for page in read_all_pages(journal, 100, location_verified=False) for record in page]
+    assert len(unverified) == 10
+    assert RecordQuery('2025-10', 10, location_verified=False).filtered
+    assert not RecordQuery('2025-10', 10).filtered
+
+
+def test_missing_cursor_record_gives_empty_page(journal):
+    query = RecordQuery('2025-10', 5, before=('2025-10-01T09:00:00', 'zzz'))
+    assert page_from_lines(lines_from(journal), query) == ([], [])
+
+
+def test_parse_bool():
+    assert parse_bool('ya') is True
+    assert parse_bool('0') is False
+    assert parse_bool('') is None
+    with pytest.raises(ValueError):
+        parse_bool('maybe')
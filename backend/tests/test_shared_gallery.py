@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+import pytest
+
+# shared_gallery mengimpor face_utils, yang butuh face_recognition
+pytest.importorskip('face_recognition')
+
+from utils.encoding_store import EncodingStore  # noqa: E402
+from utils.face_utils import FaceGallery  # noqa: E402
+from utils.shared_gallery import SharedGallery  # noqa: E402
+
+
+def encoding(seed):
+    vector = np.random.default_rng(seed).normal(size=128).astype(np.float32)
+    return vector / np.linalg.norm(vector) * 0.6
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EncodingStore(str(tmp_path / 'encodings.bin'))
+    store.add_many([('a', encoding(1)), ('b', encoding(2))])
+    return store
+
+
+def make_shared(store, tmp_path, publish_delay=0.05):
+    gallery = FaceGallery(templates=store)
+    return SharedGallery(str(tmp_path / 'gallery.bin'), store, gallery, publish_delay), gallery
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_workers_share_one_snapshot(store, tmp_path):
+    first, first_gallery = make_shared(store, tmp_path)
+    second, second_gallery = make_shared(EncodingStore(store.path), tmp_path)
+
+    assert first.refresh()
+    assert second.refresh(wait=False)
+    assert first.publishes == 1 and second.publishes == 0
+    assert first_gallery.match(encoding(1))[0]['user_id'] == 'a'
+    assert second_gallery.match(encoding(2))[0]['user_id'] == 'b'
+
+
+def test_request_path_publishes_in_background(store, tmp_path):
+    shared, gallery = make_shared(store, tmp_path, publish_delay=0.3)
+    shared.refresh()
+    generation = shared.generation
+
+    # Beberapa perubahan berturut-turut: snapshot lama tetap dipakai, publish digabung
+    for seed in range(3, 6):
+        store.add_many([('a', encoding(seed))], replace=False)
+        assert not shared.refresh(wait=False)
+        assert shared.generation == generation
+
+    wait_until(lambda: shared.generation != generation)
+    assert shared.publishes == 2
+    ids, matrix = gallery.export()[:2]
+    np.testing.assert_allclose(matrix[ids.index('a')], store.get('a'), atol=1e-6)
+
+
+def test_missing_snapshot_is_published_immediately(store, tmp_path):
+    shared, gallery = make_shared(store, tmp_path)
+
+    assert shared.refresh(wait=False)
+    assert len(gallery) == 2
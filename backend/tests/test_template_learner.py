@@ -0,0 +1,55 @@
+import threading
+import time
+
+from utils.template_learner import TemplateLearner
+
+
+def test_entries_are_saved_in_background():
+    saved = []
+    learner = TemplateLearner(saved.extend)
+
+    assert learner.submit('a', [1.0])
+    assert learner.submit('b', [2.0])
+    learner.join()
+
+    assert sorted(saved) == [('a', [1.0]), ('b', [2.0])]
+    assert learner.status() == {'queued': 2, 'saved': 2, 'dropped': 0, 'errors': 0, 'pending': 0}
+
+
+def test_one_pending_template_per_user_and_bounded_queue():
+    release = threading.Event()
+    saved = []
+
+    def save(entries):
+        release.wait(5)
+        saved.extend(entries)
+
+    learner = TemplateLearner(save, max_pending=1)
+    assert learner.submit('a', [1.0])
+    # Tunggu thread mengambil 'a' dari antrian (save masih menunggu)
+    while learner._queue.qsize():
+        time.sleep(0.01)
+
+    assert not learner.submit('a', [1.5])
+    assert learner.submit('b', [2.0])
+    assert not learner.submit('c', [3.0])
+    release.set()
+    learner.join()
+
+    assert saved == [('a', [1.0]), ('b', [2.0])]
+    assert learner.stats['dropped'] == 1
+    # Setelah tersimpan, user boleh diantrikan lagi
+    assert learner.submit('a', [1.5])
+    learner.join()
+
+
+def test_save_errors_are_counted():
+    def save(entries):
+        raise OSError("disk full")
+
+    learner = TemplateLearner(save)
+    learner.submit('a', [1.0])
+    learner.join()
+
+    assert learner.stats['errors'] == 1
+    assert learner.status()['pending'] == 0
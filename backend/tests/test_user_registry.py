@@ -0,0 +1,26 @@
+from utils.user_registry import UserRegistry, JsonUserFile
+
+
+def test_update_from_stale_worker_keeps_other_users(tmp_path):
+    path = str(tmp_path / 'users.json')
+    worker_a = UserRegistry(JsonUserFile(path))
+    worker_b = UserRegistry(JsonUserFile(path))
+    worker_a.get()
+    worker_b.get()
+
+    worker_a.update({'a': {'name': 'A'}})
+    worker_b.update({'b': {'name': 'B'}})
+
+    assert sorted(worker_a.get()) == ['a', 'b']
+    assert sorted(worker_b.get()) == ['a', 'b']
+
+
+def test_update_replaces_cache_instead_of_mutating(tmp_path):
+    registry = UserRegistry(JsonUserFile(str(tmp_path / 'users.json')))
+    before = registry.get()
+
+    registry.update({'a': {'name': 'A'}})
+    registry.update({'a': None, 'b': {'name': 'B'}})
+
+    assert before == {}
+    assert list(registry.get()) == ['b']
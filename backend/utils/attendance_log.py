@@ -0,0 +1,250 @@
+import os
+import json
+import shutil
+import time
+import threading
+import logging
+
+from utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+REVERSE_BLOCK_SIZE = 64 * 1024
+
+
+class AttendanceJournal:
+    """
+    Log absensi append-only, satu JSON object per baris.
+
+    Append memakai file lock sehingga aman dari banyak worker. Setelah
+    write, ``fsync_policy`` menentukan kapan data dipaksa ke disk:
+    'always' (setiap append), 'interval' (paling lama tiap
+    ``fsync_interval`` detik) atau 'never' (diserahkan ke OS).
+    """
+
+    def __init__(self, path, fsync_policy='always', fsync_interval=1.0):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self._last_fsync = 0.0
+        self._lock = threading.Lock()
+        # (inode, baris pertama, offset, jumlah) hasil count() terakhir
+        self._count_lock = threading.Lock()
+        self._counted = None
+
+    def _should_fsync(self):
+        if self.fsync_policy == 'always':
+            return True
+        if self.fsync_policy == 'interval':
+            now = time.monotonic()
+            if now - self._last_fsync >= self.fsync_interval:
+                self._last_fsync = now
+                return True
+        return False
+
+    @staticmethod
+    def _encode(records):
+        return ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Tambah record di akhir file dalam satu kali write"""
+        if not records:
+            return
+        data = self._encode(records)
+        with file_lock(self.path):
+            with open(self.path, 'a+b') as f:
+                # Tutup baris terpotong (proses mati saat menulis) sebelum append
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        data = b'\n' + data
+                f.write(data)
+                f.flush()
+                with self._lock:
+                    if self._should_fsync():
+                        os.fsync(f.fileno())
+
+    def __iter__(self):
+        return self.iter_records()
+
+    def iter_records(self):
+        """Stream record satu per satu tanpa memuat seluruh file"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Baris terakhir bisa terpotong jika proses mati saat menulis
+                    logger.warning(f"Skipping corrupt line {line_no} in {self.path}")
+
+    def iter_lines_reverse(self, end=None, block_size=REVERSE_BLOCK_SIZE):
+        """
+        (offset, baris) mentah (bytes, belum di-parse) dari akhir file ke
+        awal; ``offset`` = posisi byte awal baris. File dibaca per blok
+        dari belakang, jadi record terbaru didapat tanpa membaca seluruh
+        journal. ``end``: mulai dari baris sebelum offset ini (lanjutan
+        halaman sebelumnya).
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            position = size if end is None else min(end, size)
+            remainder = b''
+            while position > 0:
+                read_size = min(block_size, position)
+                position -= read_size
+                f.seek(position)
+                lines = (f.read(read_size) + remainder).split(b'\n')
+                # Baris pertama blok mungkin belum lengkap, disambung dengan blok sebelumnya
+                remainder = lines.pop(0)
+                offset = position + len(remainder) + 1
+                offsets = []
+                for line in lines:
+                    offsets.append(offset)
+                    offset += len(line) + 1
+                for offset, line in zip(reversed(offsets), reversed(lines)):
+                    if line.strip():
+                        yield offset, line
+            if remainder.strip():
+                yield 0, remainder
+
+    def read_line(self, offset):
+        """Baris mentah yang dimulai di ``offset``, atau None"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.readline() or None
+
+    def read_all(self):
+        return list(self.iter_records())
+
+    def count(self):
+        """
+        Jumlah record (hitung baris, tanpa parse JSON). Hitungan disimpan
+        bersama offset baris lengkap terakhir, jadi panggilan berikutnya
+        hanya membaca byte yang di-append sejak itu. File yang ditulis
+        ulang (rollover / rewrite: inode atau baris pertama berbeda)
+        dihitung ulang dari awal.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f, self._count_lock:
+            inode = os.fstat(f.fileno()).st_ino
+            first_line = f.readline()
+            if self._counted is not None and self._counted[:2] == (inode, first_line):
+                offset, count = self._counted[2:]
+            else:
+                offset, count = 0, 0
+            f.seek(offset)
+            tail = b''
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Baris terakhir belum lengkap (sedang ditulis / terpotong)
+                    tail = line
+                    break
+                offset += len(line)
+                if line.strip():
+                    count += 1
+            self._counted = (inode, first_line, offset, count)
+            return count + (1 if tail.strip() else 0)
+
+    def first_record(self):
+        """Record pertama (paling lama) tanpa membaca seluruh file"""
+        for record in self.iter_records():
+            return record
+        return None
+
+    def last_record(self):
+        """Record terakhir (paling baru), dibaca dari akhir file"""
+        for _, line in self.iter_lines_reverse():
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+        return None
+
+    def months(self):
+        """
+        Bulan (YYYY-MM dari ``timestamp``) yang ada di journal, terbaru
+        dulu. Journal urut waktu: jika record pertama dan terakhir di bulan
+        yang sama, tidak ada baris lain yang dibaca; jika tidak (rollover
+        belum jalan), record dibaca sampai bulan record terakhir.
+        """
+        first, last = self.first_record(), self.last_record()
+        if first is None or last is None:
+            return []
+        first_month, last_month = first.get('timestamp', '')[:7], last.get('timestamp', '')[:7]
+        months = {first_month, last_month}
+        if first_month != last_month:
+            for record in self.iter_records():
+                month = record.get('timestamp', '')[:7]
+                if month == last_month:
+                    break
+                months.add(month)
+        months.discard('')
+        return sorted(months, reverse=True)
+
+    def move_prefix(self, should_move, sink):
+        """
+        Keluarkan record di awal journal selama ``should_move(record)``
+        bernilai True. Record tersebut diserahkan ke ``sink(records)``
+        dulu, baru journal ditulis ulang dengan sisa file yang disalin apa
+        adanya (tanpa parse). Journal di-append urut waktu, jadi record
+        lama selalu berada di awal file.
+        Return jumlah record yang dipindah.
+        """
+        with file_lock(self.path):
+            if not os.path.exists(self.path):
+                return 0
+            moved = []
+            tmp_path = self.path + '.tmp'
+            with open(self.path, 'rb') as src:
+                offset = 0
+                for line in iter(src.readline, b''):
+                    if line.strip():
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            logger.warning(f"Dropping corrupt line in {self.path} during rollover")
+                            record = None
+                        if record is not None:
+                            if not should_move(record):
+                                break
+                            moved.append(record)
+                    offset = src.tell()
+                if not moved:
+                    return 0
+
+                sink(moved)
+                src.seek(offset)
+                with open(tmp_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+            os.replace(tmp_path, self.path)
+            return len(moved)
+
+    def rewrite(self, records):
+        """Ganti seluruh isi journal secara atomic (tmp file + rename)"""
+        data = self._encode(records)
+        tmp_path = self.path + '.tmp'
+        with file_lock(self.path):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,129 @@
+import os
+import json
+import threading
+import logging
+from datetime import datetime, timedelta
+
+from utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Hitungan per hari hanya disimpan untuk beberapa minggu terakhir
+DAYS_TO_KEEP = 62
+
+
+def empty_stats():
+    return {'total': 0, 'days': {}, 'months': {}}
+
+
+class AttendanceStats:
+    """
+    Agregat absensi yang diperbarui setiap kali record ditulis dan
+    disimpan di file JSON kecil: jumlah & lokasi invalid per hari,
+    jumlah & total similarity per bulan, serta total semua record.
+    Dashboard cukup membaca agregat ini, berapa pun banyaknya riwayat.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = None
+        self._signature = None
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def get(self):
+        """Agregat terkini (dibaca ulang hanya jika file berubah)"""
+        with self._lock:
+            signature = self._stat_signature()
+            if self._stats is None or signature != self._signature:
+                self._stats = self._read()
+                self._signature = signature
+            return self._stats
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return empty_stats()
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, stats):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(stats, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            self._stats = stats
+            self._signature = self._stat_signature()
+
+    @staticmethod
+    def _apply(stats, records):
+        for record in records:
+            day = stats['days'].setdefault(record['date'], {'count': 0, 'invalid_location': 0})
+            day['count'] += 1
+            if not record.get('location_verified', True):
+                day['invalid_location'] += 1
+
+            month = stats['months'].setdefault(
+                record['timestamp'][:7], {'count': 0, 'similarity_sum': 0.0, 'similarity_count': 0})
+            month['count'] += 1
+            if record.get('similarity') is not None:
+                month['similarity_sum'] += record['similarity']
+                month['similarity_count'] += 1
+
+            stats['total'] += 1
+
+    @staticmethod
+    def _prune(stats):
+        cutoff = (datetime.now() - timedelta(days=DAYS_TO_KEEP)).strftime("%Y-%m-%d")
+        for day in [day for day in stats['days'] if day < cutoff]:
+            del stats['days'][day]
+
+    def add_records(self, records):
+        """Perbarui agregat untuk record yang baru saja disimpan"""
+        if not records:
+            return
+        with file_lock(self.path):
+            stats = self._read()
+            self._apply(stats, records)
+            self._prune(stats)
+            self._write(stats)
+
+    def rebuild(self, records):
+        """Hitung ulang semua agregat dari iterable record"""
+        stats = empty_stats()
+        with file_lock(self.path):
+            self._apply(stats, records)
+            self._prune(stats)
+            self._write(stats)
+        logger.info(f"✅ Attendance stats rebuilt: {stats['total']} records")
+        return stats
+
+    def summary(self, today, current_month):
+        """Angka yang dibutuhkan dashboard, O(1)"""
+        stats = self.get()
+        day = stats['days'].get(today, {})
+        month = stats['months'].get(current_month, {})
+        active_months = [key for key, info in stats['months'].items() if info['count']]
+
+        average_similarity = None
+        if month.get('similarity_count'):
+            average_similarity = month['similarity_sum'] / month['similarity_count']
+
+        return {
+            'today': day.get('count', 0),
+            'invalid_location_today': day.get('invalid_location', 0),
+            'total_all_months': stats['total'],
+            'current_month': month.get('count', 0),
+            'average_similarity': average_similarity,
+            'active_months': len(active_months),
+            'historical_months': len([key for key in active_months if key != current_month])
+        }
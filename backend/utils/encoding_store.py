@@ -0,0 +1,330 @@
+import os
+import struct
+import threading
+import logging
+
+import numpy as np
+
+from utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FENC'
+VERSION = 1
+# magic, version, dim, count (jumlah row termasuk yang sudah dihapus), generation
+HEADER = struct.Struct('<4sIIQQ')
+HEADER_SIZE = 64
+USER_ID_SIZE = 32
+# Compact otomatis jika row deleted lebih dari ini dan lebih banyak dari row hidup
+COMPACT_MIN_DELETED = 1024
+
+
+def user_id_error(user_id):
+    """Pesan error jika user_id tidak muat di kolom user_id (USER_ID_SIZE byte UTF-8), atau None"""
+    if len(user_id.encode('utf-8')) > USER_ID_SIZE:
+        return f"User ID terlalu panjang (max {USER_ID_SIZE} byte)"
+    return None
+
+
+def validate_user_id(user_id):
+    error = user_id_error(user_id)
+    if error:
+        raise ValueError(error)
+
+
+def record_dtype(dim):
+    return np.dtype([
+        ('user_id', f'S{USER_ID_SIZE}'),
+        ('deleted', 'u1'),
+        ('reserved', 'u1', (3,)),
+        ('encoding', '<f4', (dim,))
+    ])
+
+
+class EncodingStore:
+    """
+    File binary berisi encoding wajah float32 dengan layout tetap:
+    header 64 byte lalu row (user_id, flag deleted, encoding) berurutan.
+
+    File di-memory-map read-only sehingga lookup tidak pernah mem-parse
+    ulang encoding, dan semua worker membaca page yang sama dari OS page
+    cache. Penulisan hanya append / set flag deleted di bawah file lock;
+    worker lain melihat perubahan lewat ``refresh()``.
+
+    Satu user boleh punya beberapa row (template, urut sesuai waktu
+    ditambah); ``get()`` mengembalikan centroid-nya.
+    """
+
+    def __init__(self, path, dim=128):
+        self.path = path
+        self.dim = dim
+        self.dtype = record_dtype(dim)
+        self._lock = threading.RLock()
+        self._signature = None
+        self._records = None
+        self._rows = {}
+        self._live = 0
+        self.refresh()
+
+    def _create(self):
+        with open(self.path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.dim, 0, 0).ljust(HEADER_SIZE, b'\0'))
+        logger.info(f"Created new encoding store: {self.path}")
+
+    def _read_header(self, f):
+        f.seek(0)
+        magic, version, dim, count, generation = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or dim != self.dim:
+            raise ValueError(f"Invalid encoding store file: {self.path}")
+        return count, generation
+
+    def _write_header(self, f, count, generation):
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, self.dim, count, generation))
+
+    def refresh(self):
+        """Map ulang file jika berubah (append/hapus dari worker lain)"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                with file_lock(self.path):
+                    if not os.path.exists(self.path):
+                        self._create()
+
+            with open(self.path, 'rb') as f:
+                count, generation = self._read_header(f)
+                signature = (os.fstat(f.fileno()).st_ino, count, generation)
+            if signature == self._signature:
+                return False
+
+            if count:
+                records = np.memmap(self.path, dtype=self.dtype, mode='r',
+                                    offset=HEADER_SIZE, shape=(count,))
+            else:
+                records = np.zeros(0, dtype=self.dtype)
+
+            rows = {}
+            live = np.flatnonzero(records['deleted'] == 0)
+            for row, user_id in zip(live.tolist(), records['user_id'][live].tolist()):
+                rows.setdefault(user_id.decode('utf-8'), []).append(row)
+
+            self._records = records
+            self._rows = rows
+            self._live = len(live)
+            self._signature = signature
+            return True
+
+    @property
+    def signature(self):
+        """(inode, count, generation) file yang sedang di-map"""
+        return self._signature
+
+    def user_ids(self):
+        with self._lock:
+            return list(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, user_id):
+        return user_id in self._rows
+
+    @property
+    def template_total(self):
+        """Jumlah semua template (row hidup) di store"""
+        return self._live
+
+    def _centroid(self, records, rows):
+        if len(rows) == 1:
+            return records['encoding'][rows[0]]
+        return records['encoding'][rows].mean(axis=0, dtype=np.float32)
+
+    def get(self, user_id, default=None):
+        """
+        Encoding float32 milik user_id: view ke memory map jika hanya
+        ada satu template, centroid semua template jika lebih.
+        """
+        with self._lock:
+            rows = self._rows.get(user_id)
+            if rows is None:
+                return default
+            return self._centroid(self._records, rows)
+
+    def get_many(self, user_ids):
+        """
+        Encoding (centroid) beberapa user sekaligus, array len x dim.
+        Return (encodings, found) dengan ``found`` mask user yang ada.
+        """
+        with self._lock:
+            rows = [self._rows.get(user_id) for user_id in user_ids]
+            found = np.array([user_rows is not None for user_rows in rows], dtype=bool)
+            encodings = np.zeros((len(user_ids), self.dim), dtype=np.float32)
+            single = [i for i, user_rows in enumerate(rows) if user_rows is not None and len(user_rows) == 1]
+            if single:
+                encodings[single] = self._records['encoding'][[rows[i][0] for i in single]]
+            for i, user_rows in enumerate(rows):
+                if user_rows is not None and len(user_rows) > 1:
+                    encodings[i] = self._centroid(self._records, user_rows)
+            return encodings, found
+
+    def centroids(self):
+        """
+        (user_ids, matrix) semua user sekaligus: user_ids array bytes
+        (terurut), matrix centroid float32 len x dim. Dihitung vectorized
+        dari memory map, tanpa loop per user.
+        """
+        with self._lock:
+            records = self._records
+            live = np.flatnonzero(records['deleted'] == 0)
+            user_ids, inverse, counts = np.unique(records['user_id'][live], return_inverse=True,
+                                                  return_counts=True)
+            sums = np.zeros((len(user_ids), self.dim), dtype=np.float32)
+            np.add.at(sums, inverse, records['encoding'][live])
+        return user_ids, sums / counts[:, None].astype(np.float32)
+
+    def templates(self, user_id):
+        """Semua template user_id (array k x dim), atau None"""
+        with self._lock:
+            rows = self._rows.get(user_id)
+            if rows is None:
+                return None
+            return self._records['encoding'][rows]
+
+    def template_count(self, user_id):
+        return len(self._rows.get(user_id, ()))
+
+    def version(self, user_id):
+        """Berubah setiap kali template user_id berubah (tambah/hapus/compact)"""
+        rows = self._rows.get(user_id)
+        return (self.signature[0],) + tuple(rows) if rows else None
+
+    def items(self):
+        """(user_id, centroid) untuk setiap user"""
+        with self._lock:
+            records = self._records
+            rows = list(self._rows.items())
+        for user_id, user_rows in rows:
+            yield user_id, self._centroid(records, user_rows)
+
+    def add(self, user_id, encoding):
+        """Append encoding untuk user_id (row lama user_id ditandai deleted)"""
+        self.add_many([(user_id, encoding)])
+
+    def add_many(self, entries, replace=True, max_templates=None):
+        """
+        Append banyak encoding dalam satu kali tulis. ``replace=True``:
+        template lama user tersebut ditandai deleted; ``replace=False``:
+        encoding ditambahkan sebagai template tambahan, dan jika lebih
+        dari ``max_templates`` template tertua selain yang pertama
+        (dari registrasi) dibuang.
+        """
+        if not entries:
+            return
+        batch = np.zeros(len(entries), dtype=self.dtype)
+        for i, (user_id, encoding) in enumerate(entries):
+            validate_user_id(user_id)
+            batch[i]['user_id'] = user_id.encode('utf-8')
+            batch[i]['encoding'] = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+
+        with self._lock, file_lock(self.path):
+            self.refresh()
+            old_rows = []
+            if replace:
+                old_rows = [row for user_id in dict.fromkeys(user_id for user_id, _ in entries)
+                            for row in self._rows.get(user_id, ())]
+            elif max_templates:
+                old_rows, skipped = self._evict(entries, max_templates)
+                batch = np.delete(batch, skipped)
+
+            with open(self.path, 'r+b') as f:
+                # Row baru + header di-fsync dulu, baru row lama ditandai deleted:
+                # crash di antaranya hanya menyisakan template ekstra, bukan user
+                # tanpa template
+                count, generation = self._read_header(f)
+                f.seek(HEADER_SIZE + count * self.dtype.itemsize)
+                f.write(batch.tobytes())
+                count += len(batch)
+                self._write_header(f, count, generation + 1)
+                f.flush()
+                os.fsync(f.fileno())
+                if self._mark_rows_deleted(f, old_rows):
+                    self._write_header(f, count, generation + 2)
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.refresh()
+        self._compact_if_needed()
+
+    def remove(self, user_id):
+        """Tandai semua template user_id sebagai deleted"""
+        with self._lock, file_lock(self.path):
+            self.refresh()
+            with open(self.path, 'r+b') as f:
+                removed = self._mark_deleted(f, [user_id])
+                if removed:
+                    count, generation = self._read_header(f)
+                    self._write_header(f, count, generation + 1)
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.refresh()
+        self._compact_if_needed()
+        return removed
+
+    def _compact_if_needed(self):
+        """Compact jika row deleted (replace, eviction, hapus) sudah mendominasi file"""
+        with self._lock:
+            deleted = len(self._records) - self._live
+        if deleted > COMPACT_MIN_DELETED and deleted > self._live:
+            self.compact()
+
+    def _evict(self, entries, max_templates):
+        """
+        Template tertua yang dibuang agar setiap user punya paling banyak
+        ``max_templates`` template setelah ``entries`` ditambahkan. Template
+        pertama (registrasi) selalu dipertahankan; jika row lama tidak
+        cukup, entry baru yang paling awal ikut dibuang.
+        Return (row lama yang dihapus, index entry yang tidak ditulis).
+        """
+        by_user = {}
+        for i, (user_id, _) in enumerate(entries):
+            by_user.setdefault(user_id, []).append(i)
+
+        evicted, skipped = [], []
+        for user_id, indexes in by_user.items():
+            rows = self._rows.get(user_id, [])
+            # Urut waktu: row lama lalu entry baru; yang pertama (registrasi) tidak pernah dibuang
+            templates = [('row', row) for row in rows] + [('entry', i) for i in indexes]
+            excess = len(templates) - max(1, max_templates)
+            for kind, value in templates[1:1 + max(0, excess)]:
+                if kind == 'row':
+                    evicted.append(value)
+                else:
+                    skipped.append(value)
+        return evicted, skipped
+
+    def _mark_deleted(self, f, user_ids):
+        rows = [row for uid in user_ids for row in self._rows.get(uid, ())]
+        return self._mark_rows_deleted(f, rows)
+
+    def _mark_rows_deleted(self, f, rows):
+        if not rows:
+            return False
+        flag_offset = self.dtype.fields['deleted'][1]
+        for row in rows:
+            f.seek(HEADER_SIZE + row * self.dtype.itemsize + flag_offset)
+            f.write(b'\1')
+        return True
+
+    def compact(self):
+        """Tulis ulang file tanpa row yang sudah dihapus"""
+        with self._lock, file_lock(self.path):
+            self.refresh()
+            live = self._records[self._records['deleted'] == 0]
+            generation = self._signature[2] + 1
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, self.dim, len(live), generation).ljust(HEADER_SIZE, b'\0'))
+                f.write(np.ascontiguousarray(live).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.refresh()
+            logger.info(f"Encoding store compacted: {len(live)} rows")
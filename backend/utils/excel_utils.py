@@ -0,0 +1,127 @@
+import io
+import csv
+import logging
+import tempfile
+
+from openpyxl import Workbook
+
+logger = logging.getLogger(__name__)
+
+# Ukuran chunk response dan jumlah row per batch Parquet
+CHUNK_SIZE = 64 * 1024
+PARQUET_BATCH_ROWS = 10000
+
+EXPORT_COLUMNS = [
+    ('User ID', lambda r: r['user_id']),
+    ('Nama', lambda r: r['name']),
+    ('Tanggal', lambda r: r['date']),
+    ('Waktu', lambda r: r['time']),
+    ('Tingkat Kemiripan', lambda r: f"{r['similarity']:.2%}"),
+    ('Confidence', lambda r: r['confidence']),
+    ('Status', lambda r: r['status']),
+    ('Lokasi Valid', lambda r: 'Ya' if r.get('location_verified', True) else 'Tidak'),
+    ('Pesan Lokasi', lambda r: r.get('location_message', 'Tidak tersedia')),
+    ('Latitude', lambda r: r.get('user_latitude', '')),
+    ('Longitude', lambda r: r.get('user_longitude', '')),
+]
+
+EXPORT_FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def export_headers():
+    return [header for header, _ in EXPORT_COLUMNS]
+
+
+def export_row(record):
+    return [value(record) for _, value in EXPORT_COLUMNS]
+
+
+def _stream_file(f):
+    f.seek(0)
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_csv(records):
+    """CSV dikirim per chunk sambil record dibaca, byte pertama langsung keluar"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM agar Excel membaca UTF-8 dengan benar
+    buffer.write('\ufeff')
+    writer.writerow(export_headers())
+    for record in records:
+        writer.writerow(export_row(record))
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_xlsx(records, sheet_name):
+    """
+    Workbook openpyxl write-only: setiap row langsung ditulis ke file
+    sementara, bukan disimpan di memory. File .xlsx (zip) baru lengkap
+    setelah row terakhir, lalu dikirim per chunk.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name[:31])
+    sheet.append(export_headers())
+    for record in records:
+        sheet.append(export_row(record))
+
+    with tempfile.TemporaryFile() as f:
+        workbook.save(f)
+        yield from _stream_file(f)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ValueError("Export Parquet membutuhkan pyarrow (pip install pyarrow)")
+
+
+def iter_parquet(records):
+    """Parquet (butuh pyarrow), ditulis per batch row ke file sementara"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(header, pa.string()) for header in export_headers()])
+
+    def to_batch(rows):
+        columns = list(zip(*rows))
+        return pa.record_batch([pa.array([None if v in ('', None) else str(v) for v in column], pa.string())
+                                for column in columns], schema=schema)
+
+    with tempfile.TemporaryFile() as f:
+        with pq.ParquetWriter(f, schema) as writer:
+            rows = []
+            for record in records:
+                rows.append(export_row(record))
+                if len(rows) >= PARQUET_BATCH_ROWS:
+                    writer.write_batch(to_batch(rows))
+                    rows = []
+            if rows:
+                writer.write_batch(to_batch(rows))
+        yield from _stream_file(f)
+
+
+def iter_export(records, export_format, sheet_name='Absensi'):
+    """Generator bytes file export dalam ``export_format`` (xlsx / csv / parquet)"""
+    if export_format == 'csv':
+        return iter_csv(records)
+    if export_format == 'xlsx':
+        return iter_xlsx(records, sheet_name)
+    if export_format == 'parquet':
+        _require_pyarrow()
+        return iter_parquet(records)
+    raise ValueError(f"Format export tidak dikenal: {export_format}")
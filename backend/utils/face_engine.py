@@ -0,0 +1,164 @@
+import os
+import time
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EngineBusy(Exception):
+    """Antrian engine penuh, request harus ditolak (backpressure)"""
+
+
+class EngineTimeout(Exception):
+    """Job tidak selesai dalam batas waktu"""
+
+
+def _init_worker():
+    """Load model dlib sekali per child process lalu jalankan satu pass kosong"""
+    import face_recognition
+    blank = np.zeros((64, 64, 3), dtype=np.uint8)
+    face_recognition.face_locations(blank, model="hog")
+    face_recognition.face_encodings(blank, [(0, 63, 63, 0)])
+
+
+def _ping():
+    return os.getpid()
+
+
+class FaceEngine:
+    """
+    Engine deteksi/encoding wajah di process pool terpisah dari thread
+    Flask. Jumlah job yang menunggu dibatasi ``max_pending``; jika
+    penuh ``run()`` langsung melempar EngineBusy alih-alih menumpuk
+    request. ``workers=0`` menjalankan job langsung di thread pemanggil.
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.stats = {'submitted': 0, 'completed': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0, 'restarts': 0}
+
+    def _get_executor(self):
+        with self._lock:
+            # Pool dibuat ulang di process baru (mis. setelah gunicorn fork)
+            if self._executor is None or self._pid != os.getpid():
+                context = None
+                if 'fork' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('fork')
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                     initializer=_init_worker)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """Buang pool yang rusak (child crash); pool baru dibuat saat submit berikutnya"""
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.stats['restarts'] += 1
+
+    def warm_up(self):
+        """Spawn semua child dan load model sebelum request pertama"""
+        if self.workers <= 0:
+            return
+        executor = self._get_executor()
+        pids = {future.result() for future in [executor.submit(_ping) for _ in range(self.workers * 2)]}
+        logger.info(f"🔥 Face engine warm: {len(pids)} worker process(es)")
+
+    def _release(self, _future=None):
+        self._slots.release()
+
+    def run(self, fn, *args):
+        """Jalankan ``fn(*args)`` di pool dan tunggu hasilnya"""
+        return self.run_many(fn, [args])[0]
+
+    def run_many(self, fn, args_list):
+        """
+        Jalankan ``fn(*args)`` untuk setiap args secara paralel di pool.
+        Butuh satu slot per job; jika tidak semua slot tersedia seluruh
+        batch ditolak dengan EngineBusy. Timeout berlaku untuk satu batch.
+        Jika child process mati (segfault dlib, OOM) pool dibuat ulang
+        dan batch dicoba sekali lagi.
+        """
+        if self.workers <= 0:
+            self._acquire_slots(len(args_list))
+            try:
+                return [fn(*args) for args in args_list]
+            finally:
+                self.stats['completed'] += len(args_list)
+                for _ in args_list:
+                    self._release()
+
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return self._run_batch(executor, fn, args_list)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                if attempt:
+                    raise
+                logger.warning("⚠️ Face engine worker crashed, restarting process pool")
+
+    def _acquire_slots(self, count):
+        for acquired in range(count):
+            if not self._slots.acquire(blocking=False):
+                for _ in range(acquired):
+                    self._release()
+                self.stats['rejected'] += 1
+                raise EngineBusy("Face engine queue is full")
+        self.stats['submitted'] += count
+
+    def _run_batch(self, executor, fn, args_list):
+        self._acquire_slots(len(args_list))
+
+        futures = []
+        try:
+            for args in args_list:
+                future = executor.submit(fn, *args)
+                # Slot baru dilepas saat job benar-benar selesai, termasuk job yang timeout
+                future.add_done_callback(self._release)
+                futures.append(future)
+        except Exception:
+            for _ in range(len(args_list) - len(futures)):
+                self._release()
+            for future in futures:
+                future.cancel()
+            self.stats['errors'] += 1
+            raise
+
+        deadline = time.monotonic() + self.timeout
+        results = []
+        try:
+            for future in futures:
+                results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except FutureTimeout:
+            for future in futures:
+                future.cancel()
+            self.stats['timeouts'] += 1
+            raise EngineTimeout(f"Face engine job exceeded {self.timeout}s")
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        self.stats['completed'] += len(results)
+        return results
+
+    def status(self):
+        return dict(self.stats, workers=self.workers, max_pending=self.max_pending, timeout=self.timeout)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
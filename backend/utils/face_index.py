@@ -0,0 +1,122 @@
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def kmeans(data, k, iterations=10, seed=0):
+    """K-means sederhana (NumPy) untuk coarse clustering IVF"""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    data_sq = np.einsum('ij,ij->i', data, data)
+
+    for _ in range(iterations):
+        assignment = assign_nearest(data, centroids, data_sq)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Cluster kosong diisi ulang dengan titik acak
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), size=len(empty), replace=False)]
+
+    return centroids
+
+
+def assign_nearest(data, centroids, data_sq=None):
+    """Index centroid terdekat untuk setiap row data"""
+    if data_sq is None:
+        data_sq = np.einsum('ij,ij->i', data, data)
+    centroid_sq = np.einsum('ij,ij->i', centroids, centroids)
+    sq = data_sq[:, None] + centroid_sq[None, :] - 2.0 * (data @ centroids.T)
+    return np.argmin(sq, axis=1)
+
+
+class IVFIndex:
+    """
+    Inverted-file index: encoding dikelompokkan ke ``nlist`` cluster,
+    query hanya memeriksa ``nprobe`` cluster terdekat. Hasilnya berupa
+    shortlist kandidat yang kemudian di-rank ulang secara exact oleh gallery.
+    """
+
+    def __init__(self, nlist=0, nprobe=8, min_size=5000, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_size = min_size
+        self.seed = seed
+        self.centroids = None
+        self.trained_size = 0
+        self._lists = []
+        self._assignment = {}
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def needs_training(self, size):
+        if size < self.min_size:
+            return False
+        return not self.is_trained or size >= 2 * self.trained_size
+
+    def train(self, matrix, ids):
+        """Bangun cluster dari matrix encoding (row ke-i milik ids[i])"""
+        size = len(ids)
+        nlist = self.nlist or int(4 * math.sqrt(size))
+        nlist = max(1, min(nlist, size))
+
+        # Training cukup memakai sample, assignment tetap untuk semua row
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(size, nlist * 64)
+        sample = matrix[rng.choice(size, size=sample_size, replace=False)]
+        self.centroids = kmeans(sample, nlist, seed=self.seed)
+
+        assignment = assign_nearest(matrix, self.centroids)
+        self._lists = [set() for _ in range(nlist)]
+        self._assignment = {}
+        for user_id, list_no in zip(ids, assignment.tolist()):
+            self._lists[list_no].add(user_id)
+            self._assignment[user_id] = list_no
+        self.trained_size = size
+        logger.info(f"✅ IVF index trained: {size} encodings, {nlist} clusters")
+
+    def trained_copy(self, matrix, ids):
+        """Index baru dengan parameter sama yang di-train dari matrix; ``self`` tidak diubah"""
+        index = IVFIndex(nlist=self.nlist, nprobe=self.nprobe, min_size=self.min_size, seed=self.seed)
+        index.train(matrix, ids)
+        return index
+
+    def add(self, user_id, vector):
+        if not self.is_trained:
+            return
+        self.remove(user_id)
+        list_no = int(assign_nearest(vector[None, :], self.centroids)[0])
+        self._lists[list_no].add(user_id)
+        self._assignment[user_id] = list_no
+
+    def remove(self, user_id):
+        list_no = self._assignment.pop(user_id, None)
+        if list_no is not None:
+            self._lists[list_no].discard(user_id)
+
+    def candidates(self, query, nprobe=None):
+        """user_id kandidat dari ``nprobe`` cluster terdekat ke query"""
+        nprobe = min(nprobe or self.nprobe, len(self._lists))
+        sq = np.einsum('ij,ij->i', self.centroids, self.centroids) - 2.0 * (self.centroids @ query)
+        probes = np.argpartition(sq, nprobe - 1)[:nprobe]
+        result = []
+        for list_no in probes:
+            result.extend(self._lists[list_no])
+        return result
+
+
+def create_index(kind, nlist=0, nprobe=8, min_size=5000):
+    """Index untuk FaceGallery sesuai config, None untuk brute-force"""
+    if kind == 'flat':
+        return None
+    if kind == 'ivf':
+        return IVFIndex(nlist=nlist, nprobe=nprobe, min_size=min_size)
+    raise ValueError(f"Unknown gallery index: {kind}")
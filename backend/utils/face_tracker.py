@@ -0,0 +1,155 @@
+import itertools
+import struct
+import logging
+
+from utils.face_utils import locate_faces, encode_located
+
+logger = logging.getLogger(__name__)
+
+# Protokol stream: setiap frame JPEG diawali panjangnya (uint32 big-endian),
+# panjang 0 menandai akhir stream
+FRAME_HEADER = struct.Struct('>I')
+
+
+def _read_exact(stream, size):
+    chunks = []
+    while size > 0:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def iter_stream_frames(stream, max_frame_bytes):
+    """Baca frame satu per satu dari file-like ``stream`` begitu datang"""
+    while True:
+        header = _read_exact(stream, FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return
+        (length,) = FRAME_HEADER.unpack(header)
+        if length == 0:
+            return
+        if length > max_frame_bytes:
+            raise ValueError(f"Frame terlalu besar: {length} bytes")
+        data = _read_exact(stream, length)
+        if len(data) < length:
+            raise ValueError("Frame terpotong")
+        yield data
+
+
+def box_iou(a, b):
+    """IoU dua box (top, right, bottom, left)"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    intersection = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return intersection / float(area_a + area_b - intersection)
+
+
+def match_boxes(previous, current, iou_threshold):
+    """
+    Pasangkan box lama dan box baru secara greedy berdasarkan IoU
+    tertinggi. Return list (index_previous, index_current).
+    """
+    pairs = []
+    for i, a in enumerate(previous):
+        for j, b in enumerate(current):
+            iou = box_iou(a, b)
+            if iou >= iou_threshold:
+                pairs.append((iou, i, j))
+    pairs.sort(reverse=True)
+
+    used_previous, used_current, matches = set(), set(), []
+    for _, i, j in pairs:
+        if i not in used_previous and j not in used_current:
+            used_previous.add(i)
+            used_current.add(j)
+            matches.append((i, j))
+    return matches
+
+
+def detect_and_encode_new(rgb_image, settled_boxes, iou_threshold):
+    """
+    Job face engine untuk satu frame stream: deteksi semua wajah (sesuai
+    DETECTION_MODE, lihat ``locate_faces``), tapi hitung encoding hanya
+    untuk box yang tidak cocok dengan track yang sudah settled.
+    Return (boxes, {index_box: encoding}).
+    """
+    boxes, cropped = locate_faces(rgb_image)
+    settled = {j for _, j in match_boxes(settled_boxes, boxes, iou_threshold)}
+    to_encode = [j for j in range(len(boxes)) if j not in settled]
+    encodings = encode_located(rgb_image, [boxes[j] for j in to_encode], cropped)
+    return boxes, dict(zip(to_encode, encodings))
+
+
+class Track:
+    """Satu wajah yang diikuti dari frame ke frame"""
+
+    def __init__(self, track_id, box, frame_index):
+        self.track_id = track_id
+        self.box = box
+        self.first_frame = frame_index
+        self.last_seen = frame_index
+        self.last_encoded = None
+        self.encodings = 0
+        self.missed = 0
+        self.match = None
+        self.reported = False
+
+    def needs_encoding(self, frame_index, settle_similarity, reencode_interval):
+        """Encode sekali; ulangi hanya jika belum dikenali / confidence masih rendah"""
+        if self.last_encoded is None:
+            return True
+        if self.match is not None and self.match['similarity'] >= settle_similarity:
+            return False
+        return frame_index - self.last_encoded >= reencode_interval
+
+
+class FaceTracker:
+    """
+    Tracker IoU sederhana: box di frame baru dipasangkan dengan track
+    yang ada, box tanpa pasangan menjadi track baru, dan track yang tidak
+    terlihat selama ``max_missed`` frame dibuang.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=10, settle_similarity=0.7, reencode_interval=10):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.settle_similarity = settle_similarity
+        self.reencode_interval = reencode_interval
+        self.tracks = []
+        self.total_tracks = 0
+        self._ids = itertools.count(1)
+
+    def settled_boxes(self, frame_index):
+        """Box track yang tidak perlu di-encode lagi di frame ini"""
+        return [track.box for track in self.tracks
+                if not track.needs_encoding(frame_index, self.settle_similarity, self.reencode_interval)]
+
+    def update(self, boxes, frame_index):
+        """Return track untuk setiap box (urutan sama dengan ``boxes``)"""
+        assigned = [None] * len(boxes)
+        for i, j in match_boxes([track.box for track in self.tracks], boxes, self.iou_threshold):
+            track = self.tracks[i]
+            track.box = boxes[j]
+            track.last_seen = frame_index
+            track.missed = 0
+            assigned[j] = track
+
+        for track in self.tracks:
+            if track.last_seen != frame_index:
+                track.missed += 1
+
+        for j, box in enumerate(boxes):
+            if assigned[j] is None:
+                assigned[j] = Track(next(self._ids), box, frame_index)
+                self.tracks.append(assigned[j])
+                self.total_tracks += 1
+
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+        return assigned
@@ -0,0 +1,673 @@
+import threading
+import logging
+import time
+
+import cv2
+import numpy as np
+import face_recognition
+
+import config
+
+logger = logging.getLogger(__name__)
+
+ENCODING_SIZE = 128
+
+# Representasi matrix gallery: float32 (exact) atau terkuantisasi untuk first pass
+QUANTIZATION_DTYPES = {None: np.float32, 'float16': np.float16, 'int8': np.int8}
+# Skala awal int8 per dimensi; komponen encoding dlib umumnya |x| < 0.5
+INT8_INITIAL_RANGE = 0.5
+# Jumlah row yang di-cast ke float32 sekaligus saat menghitung jarak terkuantisasi
+QUANTIZED_CHUNK_ROWS = 4096
+
+
+def confidence_label(similarity):
+    """Map similarity (1 - face distance) ke label confidence"""
+    if similarity >= 0.7:
+        return "HIGH"
+    elif similarity >= 0.6:
+        return "MEDIUM"
+    return "LOW"
+
+
+# Sisi terpanjang gambar yang diproses deteksi wajah
+MAX_IMAGE_SIZE = 800
+
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_dimensions(data):
+    """(width, height) dari header JPEG/PNG tanpa decode, None jika tidak dikenali"""
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        return int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+
+    if data[:2] != b'\xff\xd8':
+        return None
+    offset = 2
+    while offset + 9 < len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        length = int.from_bytes(data[offset + 2:offset + 4], 'big')
+        if marker in JPEG_SOF_MARKERS:
+            height = int.from_bytes(data[offset + 5:offset + 7], 'big')
+            width = int.from_bytes(data[offset + 7:offset + 9], 'big')
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def decode_image(data, max_size=MAX_IMAGE_SIZE):
+    """
+    Decode upload menjadi gambar RGB dengan sisi terpanjang <= max_size.
+
+    Ukuran asli dibaca dari header, lalu JPEG di-decode langsung pada
+    skala 1/2, 1/4 atau 1/8 (IMREAD_REDUCED_COLOR_*) sehingga pixel yang
+    akan dibuang tidak pernah di-decode. Konversi warna hanya sekali.
+    Return (rgb_image, (width, height) asli), atau (None, None).
+    """
+    dimensions = image_dimensions(data)
+    flag = cv2.IMREAD_COLOR
+    if dimensions:
+        longest = max(dimensions)
+        for factor, reduced_flag in REDUCED_DECODE_FLAGS:
+            if longest // factor >= max_size:
+                flag = reduced_flag
+                break
+
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if image is None:
+        return None, None
+    if not dimensions:
+        dimensions = (image.shape[1], image.shape[0])
+
+    height, width = image.shape[:2]
+    if max(height, width) > max_size:
+        scale = max_size / max(height, width)
+        image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    return image, dimensions
+
+
+def detect_faces(rgb_image, thumbnail_size=None):
+    """
+    Deteksi HOG pada thumbnail kecil lalu kembalikan box
+    (top, right, bottom, left) dalam koordinat ``rgb_image``.
+    """
+    thumbnail_size = thumbnail_size or config.DETECTION_THUMBNAIL_SIZE
+    height, width = rgb_image.shape[:2]
+    scale = min(1.0, thumbnail_size / max(height, width))
+    if scale < 1.0:
+        thumbnail = cv2.resize(rgb_image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    else:
+        thumbnail = rgb_image
+
+    boxes = []
+    for top, right, bottom, left in face_recognition.face_locations(thumbnail, model="hog"):
+        boxes.append((
+            max(0, int(round(top / scale))),
+            min(width, int(round(right / scale))),
+            min(height, int(round(bottom / scale))),
+            max(0, int(round(left / scale)))
+        ))
+    return boxes
+
+
+def encode_faces(rgb_image, face_locations, padding=None):
+    """Encoding 128-d untuk setiap box, dihitung hanya pada crop ber-padding di sekitar wajah"""
+    padding = config.DETECTION_CROP_PADDING if padding is None else padding
+    height, width = rgb_image.shape[:2]
+    encodings = []
+    for top, right, bottom, left in face_locations:
+        pad_y = int((bottom - top) * padding)
+        pad_x = int((right - left) * padding)
+        crop_top, crop_left = max(0, top - pad_y), max(0, left - pad_x)
+        crop_bottom, crop_right = min(height, bottom + pad_y), min(width, right + pad_x)
+        crop = np.ascontiguousarray(rgb_image[crop_top:crop_bottom, crop_left:crop_right])
+        box = (top - crop_top, right - crop_left, bottom - crop_top, left - crop_left)
+        encodings.extend(face_recognition.face_encodings(crop, [box]))
+    return encodings
+
+
+def locate_faces(rgb_image, mode=None):
+    """
+    Box wajah (top, right, bottom, left) sesuai ``mode`` (default
+    DETECTION_MODE). 'two_stage': deteksi di thumbnail, jatuh ke pass
+    full-frame jika thumbnail tidak menemukan wajah; 'full': langsung
+    full-frame. Return (boxes, cropped), ``cropped`` True jika box dari
+    thumbnail dan cukup di-encode pada crop wajah (``encode_located``).
+    """
+    if (mode or config.DETECTION_MODE) == 'two_stage':
+        face_locations = detect_faces(rgb_image)
+        if face_locations:
+            return face_locations, True
+    return face_recognition.face_locations(rgb_image, model="hog"), False
+
+
+def encode_located(rgb_image, face_locations, cropped):
+    """Encoding untuk box hasil ``locate_faces``"""
+    if not face_locations:
+        return []
+    if cropped:
+        return encode_faces(rgb_image, face_locations)
+    return face_recognition.face_encodings(rgb_image, face_locations)
+
+
+def extract_face_encodings(rgb_image, mode=None):
+    """
+    Encoding semua wajah pada gambar RGB hasil ``decode_image``.
+
+    Mode 'full' (default): deteksi & encoding full-frame. Mode
+    'two_stage' (opt-in): deteksi di thumbnail, encoder hanya di crop
+    wajah; lebih cepat, tapi di gambar berisi beberapa wajah, wajah kecil
+    yang tidak terlihat di thumbnail terlewat selama ada wajah lain yang
+    terdeteksi (bandingkan dengan benchmark_detection.py).
+    """
+    try:
+        start_time = time.time()
+
+        height, width = rgb_image.shape[:2]
+        if max(height, width) > MAX_IMAGE_SIZE:
+            scale = MAX_IMAGE_SIZE / max(height, width)
+            rgb_image = cv2.resize(rgb_image, (int(width * scale), int(height * scale)))
+
+        face_locations, cropped = locate_faces(rgb_image, mode)
+        face_encodings = encode_located(rgb_image, face_locations, cropped)
+
+        if face_encodings:
+            processing_time = time.time() - start_time
+            logger.info(f"✅ Detected {len(face_encodings)} face(s) in {processing_time:.2f}s")
+
+            return face_encodings
+
+        logger.warning("❌ No faces detected in image")
+        return None
+
+    except Exception as e:
+        logger.error(f"❌ Error in face encoding: {str(e)}")
+        return None
+
+
+def batch_duplicates(encodings, similarity_threshold=0.7):
+    """
+    Cari wajah yang sama di dalam satu batch encoding baru dengan satu
+    matrix jarak B x B. Return list per encoding: None, atau
+    (index_sebelumnya, similarity) untuk encoding yang sudah muncul lebih
+    dulu di batch (kemunculan pertama dianggap yang asli).
+    """
+    vectors = np.asarray(encodings, dtype=np.float32).reshape(len(encodings), -1)
+    if not len(vectors):
+        return []
+    sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+    sq = sq_norms[:, None] + sq_norms[None, :] - 2.0 * (vectors @ vectors.T)
+    np.maximum(sq, 0.0, out=sq)
+    distances = np.sqrt(sq)
+    # Hanya bandingkan dengan encoding sebelumnya (segitiga bawah)
+    distances[np.triu_indices(len(vectors))] = np.inf
+
+    max_distance = 1.0 - similarity_threshold
+    results = []
+    for row in distances:
+        previous = int(np.argmin(row))
+        if row[previous] <= max_distance:
+            results.append((previous, 1.0 - float(row[previous])))
+        else:
+            results.append(None)
+    return results
+
+
+def quantize_matrix(matrix, quantization=None):
+    """
+    Matrix float32 (N x dim) dalam representasi gallery sekaligus:
+    (matrix tersimpan, sq_norms, skala int8 per dimensi), setara dengan
+    ``FaceGallery.add`` per row tapi dalam beberapa operasi NumPy.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scale = np.full(matrix.shape[1], INT8_INITIAL_RANGE / 127.0, dtype=np.float32)
+    if quantization == 'int8':
+        if len(matrix):
+            scale = np.maximum(scale, np.abs(matrix).max(axis=0) / 127.0).astype(np.float32)
+        stored = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+        values = stored.astype(np.float32) * scale
+    else:
+        stored = matrix.astype(QUANTIZATION_DTYPES[quantization])
+        values = stored.astype(np.float32)
+    return stored, np.einsum('ij,ij->i', values, values), scale
+
+
+class FaceGallery:
+    """
+    Gallery encoding wajah dalam satu matrix float32 (N x 128).
+
+    Row ke-i milik user_id ``ids[i]``. Semua jarak dihitung sekaligus
+    dengan satu operasi NumPy, dan add/remove mengubah matrix di tempat
+    (remove memindahkan row terakhir ke slot yang kosong).
+
+    Untuk user dengan beberapa template, matrix berisi centroid-nya.
+    Jika ``templates`` (EncodingStore) diberikan, kandidat yang jaraknya
+    dalam ``template_margin`` dari threshold dinilai ulang dengan
+    template individual (dibaca dari memory map, tidak disalin ke sini).
+
+    ``quantization='float16'`` / ``'int8'`` (skala per dimensi) menyimpan
+    matrix dalam 2 / 1 byte per komponen. Jarak terkuantisasi hanya
+    dipakai untuk first pass; ``rescore`` kandidat teratas dihitung ulang
+    exact dengan encoding float32 dari ``templates``.
+
+    Training index (saat gallery mencapai ``min_size`` dan setiap kali
+    ukurannya dua kali lipat) berjalan di background thread; selama itu
+    match memakai brute-force atau index sebelumnya.
+    """
+
+    def __init__(self, dim=ENCODING_SIZE, initial_capacity=64, index=None, templates=None, template_margin=0.05,
+                 quantization=None, rescore=32):
+        if quantization not in QUANTIZATION_DTYPES:
+            raise ValueError(f"Unknown gallery quantization: {quantization}")
+        self.dim = dim
+        self.index = index
+        self.templates = templates
+        self.template_margin = template_margin
+        self.template_checks = 0
+        self.quantization = quantization
+        self.rescore = rescore
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((initial_capacity, dim), dtype=QUANTIZATION_DTYPES[quantization])
+        self._scale = np.full(dim, INT8_INITIAL_RANGE / 127.0, dtype=np.float32)
+        self._sq_norms = np.zeros(initial_capacity, dtype=np.float32)
+        self._ids = []
+        self._rows = {}
+        self._versions = {}
+        self._index_training = None
+        self._index_changes = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, user_id):
+        return user_id in self._rows
+
+    def _grow(self, needed):
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        matrix = np.zeros((new_capacity, self.dim), dtype=self._matrix.dtype)
+        matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+        sq_norms = np.zeros(new_capacity, dtype=np.float32)
+        sq_norms[:len(self._ids)] = self._sq_norms[:len(self._ids)]
+        self._matrix = matrix
+        self._sq_norms = sq_norms
+
+    @property
+    def bytes_per_user(self):
+        """Memory matrix + norm per user (tanpa kapasitas cadangan)"""
+        return self._matrix.dtype.itemsize * self.dim + self._sq_norms.dtype.itemsize
+
+    def _quantize(self, vector):
+        if self.quantization == 'int8':
+            needed = np.abs(vector) / 127.0
+            grown = needed > self._scale
+            if grown.any():
+                self._rescale(np.where(grown, needed, self._scale))
+            return np.clip(np.rint(vector / self._scale), -127, 127).astype(np.int8)
+        return vector.astype(self._matrix.dtype)
+
+    def _rescale(self, scale):
+        """Perbesar skala int8 dimensi tertentu dan kuantisasi ulang kolomnya"""
+        count = len(self._ids)
+        columns = np.flatnonzero(scale != self._scale)
+        values = self._matrix[:count, columns].astype(np.float32) * self._scale[columns]
+        self._matrix[:count, columns] = np.clip(np.rint(values / scale[columns]), -127, 127)
+        self._scale = scale.astype(np.float32)
+        if count:
+            stored = self._dequantize(slice(0, count))
+            self._sq_norms[:count] = np.einsum('ij,ij->i', stored, stored)
+
+    def _dequantize(self, rows):
+        matrix = self._matrix[rows].astype(np.float32)
+        if self.quantization == 'int8':
+            matrix *= self._scale
+        return matrix
+
+    def _dot(self, matrix, queries):
+        """``matrix @ queries.T`` untuk matrix float32 maupun terkuantisasi"""
+        if self.quantization is None:
+            return matrix @ queries.T
+        if self.quantization == 'int8':
+            queries = queries * self._scale
+        out = np.empty((len(matrix), len(queries)), dtype=np.float32)
+        for start in range(0, len(matrix), QUANTIZED_CHUNK_ROWS):
+            chunk = matrix[start:start + QUANTIZED_CHUNK_ROWS].astype(np.float32)
+            out[start:start + len(chunk)] = chunk @ queries.T
+        return out
+
+    def add(self, user_id, encoding, version=None):
+        """Tambah atau ganti encoding milik user_id"""
+        vector = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            self._versions[user_id] = version
+            row = self._rows.get(user_id)
+            if row is None:
+                row = len(self._ids)
+                self._grow(row + 1)
+                self._ids.append(user_id)
+                self._rows[user_id] = row
+            if self.quantization is None:
+                self._matrix[row] = vector
+                self._sq_norms[row] = float(np.dot(vector, vector))
+            else:
+                self._matrix[row] = self._quantize(vector)
+                stored = self._dequantize(row)
+                self._sq_norms[row] = float(np.dot(stored, stored))
+            if self.index is not None:
+                self.index.add(user_id, vector)
+            self._index_changed(user_id)
+
+    def remove(self, user_id):
+        """Hapus user dari gallery, row terakhir dipindah ke slot yang kosong"""
+        with self._lock:
+            row = self._rows.pop(user_id, None)
+            self._versions.pop(user_id, None)
+            if row is None:
+                return False
+            if self.index is not None:
+                self.index.remove(user_id)
+            self._index_changed(user_id)
+            last = len(self._ids) - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._sq_norms[row] = self._sq_norms[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+            self._ids.pop()
+            return True
+
+    def sync(self, users, encodings):
+        """
+        Samakan isi gallery dengan users dict tanpa membangun ulang:
+        hanya user baru / yang templatenya berubah yang ditambah dan user
+        yang hilang yang dihapus. ``encodings`` adalah EncodingStore.
+        """
+        with self._lock:
+            for user_id in [uid for uid in self._ids if uid not in users]:
+                self.remove(user_id)
+            for user_id in users:
+                version = encodings.version(user_id)
+                if version is None:
+                    self.remove(user_id)
+                elif user_id not in self._rows or self._versions.get(user_id) != version:
+                    self.add(user_id, encodings.get(user_id), version)
+            # Index di-train saat load, bukan di request match pertama
+            self._index_ready()
+
+    def export(self):
+        """(ids, matrix, sq_norms, scale) isi gallery saat ini"""
+        with self._lock:
+            count = len(self._ids)
+            return list(self._ids), self._matrix[:count], self._sq_norms[:count], self._scale
+
+    def attach(self, ids, matrix, sq_norms, scale):
+        """
+        Ganti isi gallery dengan array dari luar (mis. snapshot read-only
+        di memory map yang dipakai bersama worker lain). Setelah attach,
+        add/remove tidak bisa dipakai; perubahan datang dari snapshot baru.
+        """
+        with self._lock:
+            previous = set(self._ids)
+            self._ids = list(ids)
+            self._rows = {user_id: row for row, user_id in enumerate(self._ids)}
+            self._matrix = matrix
+            self._sq_norms = sq_norms
+            self._scale = scale
+            self._versions = {}
+            if self.index is not None and self.index.is_trained:
+                for user_id in previous - self._rows.keys():
+                    self.index.remove(user_id)
+                for user_id in self._rows.keys() - previous:
+                    self.index.add(user_id, self._dequantize(self._rows[user_id]))
+            for user_id in previous ^ self._rows.keys():
+                self._index_changed(user_id)
+            self._index_ready()
+
+    def distances(self, encoding, rows=None):
+        """
+        Jarak euclidean encoding ke setiap row (urut sesuai ``ids``),
+        atau hanya ke ``rows`` tertentu jika diberikan.
+        """
+        query = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            count = len(self._ids)
+            if rows is None:
+                matrix = self._matrix[:count]
+                sq_norms = self._sq_norms[:count]
+            else:
+                matrix = self._matrix[rows]
+                sq_norms = self._sq_norms[rows]
+            # ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b
+            sq = sq_norms + np.dot(query, query) - 2.0 * self._dot(matrix, query[None, :])[:, 0]
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq)
+
+    def _index_ready(self):
+        """Index siap dipakai; jika perlu (re)training, mulai di background"""
+        if self.index is None:
+            return False
+        if self._index_training is None and self.index.needs_training(len(self._ids)):
+            self._start_index_training()
+        return self.index.is_trained and len(self._ids) >= self.index.min_size
+
+    def _index_changed(self, user_id):
+        if self._index_changes is not None:
+            self._index_changes.add(user_id)
+
+    def _start_index_training(self):
+        # Salinan matrix: add/remove tetap jalan selama training
+        matrix = self._dequantize(slice(0, len(self._ids)))
+        self._index_changes = set()
+        self._index_training = threading.Thread(target=self._train_index, args=(matrix, list(self._ids)),
+                                                name='gallery-index-training', daemon=True)
+        self._index_training.start()
+
+    def _train_index(self, matrix, ids):
+        """Train index baru tanpa memegang lock, lalu pasang dengan perubahan selama training"""
+        try:
+            index = self.index.trained_copy(matrix, ids)
+        except Exception as e:
+            logger.error(f"❌ Gallery index training failed: {str(e)}")
+            index = None
+
+        with self._lock:
+            if index is not None:
+                for user_id in self._index_changes:
+                    row = self._rows.get(user_id)
+                    if row is None:
+                        index.remove(user_id)
+                    else:
+                        index.add(user_id, self._dequantize(row))
+                self.index = index
+            self._index_changes = None
+            self._index_training = None
+
+    def wait_for_index(self, timeout=None):
+        """Tunggu training index yang sedang berjalan (mis. sebelum recall check)"""
+        with self._lock:
+            self._index_ready()
+            thread = self._index_training
+        if thread is not None:
+            thread.join(timeout)
+
+    def match(self, encoding, similarity_threshold=0.6, top_k=1, exact=False):
+        """
+        Cari top-k user paling mirip dengan similarity >= threshold.
+        Return list of dict (user_id, similarity, confidence, distance),
+        urut dari yang paling mirip.
+
+        Jika gallery memakai index, hanya shortlist dari index yang
+        dihitung jaraknya (exact); ``exact=True`` memaksa scan penuh.
+        """
+        with self._lock:
+            if not self._ids:
+                return []
+            if not exact and self._index_ready():
+                query = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+                ids = self.index.candidates(query)
+                rows = np.fromiter((self._rows[uid] for uid in ids), dtype=np.intp, count=len(ids))
+                distances = self.distances(query, rows)
+            else:
+                ids = list(self._ids)
+                distances = self.distances(encoding)
+
+        if not ids:
+            return []
+        if self.quantization is not None:
+            ids, distances = self._rescore_exact(encoding, ids, distances, max(top_k, self.rescore))
+
+        if top_k < len(ids):
+            candidates = np.argpartition(distances, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(ids))
+        return self._build_matches(encoding, ids, distances, candidates, similarity_threshold)
+
+    def _rescore_exact(self, query, ids, distances, count):
+        """
+        Ambil ``count`` kandidat terdekat menurut jarak terkuantisasi lalu
+        hitung ulang jaraknya dengan encoding float32 dari ``templates``.
+        """
+        if count < len(ids):
+            candidates = np.argpartition(distances, count - 1)[:count]
+        else:
+            candidates = np.arange(len(ids))
+        ids = [ids[row] for row in candidates]
+        if self.templates is None:
+            return ids, distances[candidates]
+
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        encodings, found = self.templates.get_many(ids)
+        exact = np.sqrt(((encodings - query) ** 2).sum(axis=1))
+        return ids, np.where(found, exact, distances[candidates]).astype(np.float32)
+
+    def _template_distance(self, user_id, query):
+        templates = self.templates.templates(user_id)
+        if templates is None or len(templates) < 2:
+            return np.inf
+        self.template_checks += 1
+        return float(np.sqrt(((templates - query) ** 2).sum(axis=1).min()))
+
+    def _build_matches(self, query, ids, distances, candidates, similarity_threshold):
+        """
+        Ubah kandidat (row) menjadi list match urut similarity. Kandidat
+        yang centroid-nya nyaris di threshold dibandingkan juga dengan
+        template individual user tersebut.
+        """
+        max_distance = 1.0 - similarity_threshold
+        margin = self.template_margin if self.templates is not None else 0.0
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+
+        scored = []
+        for row in candidates[np.argsort(distances[candidates], kind='stable')]:
+            distance = float(distances[row])
+            if distance > max_distance + margin:
+                break
+            if margin and distance > max_distance - margin:
+                distance = min(distance, self._template_distance(ids[row], query))
+            if distance <= max_distance:
+                scored.append((distance, ids[row]))
+        scored.sort(key=lambda item: item[0])
+
+        matches = []
+        for distance, user_id in scored:
+            similarity = 1.0 - distance
+            matches.append({
+                'user_id': user_id,
+                'similarity': similarity,
+                'confidence': confidence_label(similarity),
+                'distance': distance
+            })
+        return matches
+
+    def match_many(self, encodings, similarity_threshold=0.6, top_k=1):
+        """
+        ``match`` untuk banyak encoding sekaligus: semua jarak (F x N)
+        dihitung dalam satu perkalian matrix. Return list hasil per encoding.
+        """
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if not len(queries):
+            return []
+
+        with self._lock:
+            if not self._ids:
+                return [[] for _ in queries]
+            if self._index_ready():
+                # Index IVF bekerja per query (shortlist berbeda-beda)
+                return [self.match(query, similarity_threshold, top_k) for query in queries]
+            count = len(self._ids)
+            ids = list(self._ids)
+            sq = (self._sq_norms[:count][None, :]
+                  + np.einsum('ij,ij->i', queries, queries)[:, None]
+                  - 2.0 * self._dot(self._matrix[:count], queries).T)
+        np.maximum(sq, 0.0, out=sq)
+        distances = np.sqrt(sq)
+
+        if self.quantization is not None:
+            results = []
+            for query, query_distances in zip(queries, distances):
+                query_ids, exact = self._rescore_exact(query, ids, query_distances, max(top_k, self.rescore))
+                k = min(top_k, len(query_ids))
+                candidates = np.argpartition(exact, k - 1)[:k] if k < len(query_ids) else np.arange(len(query_ids))
+                results.append(self._build_matches(query, query_ids, exact, candidates, similarity_threshold))
+            return results
+
+        k = min(top_k, count)
+        if k < count:
+            candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(count), (len(queries), 1))
+
+        return [self._build_matches(query, ids, query_distances, query_candidates, similarity_threshold)
+                for query, query_distances, query_candidates in zip(queries, distances, candidates)]
+
+    def recall_check(self, similarity_threshold=0.6, sample_size=500, noise=0.03, seed=0):
+        """
+        Bandingkan hasil index dengan brute-force. Query dibuat dari
+        encoding tersimpan + noise (simulasi foto baru orang yang sama).
+        Recall = porsi match brute-force (>= threshold) yang juga
+        ditemukan index sebagai top-1 yang sama.
+        """
+        rng = np.random.default_rng(seed)
+        self.wait_for_index()
+        with self._lock:
+            count = len(self._ids)
+            if not count:
+                return {'queries': 0, 'expected_matches': 0, 'found': 0, 'missed': [], 'recall': 1.0}
+            picks = rng.choice(count, size=min(sample_size, count), replace=False)
+            queries = self._dequantize(picks) + rng.normal(0, noise, (len(picks), self.dim)).astype(np.float32)
+
+        expected = found = 0
+        missed = []
+        for query in queries:
+            exact = self.match(query, similarity_threshold, exact=True)
+            if not exact:
+                continue
+            expected += 1
+            approx = self.match(query, similarity_threshold)
+            if approx and approx[0]['user_id'] == exact[0]['user_id']:
+                found += 1
+            else:
+                missed.append(exact[0]['user_id'])
+
+        return {
+            'queries': len(queries),
+            'expected_matches': expected,
+            'found': found,
+            'missed': missed,
+            'recall': found / expected if expected else 1.0
+        }
@@ -0,0 +1,112 @@
+import os
+import json
+import re
+import logging
+
+from utils.attendance_log import AttendanceJournal
+from utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+MONTH_PATTERN = re.compile(r'^\d{4}-\d{2}$')
+
+
+class MonthlyHistory:
+    """
+    Riwayat absensi per bulan: satu file JSONL per ``YYYY-MM`` di
+    ``directory`` dan ``manifest.json`` kecil berisi daftar bulan beserta
+    jumlah record. Query satu bulan hanya membuka partisi bulan itu,
+    daftar bulan hanya membaca manifest.
+    """
+
+    def __init__(self, directory, fsync_policy='always'):
+        self.directory = directory
+        self.fsync_policy = fsync_policy
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        os.makedirs(directory, exist_ok=True)
+
+    def _partition(self, month):
+        if not MONTH_PATTERN.match(month):
+            raise ValueError(f"Invalid month: {month}")
+        return AttendanceJournal(os.path.join(self.directory, f'{month}.jsonl'),
+                                 fsync_policy=self.fsync_policy)
+
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'months': {}}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def months(self):
+        """Bulan yang ada di riwayat, terbaru dulu"""
+        return sorted(self.load_manifest()['months'], reverse=True)
+
+    def record_count(self, month=None):
+        months = self.load_manifest()['months']
+        if month is not None:
+            return months.get(month, {}).get('records', 0)
+        return sum(info.get('records', 0) for info in months.values())
+
+    def iter_records(self, month):
+        return self._partition(month).iter_records()
+
+    def iter_lines_reverse(self, month, end=None):
+        return self._partition(month).iter_lines_reverse(end)
+
+    def read_line(self, month, offset):
+        return self._partition(month).read_line(offset)
+
+    def records(self, month):
+        return self._partition(month).read_all()
+
+    def append_records(self, month, records):
+        """Tambah record ke partisi bulan dan perbarui jumlahnya di manifest"""
+        if not records:
+            return
+        with file_lock(self.manifest_path):
+            self._partition(month).append_many(records)
+            manifest = self.load_manifest()
+            info = manifest['months'].setdefault(month, {'records': 0})
+            info['records'] += len(records)
+            self._save_manifest(manifest)
+
+    def merge_records(self, month, records):
+        """
+        Tambah record yang belum ada di partisi bulan (kunci: user_id +
+        timestamp). Hanya partisi bulan itu yang dibaca, sekali.
+        Return jumlah record yang benar-benar ditambah.
+        """
+        existing = {(r.get('user_id'), r.get('timestamp')) for r in self.iter_records(month)}
+        new_records = []
+        for record in records:
+            key = (record.get('user_id'), record.get('timestamp'))
+            if key not in existing:
+                existing.add(key)
+                new_records.append(record)
+        self.append_records(month, new_records)
+        return len(new_records)
+
+    def migrate_legacy(self, monthly_file):
+        """Pecah monthly_attendance.json lama menjadi partisi per bulan (sekali saja)"""
+        if not os.path.exists(monthly_file):
+            return 0
+        with file_lock(monthly_file):
+            if not os.path.exists(monthly_file):
+                return 0
+            with open(monthly_file, 'r') as f:
+                monthly_data = json.load(f)
+            with file_lock(self.manifest_path):
+                manifest = self.load_manifest()
+                for month, records in monthly_data.items():
+                    self._partition(month).rewrite(records)
+                    manifest['months'][month] = {'records': len(records)}
+                self._save_manifest(manifest)
+            os.replace(monthly_file, monthly_file + '.bak')
+        logger.info(f"✅ Migrated {len(monthly_data)} months from {monthly_file} to {self.directory}/")
+        return len(monthly_data)
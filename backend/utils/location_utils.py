@@ -0,0 +1,369 @@
+import os
+import re
+import copy
+import json
+import math
+import threading
+
+import numpy as np
+
+EARTH_RADIUS = 6371000.0  # meter
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180.0
+SITE_TYPES = ('circle', 'polygon')
+PRIMARY_SITE_ID = 'kantor-pusat'
+
+
+def haversine_radians(lat1, lon1, cos_lat1, lat2, lon2, cos_lat2):
+    """Haversine (meter) dari koordinat radian dan cos(latitude) yang sudah dihitung"""
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + cos_lat1 * cos_lat2 * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Jarak (meter) antar koordinat derajat dengan rumus Haversine.
+    Semua argumen boleh array NumPy dan di-broadcast, jadi satu panggilan
+    bisa menghitung banyak titik terhadap banyak lokasi sekaligus.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64))
+                              for value in (lat1, lon1, lat2, lon2))
+    return haversine_radians(lat1, lon1, np.cos(lat1), lat2, lon2, np.cos(lat2))
+
+
+def _coordinate(value, name, limit):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} harus berupa angka")
+    if not -limit <= value <= limit:
+        raise ValueError(f"{name} harus di antara -{limit} dan {limit}")
+    return value
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def parse_site(data, site_id=None):
+    """
+    Validasi dan normalisasi satu lokasi dari input admin. Lingkaran:
+    latitude, longitude, radius (meter). Polygon: points berisi minimal
+    tiga pasang [latitude, longitude]. ValueError jika tidak valid.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Data lokasi harus berupa object")
+    name = str(data.get('name') or data.get('location_name') or '').strip()
+    if not name:
+        raise ValueError("Nama lokasi diperlukan")
+    site_id = site_id or str(data.get('id') or '').strip() or slugify(name)
+    if not site_id:
+        raise ValueError("ID lokasi tidak valid")
+
+    site_type = data.get('type', 'circle')
+    if site_type not in SITE_TYPES:
+        raise ValueError(f"Tipe lokasi harus salah satu dari: {', '.join(SITE_TYPES)}")
+
+    site = {'id': site_id, 'name': name, 'type': site_type}
+    if site_type == 'circle':
+        site['latitude'] = _coordinate(data.get('latitude'), 'latitude', 90)
+        site['longitude'] = _coordinate(data.get('longitude'), 'longitude', 180)
+        try:
+            site['radius'] = float(data.get('radius'))
+        except (TypeError, ValueError):
+            raise ValueError("radius harus berupa angka")
+        if site['radius'] <= 0:
+            raise ValueError("radius harus lebih dari 0")
+    else:
+        points = data.get('points')
+        if not isinstance(points, list) or len(points) < 3:
+            raise ValueError("Polygon membutuhkan minimal 3 titik [latitude, longitude]")
+        try:
+            site['points'] = [[_coordinate(lat, 'latitude', 90), _coordinate(lon, 'longitude', 180)]
+                              for lat, lon in points]
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Titik polygon tidak valid: {e}")
+    return site
+
+
+def settings_with_sites(settings):
+    """
+    Settings lokasi dengan daftar ``sites``. Format lama (satu titik
+    latitude/longitude/radius) menjadi satu lokasi lingkaran.
+    """
+    settings = dict(settings)
+    if 'sites' not in settings:
+        settings['sites'] = []
+        if settings.get('latitude') is not None and settings.get('longitude') is not None:
+            settings['sites'].append(parse_site({
+                'id': PRIMARY_SITE_ID,
+                'name': settings.get('location_name') or 'Kantor Pusat',
+                'latitude': settings['latitude'],
+                'longitude': settings['longitude'],
+                'radius': settings.get('radius', 100)
+            }))
+    return settings
+
+
+def mirror_primary_site(settings):
+    """Field lama (latitude/longitude/radius/location_name) mengikuti lokasi lingkaran pertama"""
+    for site in settings.get('sites', []):
+        if site['type'] == 'circle':
+            settings.update({
+                'latitude': site['latitude'],
+                'longitude': site['longitude'],
+                'radius': site['radius'],
+                'location_name': site['name']
+            })
+            break
+    return settings
+
+
+def _local_xy(lats, lons, lat0, lon0):
+    """Proyeksi equirectangular (meter) di sekitar (lat0, lon0), cukup akurat untuk area kecil"""
+    x = (np.asarray(lons) - lon0) * METERS_PER_DEGREE * math.cos(math.radians(lat0))
+    y = (np.asarray(lats) - lat0) * METERS_PER_DEGREE
+    return x, y
+
+
+class SiteIndex:
+    """
+    Index spasial lokasi absensi (lingkaran dan polygon).
+
+    Setiap lokasi didaftarkan di sel grid ``cell_size`` derajat yang
+    tertutup bounding box-nya, sehingga satu koordinat hanya dicek
+    terhadap beberapa kandidat di selnya. Lokasi yang sangat luas (lebih
+    dari ``max_cells`` sel) selalu ikut dicek. Jarak dihitung dengan
+    Haversine NumPy untuk banyak titik sekaligus.
+    """
+
+    def __init__(self, sites, cell_size=0.01, max_cells=4096):
+        self.sites = list(sites)
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._grid = {}
+        self._wide = []
+
+        circles = [i for i, site in enumerate(self.sites) if site['type'] == 'circle']
+        self._circles = np.array(circles, dtype=np.int64)
+        self._circle_lat = np.array([self.sites[i]['latitude'] for i in circles], dtype=np.float64)
+        self._circle_lon = np.array([self.sites[i]['longitude'] for i in circles], dtype=np.float64)
+        self._circle_radius = np.array([self.sites[i]['radius'] for i in circles], dtype=np.float64)
+        # Radian dan cos(latitude) pusat lingkaran dihitung sekali per perubahan lokasi
+        self._circle_lat_rad = np.radians(self._circle_lat)
+        self._circle_lon_rad = np.radians(self._circle_lon)
+        self._circle_cos_lat = np.cos(self._circle_lat_rad)
+        self._centres = {index: (self._circle_lat_rad[i], self._circle_lon_rad[i], self._circle_cos_lat[i])
+                         for i, index in enumerate(circles)}
+        self._polygons = {i: np.array(site['points'], dtype=np.float64)
+                          for i, site in enumerate(self.sites) if site['type'] == 'polygon'}
+
+        for i in range(len(self.sites)):
+            self._register(i, self._bounds(i))
+
+    def __len__(self):
+        return len(self.sites)
+
+    def _bounds(self, index):
+        site = self.sites[index]
+        if site['type'] == 'circle':
+            dlat = site['radius'] / METERS_PER_DEGREE
+            dlon = dlat / max(math.cos(math.radians(site['latitude'])), 1e-6)
+            return (site['latitude'] - dlat, site['latitude'] + dlat,
+                    site['longitude'] - dlon, site['longitude'] + dlon)
+        points = self._polygons[index]
+        return points[:, 0].min(), points[:, 0].max(), points[:, 1].min(), points[:, 1].max()
+
+    def _cell(self, value):
+        return int(math.floor(value / self.cell_size))
+
+    def _register(self, index, bounds):
+        min_lat, max_lat, min_lon, max_lon = bounds
+        rows = range(self._cell(min_lat), self._cell(max_lat) + 1)
+        cols = range(self._cell(min_lon), self._cell(max_lon) + 1)
+        if len(rows) * len(cols) > self.max_cells:
+            self._wide.append(index)
+            return
+        for row in rows:
+            for col in cols:
+                self._grid.setdefault((row, col), []).append(index)
+
+    def candidates(self, latitude, longitude):
+        """Index lokasi yang mungkin memuat koordinat ini"""
+        return self._grid.get((self._cell(latitude), self._cell(longitude)), []) + self._wide
+
+    def _inside_polygon(self, index, lats, lons):
+        """Ray casting untuk banyak titik sekaligus terhadap semua sisi polygon"""
+        points = self._polygons[index]
+        lat1, lon1 = points[:, 0], points[:, 1]
+        lat2, lon2 = np.roll(lat1, -1), np.roll(lon1, -1)
+        lats, lons = lats[:, None], lons[:, None]
+        crosses = (lat1 > lats) != (lat2 > lats)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lon_at = lon1 + (lats - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        return np.count_nonzero(crosses & (lons < lon_at), axis=1) % 2 == 1
+
+    def _polygon_distance(self, index, lats, lons):
+        """Jarak (meter) titik ke sisi polygon terdekat"""
+        points = self._polygons[index]
+        lat0, lon0 = points[:, 0].mean(), points[:, 1].mean()
+        ex, ey = _local_xy(points[:, 0], points[:, 1], lat0, lon0)
+        ex2, ey2 = np.roll(ex, -1), np.roll(ey, -1)
+        px, py = _local_xy(lats, lons, lat0, lon0)
+        px, py = px[:, None], py[:, None]
+        dx, dy = ex2 - ex, ey2 - ey
+        length = np.maximum(dx * dx + dy * dy, 1e-12)
+        t = np.clip(((px - ex) * dx + (py - ey) * dy) / length, 0.0, 1.0)
+        return np.hypot(px - (ex + t * dx), py - (ey + t * dy)).min(axis=1)
+
+    def validate_many(self, latitudes, longitudes):
+        """
+        Validasi banyak koordinat sekaligus. Return list dict per titik:
+        ``valid``, ``site`` (lokasi yang memuat titik, atau lokasi
+        terdekat jika tidak valid) dan ``distance`` (meter; ke pusat
+        lingkaran, atau ke batas polygon, 0 jika di dalamnya).
+        """
+        lats = np.asarray(latitudes, dtype=np.float64).reshape(-1)
+        lons = np.asarray(longitudes, dtype=np.float64).reshape(-1)
+        lats_rad, lons_rad = np.radians(lats), np.radians(lons)
+        cos_lats = np.cos(lats_rad)
+        count = len(lats)
+        site_of = np.full(count, -1, dtype=np.int64)
+        distance = np.full(count, np.inf)
+
+        # Kelompokkan titik per sel grid, setiap kelompok dicek ke kandidatnya saja
+        cells = np.stack([np.floor(lats / self.cell_size), np.floor(lons / self.cell_size)], axis=1)
+        unique_cells, inverse = np.unique(cells.astype(np.int64), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for group, (row, col) in enumerate(unique_cells):
+            candidates = self._grid.get((int(row), int(col)), []) + self._wide
+            if not candidates:
+                continue
+            members = np.nonzero(inverse == group)[0]
+            for index in candidates:
+                pending = members[site_of[members] < 0]
+                if not len(pending):
+                    break
+                site = self.sites[index]
+                if site['type'] == 'circle':
+                    d = haversine_radians(lats_rad[pending], lons_rad[pending], cos_lats[pending],
+                                          *self._centres[index])
+                    inside = d <= site['radius']
+                else:
+                    inside = self._inside_polygon(index, lats[pending], lons[pending])
+                    d = np.zeros(len(pending))
+                site_of[pending[inside]] = index
+                distance[pending[inside]] = d[inside]
+
+        # Titik di luar semua lokasi: cari lokasi terdekat (jarak ke batasnya) untuk pesan
+        outside = np.nonzero(site_of < 0)[0]
+        if len(outside) and self.sites:
+            nearest = np.full(len(outside), -1, dtype=np.int64)
+            gap = np.full(len(outside), np.inf)
+            if len(self._circles):
+                d = haversine_radians(lats_rad[outside, None], lons_rad[outside, None], cos_lats[outside, None],
+                                      self._circle_lat_rad[None, :], self._circle_lon_rad[None, :],
+                                      self._circle_cos_lat[None, :])
+                best = np.argmin(d - self._circle_radius[None, :], axis=1)
+                rows = np.arange(len(outside))
+                gap = d[rows, best] - self._circle_radius[best]
+                nearest = self._circles[best]
+                distance[outside] = d[rows, best]
+            for index in self._polygons:
+                d = self._polygon_distance(index, lats[outside], lons[outside])
+                closer = d < gap
+                gap[closer] = d[closer]
+                nearest[closer] = index
+                distance[outside[closer]] = d[closer]
+            site_of[outside] = nearest
+
+        valid = np.ones(count, dtype=bool)
+        valid[outside] = False
+        return [{
+            'valid': bool(valid[i]),
+            'site': self.sites[site_of[i]] if site_of[i] >= 0 else None,
+            'distance': float(distance[i]) if np.isfinite(distance[i]) else None
+        } for i in range(count)]
+
+    def validate(self, latitude, longitude):
+        """Validasi satu titik; kandidat di sel grid dicek dengan math skalar"""
+        lat_rad, lon_rad = math.radians(latitude), math.radians(longitude)
+        cos_lat = math.cos(lat_rad)
+        for index in self.candidates(latitude, longitude):
+            site = self.sites[index]
+            if site['type'] == 'circle':
+                site_lat, site_lon, site_cos = self._centres[index]
+                a = (math.sin((site_lat - lat_rad) / 2) ** 2
+                     + cos_lat * site_cos * math.sin((site_lon - lon_rad) / 2) ** 2)
+                distance = 2 * EARTH_RADIUS * math.asin(math.sqrt(min(a, 1.0)))
+                if distance <= site['radius']:
+                    return {'valid': True, 'site': site, 'distance': distance}
+            elif self._inside_polygon(index, np.array([latitude]), np.array([longitude]))[0]:
+                return {'valid': True, 'site': site, 'distance': 0.0}
+        # Di luar semua lokasi: lokasi terdekat untuk pesan error
+        return self.validate_many([latitude], [longitude])[0]
+
+
+class LocationSettings:
+    """
+    Settings lokasi (location_settings.json) yang di-load sekali dan
+    dilayani dari memory bersama SiteIndex-nya. File dibaca ulang hanya
+    jika signature-nya (inode, mtime, size) berubah, misalnya karena
+    worker lain atau admin mengubahnya, atau setelah ``invalidate()``.
+    """
+
+    def __init__(self, path, defaults, cell_size=0.01):
+        self.path = path
+        self.defaults = defaults
+        self.cell_size = cell_size
+        self.hits = 0
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._settings = None
+        self._index = None
+        self._signature = None
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _current(self):
+        with self._lock:
+            signature = self._stat_signature()
+            if self._settings is not None and signature == self._signature:
+                self.hits += 1
+                return self._settings, self._index
+
+            if signature is None:
+                settings = settings_with_sites(self.defaults)
+            else:
+                with open(self.path, 'r') as f:
+                    settings = settings_with_sites(json.load(f))
+            self._index = SiteIndex(settings['sites'], cell_size=self.cell_size)
+            self._settings = settings
+            self._signature = signature
+            self.reloads += 1
+            return self._settings, self._index
+
+    def get(self):
+        """Salinan settings (boleh diubah lalu disimpan)"""
+        return copy.deepcopy(self._current()[0])
+
+    def index(self):
+        """(enabled, SiteIndex) untuk validasi lokasi, tanpa copy"""
+        settings, index = self._current()
+        return settings['enabled'], index
+
+    def invalidate(self):
+        with self._lock:
+            self._settings = None
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'reloads': self.reloads,
+            'sites': len(self._index) if self._index is not None else 0
+        }
@@ -0,0 +1,104 @@
+import time
+import threading
+from collections import OrderedDict
+
+import cv2
+
+
+def image_dhash(rgb_image, hash_size=8):
+    """Perceptual difference hash 64-bit dari gambar RGB"""
+    gray = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+class RecentRecognitions:
+    """
+    Hasil absensi beberapa detik terakhir, per user_id dan per hash
+    gambar, untuk menjawab submit berulang tanpa decode/encode/match
+    ulang dan tanpa menulis record duplikat. Cache per worker process.
+
+    Lookup per hash gambar melewati face matching sehingga bisa salah
+    orang (latar belakang sama), jadi hanya aktif jika ``match_images``.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024, max_hash_distance=2, match_images=False):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_hash_distance = max_hash_distance
+        self.match_images = match_images
+        self.hash_hits = 0
+        self.user_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._by_user = OrderedDict()
+        self._by_hash = OrderedDict()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    @property
+    def hash_enabled(self):
+        return self.enabled and self.match_images
+
+    def _expire(self, entries, now):
+        while entries:
+            key, (expires, _) = next(iter(entries.items()))
+            if expires > now and len(entries) <= self.max_entries:
+                break
+            del entries[key]
+
+    def lookup_image(self, image_hash):
+        """Hasil sebelumnya untuk gambar yang (hampir) sama, atau None"""
+        if not self.hash_enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._expire(self._by_hash, now)
+            for cached_hash, (_, result) in self._by_hash.items():
+                if bin(cached_hash ^ image_hash).count('1') <= self.max_hash_distance:
+                    self.hash_hits += 1
+                    return result
+        return None
+
+    def lookup_user(self, user_id):
+        """Hasil absensi user ini dalam jendela ttl, atau None"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._expire(self._by_user, now)
+            entry = self._by_user.get(user_id)
+            if entry is not None:
+                self.user_hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def remember(self, user_id, result, image_hash=None):
+        if not self.enabled:
+            return
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._by_user.pop(user_id, None)
+            self._by_user[user_id] = (expires, result)
+            if image_hash is not None and self.match_images:
+                self._by_hash.pop(image_hash, None)
+                self._by_hash[image_hash] = (expires, result)
+            self._expire(self._by_user, time.monotonic())
+            self._expire(self._by_hash, time.monotonic())
+
+    def stats(self):
+        return {
+            'ttl_seconds': self.ttl,
+            'match_images': self.match_images,
+            'hash_hits': self.hash_hits,
+            'user_hits': self.user_hits,
+            'misses': self.misses,
+            'entries': len(self._by_user)
+        }
@@ -0,0 +1,165 @@
+import json
+import base64
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = ('1', 'true', 'yes', 'ya')
+FALSE_VALUES = ('0', 'false', 'no', 'tidak')
+
+
+def encode_cursor(record, position=None):
+    """
+    Cursor opaque (base64) dari record terakhir sebuah halaman: timestamp
+    + user_id, ditambah ``position`` (sumber, offset byte baris record)
+    agar halaman berikutnya bisa langsung dibaca dari posisi itu.
+    """
+    values = [record['timestamp'], record['user_id']] + (list(position) if position else [])
+    raw = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ((timestamp, user_id), position atau None); ValueError jika cursor tidak valid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        timestamp, user_id = values[:2]
+        position = tuple(values[2:]) or None
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Cursor tidak valid")
+    if not isinstance(timestamp, str) or not isinstance(user_id, str):
+        raise ValueError("Cursor tidak valid")
+    if position is not None and (len(position) != 2 or not isinstance(position[0], str)
+                                 or not isinstance(position[1], int) or position[1] < 0):
+        raise ValueError("Cursor tidak valid")
+    return (timestamp, user_id), position
+
+
+def parse_bool(value):
+    if value is None or value == '':
+        return None
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"Nilai boolean tidak valid: {value}")
+
+
+class RecordQuery:
+    """
+    Filter halaman record absensi: satu bulan, opsional user_id, rentang
+    tanggal (YYYY-MM-DD, inklusif) dan status lokasi. ``before`` adalah
+    (timestamp, user_id) record terakhir halaman sebelumnya, ``position``
+    posisinya di storage (jika diketahui).
+    """
+
+    def __init__(self, month, limit, before=None, user_id=None,
+                 date_from=None, date_to=None, location_verified=None, position=None):
+        self.month = month
+        self.limit = limit
+        self.before = before
+        self.position = position
+        self.user_id = user_id
+        self.date_from = date_from
+        self.date_to = date_to
+        self.location_verified = location_verified
+
+    @property
+    def filters(self):
+        return {
+            'user_id': self.user_id,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'location_verified': self.location_verified
+        }
+
+    @property
+    def filtered(self):
+        return any(value is not None for value in self.filters.values())
+
+    def is_cursor_record(self, line):
+        """True jika baris JSONL adalah record ``before``"""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return False
+        return (record.get('timestamp'), record.get('user_id')) == tuple(self.before)
+
+    def is_past(self, record):
+        """Record lebih lama dari bulan / date_from: record berikutnya (lebih lama) juga tidak cocok"""
+        if record.get('timestamp', '')[:7] < self.month:
+            return True
+        return self.date_from is not None and record.get('date', '') < self.date_from
+
+    def matches(self, record):
+        if not record.get('timestamp', '').startswith(self.month):
+            return False
+        if self.user_id is not None and record.get('user_id') != self.user_id:
+            return False
+        date = record.get('date', '')
+        if self.date_from is not None and date < self.date_from:
+            return False
+        if self.date_to is not None and date > self.date_to:
+            return False
+        if (self.location_verified is not None
+                and bool(record.get('location_verified', True)) != self.location_verified):
+            return False
+        return True
+
+
+def _skip_to_cursor(lines, before):
+    """
+    Lewati baris sampai record ``before`` ditemukan (urutan file, terbaru
+    dulu). Baris dicek dulu dengan substring timestamp sehingga hanya
+    kandidat yang di-parse. Fallback jika posisi di cursor tidak valid.
+    """
+    timestamp, user_id = before
+    needle = json.dumps(timestamp).encode('utf-8')
+    for _, line in lines:
+        if needle not in line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get('timestamp') == timestamp and record.get('user_id') == user_id:
+            return True
+    return False
+
+
+def page_from_lines(lines, query, resumed=False):
+    """
+    Satu halaman (maksimal ``query.limit + 1`` record) dari pasangan
+    (position, baris JSONL) yang sudah urut terbaru dulu. Record ekstra
+    menandakan masih ada halaman berikutnya. ``resumed=True``: ``lines``
+    sudah dimulai tepat setelah record cursor; jika tidak, baris dilewati
+    sampai record cursor (halaman kosong jika sudah tidak ada).
+
+    Filter user_id dicek dengan substring sebelum parse, dan pembacaan
+    berhenti begitu record lebih lama dari bulan / date_from.
+    Return (records, positions).
+    """
+    lines = iter(lines)
+    if query.before is not None and not resumed and not _skip_to_cursor(lines, query.before):
+        return [], []
+
+    user_needle = json.dumps(query.user_id).encode('utf-8') if query.user_id is not None else None
+    records, positions = [], []
+    for position, line in lines:
+        if user_needle is not None and user_needle not in line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            logger.warning("Skipping corrupt attendance line")
+            continue
+        if query.is_past(record):
+            break
+        if query.matches(record):
+            records.append(record)
+            positions.append(position)
+            if len(records) > query.limit:
+                break
+    return records, positions
@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from utils.file_lock import file_lock
+
+
+class DataGenerations:
+    """
+    Counter generasi data per domain ('users', 'attendance', 'location')
+    dalam satu file JSON kecil. Setiap write path menaikkan counter domain
+    yang diubahnya, dari worker mana pun; pembaca cukup membaca file ini
+    untuk tahu apakah response lama masih berlaku.
+    """
+
+    def __init__(self, path, domains):
+        self.path = path
+        self.domains = tuple(domains)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def current(self, domains=None):
+        generations = self._read()
+        return tuple(generations.get(domain, 0) for domain in (domains or self.domains))
+
+    def bump(self, *domains):
+        for domain in domains:
+            if domain not in self.domains:
+                raise ValueError(f"Unknown data domain: {domain}")
+        with file_lock(self.path):
+            generations = self._read()
+            for domain in domains:
+                generations[domain] = generations.get(domain, 0) + 1
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(generations, f)
+            os.replace(tmp_path, self.path)
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+
+
+class ResponseCache:
+    """
+    LRU kecil body response (bytes) per worker process, key berisi
+    generasi data sehingga entry lama tidak pernah cocok lagi setelah
+    ada write dan tersingkir dengan sendirinya.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'entries': len(self._entries)
+        }
@@ -0,0 +1,210 @@
+import os
+import glob
+import mmap
+import struct
+import time
+import threading
+import logging
+
+import numpy as np
+
+from utils.file_lock import file_lock
+from utils.encoding_store import USER_ID_SIZE
+from utils.face_utils import QUANTIZATION_DTYPES, quantize_matrix
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'FGAL'
+VERSION = 1
+DTYPE_CODES = {None: 0, 'float16': 1, 'int8': 2}
+# magic, version, dim, dtype, count, generation
+SNAPSHOT_HEADER = struct.Struct('<4sIIIQQ')
+SNAPSHOT_HEADER_SIZE = 64
+# generation snapshot aktif + signature encoding store asalnya (ino, count, generation)
+POINTER = struct.Struct('<QQQQ')
+
+
+class SharedGallery:
+    """
+    Matrix gallery (centroid per user) yang dipakai bersama semua worker.
+
+    Snapshot ditulis sekali ke ``{path}.{generation}`` lalu di-memory-map
+    read-only oleh setiap worker, sehingga hanya ada satu copy matrix di
+    OS page cache. File kecil ``path`` menunjuk generation aktif dan
+    signature encoding store yang menjadi sumbernya: worker mana pun yang
+    melihat store berubah (register / hapus / template baru) menulis
+    snapshot baru, dan worker lain memakainya pada request berikutnya.
+
+    Di jalur request (``refresh(wait=False)``) snapshot tidak pernah
+    ditulis: perubahan dalam ``publish_delay`` detik digabung menjadi
+    satu publish di thread background, sementara request tetap memakai
+    snapshot yang ada.
+    """
+
+    def __init__(self, path, store, gallery, publish_delay=1.0):
+        self.path = path
+        self.store = store
+        self.gallery = gallery
+        self.publish_delay = publish_delay
+        self.generation = None
+        self.publishes = 0
+        self.attaches = 0
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._publisher_lock = threading.Lock()
+        self._publish_requested = threading.Event()
+        self._publisher = None
+        self._publisher_pid = None
+
+    def _snapshot_path(self, generation):
+        return f'{self.path}.{generation}'
+
+    def _read_pointer(self):
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read(POINTER.size)
+        except FileNotFoundError:
+            return None
+        if len(data) < POINTER.size:
+            return None
+        return POINTER.unpack(data)
+
+    def refresh(self, wait=True):
+        """
+        Pastikan gallery memakai snapshot terbaru. Jika snapshot tertinggal
+        dari encoding store: ``wait=True`` menulis snapshot baru sekarang,
+        ``wait=False`` menjadwalkannya di background (kecuali belum ada
+        snapshot sama sekali). Return True jika snapshot berganti.
+        """
+        self.store.refresh()
+        pointer = self._read_pointer()
+        if pointer is None or tuple(pointer[1:]) != self.store.signature:
+            if wait or pointer is None:
+                self._publish_if_stale()
+            else:
+                self.schedule_publish()
+        return self._attach_latest()
+
+    def schedule_publish(self):
+        """Publish snapshot baru di thread background (digabung per ``publish_delay`` detik)"""
+        with self._publisher_lock:
+            self._publish_requested.set()
+            # Thread dibuat saat pertama dipakai, dan dibuat ulang di process baru (fork)
+            if self._publisher is None or self._publisher_pid != os.getpid():
+                self._publisher = threading.Thread(target=self._publish_loop, name='shared-gallery-publisher',
+                                                   daemon=True)
+                self._publisher_pid = os.getpid()
+                self._publisher.start()
+
+    def _publish_loop(self):
+        while True:
+            self._publish_requested.wait()
+            time.sleep(self.publish_delay)
+            self._publish_requested.clear()
+            try:
+                self._publish_if_stale()
+                self._attach_latest()
+            except Exception as e:
+                logger.error(f"❌ Shared gallery publish failed: {str(e)}")
+
+    def _publish_if_stale(self):
+        with file_lock(self.path):
+            self.store.refresh()
+            pointer = self._read_pointer()
+            if pointer is None or tuple(pointer[1:]) != self.store.signature:
+                self._publish(0 if pointer is None else pointer[0])
+
+    def _attach_latest(self):
+        with self._lock:
+            pointer = self._read_pointer()
+            if pointer is None or pointer[0] == self.generation:
+                return False
+            try:
+                self._attach(pointer[0])
+            except FileNotFoundError:
+                # Snapshot sudah diganti dua kali sejak pointer dibaca
+                pointer = self._read_pointer()
+                self._attach(pointer[0])
+            return True
+
+    def _publish(self, previous_generation):
+        """
+        Bangun snapshot dari encoding store (dipanggil di bawah file lock).
+        Centroid dan kuantisasi dihitung vectorized, tanpa loop per user.
+        """
+        # Signature diambil sebelum centroid: jika store berubah di antaranya,
+        # pointer tertinggal dan snapshot ditulis ulang, bukan sebaliknya
+        signature = self.store.signature
+        ids, encodings = self.store.centroids()
+        matrix, sq_norms, scale = quantize_matrix(encodings, self.gallery.quantization)
+
+        generation = previous_generation + 1
+        count = len(ids)
+        ids = ids.astype(f'S{USER_ID_SIZE}')
+        snapshot_path = self._snapshot_path(generation)
+        with open(snapshot_path + '.tmp', 'wb') as f:
+            f.write(SNAPSHOT_HEADER.pack(MAGIC, VERSION, self.gallery.dim, DTYPE_CODES[self.gallery.quantization],
+                                         count, generation).ljust(SNAPSHOT_HEADER_SIZE, b'\0'))
+            f.write(ids.tobytes())
+            f.write(scale.astype('<f4').tobytes())
+            f.write(sq_norms.astype('<f4').tobytes())
+            f.write(np.ascontiguousarray(matrix).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(snapshot_path + '.tmp', snapshot_path)
+
+        with open(self.path + '.tmp', 'wb') as f:
+            f.write(POINTER.pack(generation, *signature))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + '.tmp', self.path)
+
+        self._remove_old_snapshots(generation)
+        self.publishes += 1
+        logger.info(f"✅ Shared gallery published: generation {generation}, {count} users")
+
+    def _remove_old_snapshots(self, generation):
+        # Snapshot sebelumnya dibiarkan untuk worker yang masih memakainya
+        for snapshot_path in glob.glob(glob.escape(self.path) + '.*'):
+            suffix = snapshot_path.rsplit('.', 1)[-1]
+            if suffix.isdigit() and int(suffix) < generation - 1:
+                try:
+                    os.remove(snapshot_path)
+                except OSError:
+                    # Windows: file masih di-map worker lain, dihapus lain kali
+                    pass
+
+    def _attach(self, generation):
+        with open(self._snapshot_path(generation), 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, dim, dtype_code, count, _ = SNAPSHOT_HEADER.unpack_from(mapped, 0)
+        if (magic != MAGIC or version != VERSION or dim != self.gallery.dim
+                or dtype_code != DTYPE_CODES[self.gallery.quantization]):
+            mapped.close()
+            raise ValueError(f"Invalid shared gallery snapshot: {self._snapshot_path(generation)}")
+
+        offset = SNAPSHOT_HEADER_SIZE
+        ids = np.frombuffer(mapped, dtype=f'S{USER_ID_SIZE}', count=count, offset=offset)
+        offset += ids.nbytes
+        scale = np.frombuffer(mapped, dtype='<f4', count=dim, offset=offset)
+        offset += scale.nbytes
+        sq_norms = np.frombuffer(mapped, dtype='<f4', count=count, offset=offset)
+        offset += sq_norms.nbytes
+        matrix = np.frombuffer(mapped, dtype=QUANTIZATION_DTYPES[self.gallery.quantization],
+                               count=count * dim, offset=offset).reshape(count, dim)
+
+        self.gallery.attach([user_id.decode('utf-8') for user_id in ids.tolist()], matrix, sq_norms, scale)
+        # Mapping lama ditutup otomatis setelah tidak ada array yang memakainya
+        self._mmap = mapped
+        self.generation = generation
+        self.attaches += 1
+
+    def stats(self):
+        return {
+            'generation': self.generation,
+            'publishes': self.publishes,
+            'attaches': self.attaches,
+            'publish_pending': self._publish_requested.is_set(),
+            'users': len(self.gallery)
+        }
@@ -0,0 +1,82 @@
+import os
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateLearner:
+    """
+    Menyimpan template wajah hasil check-in di satu thread background,
+    bukan di thread request. Antrian dibatasi ``max_pending`` (jika penuh
+    template dibuang, check-in tidak pernah menunggu), satu user hanya
+    punya satu template di antrian, dan entry yang menumpuk disimpan
+    dengan satu panggilan ``save(entries)``.
+    """
+
+    def __init__(self, save, max_pending=256):
+        self.save = save
+        self.max_pending = max_pending
+        self.stats = {'queued': 0, 'saved': 0, 'dropped': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pending = set()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        # Thread dibuat saat pertama dipakai, dan dibuat ulang di process baru (fork)
+        if self._thread is None or self._pid != os.getpid():
+            self._queue = queue.Queue(self.max_pending)
+            self._pending = set()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                            name='template-learner', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def submit(self, user_id, encoding):
+        """Antrikan template untuk user_id. Return False jika dilewati."""
+        with self._lock:
+            self._ensure_thread()
+            if user_id in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((user_id, encoding))
+            except queue.Full:
+                self.stats['dropped'] += 1
+                return False
+            self._pending.add(user_id)
+            self.stats['queued'] += 1
+            return True
+
+    def _run(self, entries_queue):
+        while True:
+            entries = [entries_queue.get()]
+            while True:
+                try:
+                    entries.append(entries_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._save(entries)
+            for _ in entries:
+                entries_queue.task_done()
+
+    def _save(self, entries):
+        try:
+            self.save(entries)
+            self.stats['saved'] += len(entries)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ Failed to save {len(entries)} face template(s): {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.difference_update(user_id for user_id, _ in entries)
+
+    def join(self):
+        """Tunggu sampai antrian kosong (untuk test / shutdown)"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def status(self):
+        return dict(self.stats, pending=len(self._pending))
@@ -0,0 +1,133 @@
+import os
+import json
+import threading
+import logging
+
+from utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class JsonUserFile:
+    """Sumber users untuk UserRegistry: file users.json"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def update(self, changes):
+        """
+        Terapkan ``changes`` ke isi file terbaru (bukan ke salinan di
+        memory yang mungkin sudah basi) lalu tulis atomic (tmp file +
+        rename) di bawah file lock. Return (signature sebelum, sesudah).
+        """
+        tmp_path = self.path + '.tmp'
+        with file_lock(self.path):
+            before = self.signature()
+            users = apply_changes(self.load(), changes)
+            with open(tmp_path, 'w') as f:
+                json.dump(users, f, indent=2)
+            os.replace(tmp_path, self.path)
+            return before, self.signature()
+
+
+def apply_changes(users, changes):
+    """``users`` dengan ``changes`` diterapkan (data None = hapus user)"""
+    for user_id, data in changes.items():
+        if data is None:
+            users.pop(user_id, None)
+        else:
+            users[user_id] = data
+    return users
+
+
+class UserRegistry:
+    """
+    Users dict yang di-load sekali dan dilayani dari memory.
+
+    Data hanya dibaca ulang jika signature sumbernya berubah (untuk
+    users.json: inode, mtime, size), misalnya karena worker lain menulis.
+    Setiap load/save menaikkan ``generation``.
+    """
+
+    def __init__(self, source, on_reload=None):
+        self.source = source
+        self.on_reload = on_reload
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._lock = threading.RLock()
+        self._users = None
+        self._signature = None
+
+    def get(self):
+        """
+        Users dict terkini. Dict ini dipakai bersama semua thread dan
+        tidak pernah diubah di tempat (perubahan lewat ``update()``
+        menghasilkan dict baru), jadi jangan diubah oleh pemanggil.
+        """
+        with self._lock:
+            signature = self.source.signature()
+            if self._users is not None and signature == self._signature:
+                self.hits += 1
+                return self._users
+
+            self.misses += 1
+            if self._users is not None:
+                self.reloads += 1
+
+            self._users = self.source.load()
+            self._signature = signature
+            self.generation += 1
+            if self.on_reload:
+                self.on_reload(self._users)
+            return self._users
+
+    def update(self, changes):
+        """
+        Simpan perubahan ``{user_id: data}`` (data None = hapus user).
+        Sumber hanya menulis user yang berubah; cache diganti dengan dict
+        baru setelah tulis berhasil, atau dibaca ulang jika ternyata
+        worker lain sempat menulis lebih dulu.
+        """
+        with self._lock:
+            users = self.get()
+            try:
+                before, after = self.source.update(changes)
+            except Exception:
+                # Paksa reload agar memory tidak berbeda dengan data tersimpan
+                self._signature = None
+                raise
+            if before != self._signature:
+                self._signature = None
+                return self.get()
+            self._users = apply_changes(dict(users), changes)
+            self._signature = after
+            self.generation += 1
+            return self._users
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+            'generation': self.generation,
+            'users': len(self._users or {})
+        }
@@ -0,0 +1,43 @@
+-- Schema SQLite untuk STORAGE_BACKEND=sqlite (backend/models.py).
+-- Tabel lama `users` / `attendance` di absensi.db berasal dari prototype
+-- awal dan tidak dipakai lagi.
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS face_users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    password_hash TEXT,
+    registered_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS attendance_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    similarity REAL,
+    confidence TEXT,
+    timestamp TEXT NOT NULL,
+    date TEXT NOT NULL,
+    month TEXT NOT NULL,
+    time TEXT,
+    status TEXT,
+    location_verified INTEGER,
+    location_message TEXT,
+    user_latitude REAL,
+    user_longitude REAL,
+    UNIQUE (user_id, timestamp)
+);
+
+CREATE INDEX IF NOT EXISTS idx_attendance_user_date ON attendance_records (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_attendance_timestamp ON attendance_records (timestamp);
+CREATE INDEX IF NOT EXISTS idx_attendance_month ON attendance_records (month);
+CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance_records (date);
+-- Paging record terbaru dulu per bulan / per user (keyset timestamp, user_id)
+CREATE INDEX IF NOT EXISTS idx_attendance_month_page ON attendance_records (month, timestamp, user_id);
+CREATE INDEX IF NOT EXISTS idx_attendance_user_page ON attendance_records (user_id, timestamp);
+
+INSERT OR IGNORE INTO meta (key, value) VALUES ('users_version', 0);
@@ -10,6 +10,8 @@ const AdminPanel = ({ onNavigate }) => {
   const [dashboardStats, setDashboardStats] = useState(null);
   const [users, setUsers] = useState([]);
   const [monthlyRecords, setMonthlyRecords] = useState([]);
+  const [recordsCursor, setRecordsCursor] = useState(null);
+  const [totalMonthlyRecords, setTotalMonthlyRecords] = useState(0);
   const [selectedMonth, setSelectedMonth] = useState(new Date().toISOString().slice(0, 7));
   const [availableMonths, setAvailableMonths] = useState([]);
   const [popup, setPopup] = useState(null);
@@ -227,15 +229,22 @@ const AdminPanel = ({ onNavigate }) => {
     }
   };
 
-  const loadMonthlyRecords = async () => {
+  const loadMonthlyRecords = async (cursor = null) => {
     try {
-      const result = await callAPI(`/admin/monthly-records?month=${selectedMonth}`, null, 'GET');
+      const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+      const result = await callAPI(`/admin/monthly-records?month=${selectedMonth}${cursorParam}`, null, 'GET');
       if (result.success) {
-        setMonthlyRecords(result.records || []);
+        const records = result.records || [];
+        setMonthlyRecords(previous => cursor ? [...previous, ...records] : records);
+        setRecordsCursor(result.next_cursor || null);
+        setTotalMonthlyRecords(result.total_records || 0);
       }
     } catch (error) {
       console.error('Failed to load monthly records:', error);
-      setMonthlyRecords([]);
+      if (!cursor) {
+        setMonthlyRecords([]);
+        setRecordsCursor(null);
+      }
     }
   };
 
@@ -590,6 +599,13 @@ const AdminPanel = ({ onNavigate }) => {
                   <p>Tidak ada data absensi untuk bulan yang dipilih</p>
                 </div>
               )}
+              {recordsCursor && (
+                <div className="load-more">
+                  <button onClick={() => loadMonthlyRecords(recordsCursor)} disabled={loading}>
+                    {loading ? 'Memuat...' : `Muat lebih banyak (${monthlyRecords.length} dari ${totalMonthlyRecords})`}
+                  </button>
+                </div>
+              )}
             </div>
           </div>
         )}
@@ -199,13 +199,13 @@ const MainUserApp = ({ onNavigate }) => {
 
   const loadAttendanceRecords = async () => {
     try {
-      const result = await callAPI('/attendance-records', null, 'GET');
+      const endpoint = userProfile
+        ? `/attendance-records?user_id=${encodeURIComponent(userProfile.user_id)}`
+        : '/attendance-records?limit=10';
+      const result = await callAPI(endpoint, null, 'GET');
       if (result.success) {
         if (userProfile) {
-          const userRecords = result.records.filter(record => 
-            record.user_id === userProfile.user_id
-          );
-          setAttendanceRecords(userRecords);
+          setAttendanceRecords(result.records);
         } else {
           setAttendanceRecords(result.records.slice(0, 10));
         }